@@ -1,7 +1,8 @@
 from flask import Flask
 from flask_cors import CORS
 
-from routes.routes_dashboard import dashboard_bp, initialize_predictions
+from config import Config
+from routes.routes_dashboard import dashboard_bp, initialize_predictions, preload_models, schedule_prediction_refresh
 from routes.routes_taxpayers import routes_taxpayer
 
 
@@ -12,6 +13,7 @@ def create_app(test_config=None):
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['SESSION_COOKIE_SAME SITE'] = 'Lax'
     app.config['SESSION_COOKIE_SECURE'] = False
+    app.config.from_object(Config)
 
     if test_config:
         app.config.update(test_config)
@@ -19,8 +21,15 @@ def create_app(test_config=None):
     app.register_blueprint(routes_taxpayer)
     app.register_blueprint(dashboard_bp)
 
-    with app.app_context():
-        initialize_predictions()
+    if app.config['MODELS_PRELOAD']:
+        preload_models()
+
+    startup_mode = app.config['PREDICTIONS_ON_STARTUP']
+    if startup_mode == 'sync':
+        with app.app_context():
+            initialize_predictions()
+    elif startup_mode == 'background':
+        schedule_prediction_refresh()
 
     return app
 
@@ -0,0 +1,67 @@
+"""
+Forecast frame construction benchmark.
+
+Compares ForecastService.build_future_frame (cross-join with the calendar)
+against the old iterrows() loop and reports rows per second.
+
+Run from the project root:
+    python -m benchmarks.bench_future_frame
+    python -m benchmarks.bench_future_frame --sizes 30000 300000 --loop-limit 30000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_taxpayers
+from model.ForecastService import ForecastService
+
+
+def build_with_loop(taxpayers_df, target_year):
+    future_rows = []
+    for _, taxpayer in taxpayers_df.iterrows():
+        for month in range(1, 13):
+            future_rows.append({
+                'TaxpayerId': taxpayer['TaxpayerId'],
+                'FullName': taxpayer.get('FullName', ''),
+                'INN': taxpayer.get('INN', ''),
+                'Year': target_year,
+                'Month': month,
+                'season': ForecastService.get_season(month),
+                'TaxType': taxpayer.get('TaxType', taxpayer.get('TaxpayerType')),
+                'TaxpayerType': taxpayer['TaxpayerType'],
+                'activity_type': taxpayer['activity_type'],
+                'registration_district': taxpayer['registration_district'],
+                'has_employees': taxpayer['has_employees'],
+                'employees_count': taxpayer['employees_count']
+            })
+    return pd.DataFrame(future_rows)
+
+
+def measure(builder, taxpayers_df, target_year):
+    started = time.perf_counter()
+    future_df = builder(taxpayers_df, target_year)
+    elapsed = time.perf_counter() - started
+    return len(future_df), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30_000, 300_000, 3_000_000])
+    parser.add_argument("--loop-limit", type=int, default=30_000,
+                        help="run the iterrows() loop only up to this many taxpayers")
+    args = parser.parse_args()
+
+    print(f"{'taxpayers':>10} {'builder':>10} {'rows':>10} {'seconds':>9} {'rows/s':>12}")
+    for size in args.sizes:
+        taxpayers_df = make_taxpayers(size)
+        builders = [("vectorized", ForecastService.build_future_frame)]
+        if size <= args.loop_limit:
+            builders.append(("iterrows", build_with_loop))
+        for name, builder in builders:
+            rows, elapsed = measure(builder, taxpayers_df, 2025)
+            print(f"{size:>10} {name:>10} {rows:>10} {elapsed:>9.3f} {rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
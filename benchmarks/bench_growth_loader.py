@@ -0,0 +1,227 @@
+"""
+YearlyGrowthLoader round-trip benchmark.
+
+Fills yearly_growth_general and yearly_growth_median for every tax type
+on an in-memory SQLite database, once with the old loader (a copy of
+the code before the set-based path: general and median growth loaded
+separately, one existence COUNT + one INSERT per year) and once with
+the set-based YearlyGrowthLoader, and counts statements sent to the database.
+
+Run from the project root:
+    python -m benchmarks.bench_growth_loader --taxpayers 2000 --years 15
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import pandas as pd
+from sqlalchemy import event, text
+
+from benchmarks.synthetic import TAXPAYER_TYPES, make_monthly, make_taxpayers
+from model.AggregationService import AggregationService
+from model.TaxDataRepository import TaxDataRepository
+from model.YearlyGrowthLoader import YearlyGrowthLoader
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+
+def make_database(taxpayers, years):
+    db_engine = DatabaseEngine(backend="sqlite", path=":memory:")
+    create_schema(db_engine.get_engine())
+
+    taxpayers_df = make_taxpayers(taxpayers)
+    real_years = list(range(2024 - years + 1, 2025))
+    monthly = make_monthly(taxpayers_df, real_years)
+    predict = make_monthly(taxpayers_df, [2025]).rename(columns={
+        'IncomeAmount': 'Income', 'TaxAmount': 'Tax', 'transactions_count': 'Transactions'
+    })
+
+    with db_engine.engine.begin() as conn:
+        monthly.to_sql("MonthlyTaxData", conn, if_exists="append", index=False)
+        predict.to_sql("Predict", conn, if_exists="append", index=False)
+    return db_engine
+
+
+class BaselineYearlyGrowthLoader:
+    """YearlyGrowthLoader as it was before the set-based path, copied verbatim"""
+
+    def __init__(self, db_engine, repository, aggregator):
+        self.db_engine = db_engine
+        self.repository = repository
+        self.aggregator = aggregator
+
+    def _record_exists(self, conn, table_name, year, tax_type):
+        if tax_type is None:
+            query = text(f"""
+                SELECT COUNT(1)
+                FROM {table_name}
+                WHERE [Year] = :year
+                AND TaxType IS NULL
+            """)
+            result = conn.execute(query, {"year": year}).scalar()
+        else:
+            query = text(f"""
+                SELECT COUNT(1)
+                FROM {table_name}
+                WHERE [Year] = :year
+                AND TaxType = :taxtype
+            """)
+            result = conn.execute(query, {
+                "year": year,
+                "taxtype": tax_type
+            }).scalar()
+
+        return result > 0
+
+    def load_general_growth(self, tax_type=None):
+        df_real = self.repository.get_monthly_data(
+            source="real",
+            tax_type=tax_type,
+            aggregate=False
+        )
+
+        df_pred = self.repository.get_monthly_data(
+            source="predict",
+            tax_type=tax_type,
+            aggregate=False
+        )
+
+        if df_real.empty and df_pred.empty:
+            print("No data for general")
+            return
+        yearly_real = self.aggregator.aggregate_yearly(df_real, "sum")
+        yearly_pred = self.aggregator.aggregate_yearly(df_pred, "sum")
+        combined = pd.concat([yearly_real, yearly_pred], ignore_index=True)
+        combined = combined.sort_values("Year")
+        growth = self.aggregator.calculate_growth(combined)
+        engine = self.db_engine.get_engine()
+        with engine.begin() as conn:
+            for _, row in growth.iterrows():
+
+                year_value = int(row["Year"])
+
+                if self._record_exists(conn, "yearly_growth_general", year_value, tax_type):
+                    print(f"Skip: {year_value} already exists")
+                    continue
+
+                conn.execute(text("""
+                    INSERT INTO yearly_growth_general
+                    ([Year], TaxType,
+                     IncomeTotal, TaxTotal, TransactionTotal,
+                     IncomeGrowth, TaxGrowth, TransactionsGrowth)
+                    VALUES
+                    (:year, :taxtype,
+                     :income_total, :tax_total, :trans_total,
+                     :income_growth, :tax_growth, :trans_growth)
+                """), {
+                    "year": int(row["Year"]),
+                    "taxtype": tax_type,
+                    "income_total": float(row["Income"]),
+                    "tax_total": float(row["Tax"]),
+                    "trans_total": float(row["Transactions"]),
+                    "income_growth": float(row["IncomeGrowth_%"]) if pd.notna(row["IncomeGrowth_%"]) else 0,
+                    "tax_growth": float(row["TaxGrowth_%"]) if pd.notna(row["TaxGrowth_%"]) else 0,
+                    "trans_growth": float(row["TransactionsGrowth_%"]) if pd.notna(row["TransactionsGrowth_%"]) else 0
+                })
+
+        print("yearly_growth_general is full")
+
+    def load_median_growth(self, tax_type=None):
+        df_real = self.repository.get_monthly_data(
+            source="real",
+            tax_type=tax_type,
+            aggregate=False
+        )
+
+        df_pred = self.repository.get_monthly_data(
+            source="predict",
+            tax_type=tax_type,
+            aggregate=False
+        )
+
+        if df_real.empty and df_pred.empty:
+            print("No data for median")
+            return
+
+        yearly_real = self.aggregator.aggregate_yearly(df_real, "median")
+        yearly_pred = self.aggregator.aggregate_yearly(df_pred, "median")
+
+        combined = pd.concat([yearly_real, yearly_pred], ignore_index=True)
+        combined = combined.sort_values("Year")
+
+        growth = self.aggregator.calculate_growth(combined)
+
+        engine = self.db_engine.get_engine()
+
+        with engine.begin() as conn:
+            for _, row in growth.iterrows():
+                year_value = int(row["Year"])
+
+                if self._record_exists(conn, "yearly_growth_median", year_value, tax_type):
+                    print(f"Skip: {year_value} already exists")
+                    continue
+                conn.execute(text("""
+                    INSERT INTO yearly_growth_median
+                    ([Year], TaxType,
+                     IncomeTotal, TaxTotal, TransactionTotal,
+                     IncomeGrowth, TaxGrowth, TransactionsGrowth)
+                    VALUES
+                    (:year, :taxtype,
+                     :income_total, :tax_total, :trans_total,
+                     :income_growth, :tax_growth, :trans_growth)
+                """), {
+                    "year": int(row["Year"]),
+                    "taxtype": tax_type,
+                    "income_total": float(row["Income"]),
+                    "tax_total": float(row["Tax"]),
+                    "trans_total": float(row["Transactions"]),
+                    "income_growth": float(row["IncomeGrowth_%"]) if pd.notna(row["IncomeGrowth_%"]) else 0,
+                    "tax_growth": float(row["TaxGrowth_%"]) if pd.notna(row["TaxGrowth_%"]) else 0,
+                    "trans_growth": float(row["TransactionsGrowth_%"]) if pd.notna(row["TransactionsGrowth_%"]) else 0
+                })
+
+        print("yearly_growth_median full")
+
+
+def load_row_by_row(loader, tax_type):
+    loader.load_general_growth(tax_type)
+    loader.load_median_growth(tax_type)
+
+
+def run(name, loader_class, load, taxpayers, years):
+    db_engine = make_database(taxpayers, years)
+    loader = loader_class(db_engine, TaxDataRepository(db_engine), AggregationService())
+
+    statements = []
+    event.listen(
+        db_engine.engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+
+    started = time.perf_counter()
+    # both loaders print progress lines, kept out of the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        for tax_type in [None] + TAXPAYER_TYPES:
+            load(loader, tax_type)
+    elapsed = time.perf_counter() - started
+
+    with db_engine.engine.connect() as conn:
+        stored = conn.execute(text("SELECT COUNT(*) FROM yearly_growth_general")).scalar()
+    print(f"{name:>10} {len(statements):>12} {stored:>12} {elapsed:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxpayers", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'loader':>10} {'round-trips':>12} {'growth rows':>12} {'seconds':>9}")
+    run("row-by-row", BaselineYearlyGrowthLoader, load_row_by_row, args.taxpayers, args.years)
+    run("set-based", YearlyGrowthLoader, lambda loader, tax_type: loader.load_growth(tax_type),
+        args.taxpayers, args.years)
+
+
+if __name__ == "__main__":
+    main()
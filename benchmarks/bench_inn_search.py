@@ -0,0 +1,65 @@
+"""
+INN search benchmark: in-memory InnSearchIndex vs INN LIKE on the database.
+
+Fills an in-memory SQLite Taxpayer table with random 12-digit INNs,
+builds the index and times prefix and substring lookups both ways.
+
+Run from the project root:
+    python -m benchmarks.bench_inn_search --taxpayers 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.InnSearchIndex import InnSearchIndex
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+QUERIES = [("7712", "prefix"), ("77123456", "prefix"), ("4521", "substring"),
+           ("98765", "substring"), ("123456", "substring")]
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxpayers", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db_engine = DatabaseEngine(backend="sqlite", path=":memory:")
+    create_schema(db_engine.get_engine())
+    rng = np.random.default_rng(42)
+    inns = pd.Series(rng.choice(10 ** 12 - 10 ** 11, args.taxpayers, replace=False) + 10 ** 11).astype(str)
+    pd.DataFrame({
+        "TaxpayerId": np.arange(1, args.taxpayers + 1),
+        "FullName": "Taxpayer",
+        "INN": inns,
+        "TaxpayerType": "SZ",
+        "has_employees": False
+    }).to_sql("Taxpayer", db_engine.get_engine(), if_exists="append", index=False, chunksize=100000)
+
+    index = InnSearchIndex(db_engine, max_ids=10 ** 9)
+    build_ms, _ = timed(index.rebuild, 1)
+    print(f"index build: {build_ms:.0f} ms for {args.taxpayers} taxpayers")
+
+    for query, mode in QUERIES:
+        index_ms, ids = timed(lambda: index.search(query, mode), args.repeat)
+        pattern = f"{query}%" if mode == "prefix" else f"%{query}%"
+        like_ms, df = timed(lambda: db_engine.execute_query(
+            "SELECT TaxpayerId FROM Taxpayer WHERE INN LIKE ?", [pattern]), 3)
+        assert sorted(df["TaxpayerId"]) == ids.tolist()
+        print(f"{mode:>9} {query:<10} matches {len(ids):>6}: index {index_ms:7.3f} ms   LIKE {like_ms:8.2f} ms")
+
+    db_engine.dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
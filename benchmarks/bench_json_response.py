@@ -0,0 +1,101 @@
+"""
+Dashboard JSON serialization benchmark.
+
+Compares the old df_to_json path (to_json -> json.loads -> jsonify) with
+frame_response, which writes the DataFrame JSON once, on:
+- monthly frames of 12 x N years (as /monthly/general returns them);
+- the full /predict_generale/result payload (group by month over Predict rows).
+
+Run from the project root:
+    python -m benchmarks.bench_json_response --years 10 --taxpayers 30000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from flask import Flask, jsonify
+
+from benchmarks.synthetic import make_monthly, make_taxpayers
+from routes.serialization import convert_numpy_types, frame_response
+
+
+def old_df_to_json(df):
+    if df is None or df.empty:
+        return []
+    return json.loads(df.to_json(orient='records', date_format='iso', default_handler=convert_numpy_types))
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = func()
+    return (time.perf_counter() - started) / repeat * 1000, response.get_data()
+
+
+def compare(name, old, new, repeat):
+    old_ms, old_body = timed(old, repeat)
+    new_ms, new_body = timed(new, repeat)
+    assert json.loads(old_body) == json.loads(new_body)
+    print(f"{name:<38} jsonify {old_ms:8.3f} ms   frame_response {new_ms:8.3f} ms   "
+          f"({len(new_body) / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--taxpayers", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    taxpayers_df = make_taxpayers(args.taxpayers)
+
+    with app.app_context():
+        for years in (args.years, args.years * 2):
+            monthly = make_monthly(taxpayers_df.head(1000), list(range(2024 - years + 1, 2025)))
+            frame = monthly.groupby(['Year', 'Month']).agg(
+                TotalIncome=('IncomeAmount', 'sum'),
+                TotalTax=('TaxAmount', 'sum'),
+                TotalTransactions=('transactions_count', 'sum')
+            ).reset_index()
+            compare(f"monthly general, 12 x {years} years", lambda: jsonify({'success': True, 'data': old_df_to_json(frame)}),
+                    lambda: frame_response({'success': True, 'data': frame}), args.repeat)
+
+        predict = make_monthly(taxpayers_df, [2025]).rename(columns={
+            'IncomeAmount': 'Income', 'TaxAmount': 'Tax', 'transactions_count': 'Transactions'
+        })
+        predict['Transactions'] = predict['Transactions'].astype(np.float64)
+
+        started = time.perf_counter()
+        general_df = predict.groupby('Month').agg(
+            TotalIncome=('Income', 'sum'),
+            TotalTransactions=('Transactions', 'sum'),
+            TotalTax=('Tax', 'sum')
+        ).reset_index()
+        median_df = predict.groupby('Month').agg(
+            MedianIncome=('Income', 'median'),
+            MedianTransactions=('Transactions', 'median'),
+            MedianTax=('Tax', 'median')
+        ).reset_index()
+        print(f"predict_generale/result aggregation over {len(predict)} rows: "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms (same for both paths)")
+
+        compare(
+            "predict_generale/result payload",
+            lambda: jsonify({
+                "success": True,
+                "general": general_df.to_dict(orient='records'),
+                "median": median_df.to_dict(orient='records')
+            }),
+            lambda: frame_response({"success": True, "general": general_df, "median": median_df}, double_precision=15),
+            args.repeat
+        )
+
+        detail = predict.head(120)
+        compare("per-INN prediction frame, 120 rows", lambda: jsonify({'success': True, 'data': old_df_to_json(detail)}),
+                lambda: frame_response({'success': True, 'data': detail}), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
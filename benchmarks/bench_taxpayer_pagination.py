@@ -0,0 +1,63 @@
+"""
+/api/taxpayers pagination benchmark: OFFSET/FETCH page numbers vs keyset cursors.
+
+Fills an in-memory SQLite database with synthetic taxpayers and times
+fetching a shallow and a deep page both ways. The keyset page is reached
+by seeking from the last row of the previous page, as the cursor does.
+
+Run from the project root:
+    python -m benchmarks.bench_taxpayer_pagination --taxpayers 200000 --page 1000
+"""
+import argparse
+import time
+
+from benchmarks.seed_sqlite import TAXPAYER_COLUMNS
+from benchmarks.synthetic import make_taxpayers
+from model.TaxpayerRepository import TaxpayerRepository
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxpayers", type=int, default=200000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--sort-by", default="FullName")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_engine = DatabaseEngine(backend="sqlite", path=":memory:")
+    create_schema(db_engine.get_engine())
+    taxpayers_df = make_taxpayers(args.taxpayers)
+    taxpayers_df['PassportNumber'] = None
+    taxpayers_df[TAXPAYER_COLUMNS].to_sql("Taxpayer", db_engine.get_engine(), if_exists="append", index=False)
+    repository = TaxpayerRepository(db_engine)
+
+    for page in (1, args.page):
+        offset_ms, offset_df = timed(lambda: repository.get_taxpayers_paginated_raw(
+            page, args.page_size, None, None, args.sort_by, "ASC"), args.repeat)
+
+        # position of the row before the page, as carried by a cursor
+        after = None
+        if page > 1:
+            previous = repository.get_taxpayers_paginated_raw(
+                page - 1, args.page_size, None, None, f"{args.sort_by} ASC, TaxpayerId", "ASC").iloc[-1]
+            after = (previous[args.sort_by], int(previous['TaxpayerId']))
+        keyset_ms, keyset_df = timed(lambda: repository.get_taxpayers_keyset_raw(
+            args.page_size, None, None, args.sort_by, "ASC", after=after), args.repeat)
+
+        print(f"page {page:>6}: offset {offset_ms:8.2f} ms   keyset {keyset_ms:8.2f} ms")
+
+    db_engine.dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Create and fill a SQLite tax database with synthetic data for offline runs.
+
+Run from the project root:
+    python -m benchmarks.seed_sqlite taxpayers.db --taxpayers 30000 --years 2015-2024
+    DB_BACKEND=sqlite DB_PATH=taxpayers.db python app.py
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_monthly, make_taxpayers
+from model.ForecastService import ForecastService
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+TAXPAYER_COLUMNS = [
+    'TaxpayerId', 'FullName', 'PassportNumber', 'INN', 'TaxpayerType',
+    'registration_district', 'activity_type', 'has_employees', 'employees_count'
+]
+
+
+def seed(db_engine, taxpayers, years, chunksize=100000):
+    engine = db_engine.get_engine()
+    create_schema(engine)
+
+    taxpayers_df = make_taxpayers(taxpayers)
+    taxpayers_df['PassportNumber'] = (4500000000 + taxpayers_df['TaxpayerId']).astype(str)
+    taxpayers_df[TAXPAYER_COLUMNS].to_sql(
+        "Taxpayer", engine, if_exists="append", index=False, chunksize=chunksize
+    )
+
+    seasons = {month: ForecastService.get_season(month) for month in range(1, 13)}
+    for year in years:
+        monthly = make_monthly(taxpayers_df, [year], seed=year)
+        monthly['season'] = monthly['Month'].map(seasons)
+        monthly.to_sql("MonthlyTaxData", engine, if_exists="append", index=False, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--taxpayers", type=int, default=30000)
+    parser.add_argument("--years", default="2015-2024", help="first-last year")
+    args = parser.parse_args()
+
+    first, last = (int(year) for year in args.years.split("-"))
+    db_engine = DatabaseEngine(backend="sqlite", path=args.path)
+
+    started = time.perf_counter()
+    seed(db_engine, args.taxpayers, range(first, last + 1))
+    db_engine.dispose_engine()
+    print(f"Seeded {args.taxpayers} taxpayers, {first}-{last} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic taxpayer data shaped like the generate data scripts output"""
+import numpy as np
+import pandas as pd
+
+TAXPAYER_TYPES = ['IPP', 'IPOS', 'IP15', 'SZ']
+ACTIVITY_TYPES = ['TRADE', 'SERVICES', 'IT', 'FREELANCE', 'CONSTRUCTION', 'TRANSPORT']
+DISTRICTS = ['Central', 'North', 'South', 'East', 'West', 'NorthEast', 'SouthWest']
+
+
+def make_taxpayers(n, seed=42):
+    """Frame with the columns returned by TaxDataRepository.get_taxpayers"""
+    rng = np.random.default_rng(seed)
+    taxpayer_type = rng.choice(TAXPAYER_TYPES, n)
+    has_employees = (rng.random(n) < 0.5) & (taxpayer_type != 'SZ')
+    employees_count = np.where(has_employees, rng.integers(1, 21, n), np.nan)
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        'TaxpayerId': ids,
+        'FullName': [f"Taxpayer {i}" for i in ids],
+        'INN': (770000000000 + ids).astype(str),
+        'TaxpayerType': taxpayer_type,
+        'activity_type': rng.choice(ACTIVITY_TYPES, n),
+        'registration_district': rng.choice(DISTRICTS, n),
+        'has_employees': has_employees,
+        'employees_count': employees_count,
+        'TaxType': taxpayer_type
+    })
+
+
+def make_monthly(taxpayers_df, years, seed=42):
+    """MonthlyTaxData rows: one per taxpayer per month of every year"""
+    rng = np.random.default_rng(seed)
+    months = np.arange(1, 13)
+    n = len(taxpayers_df) * len(years) * 12
+    income = rng.gamma(2.0, 50000.0, n).round(2)
+    return pd.DataFrame({
+        'TaxpayerId': np.repeat(taxpayers_df['TaxpayerId'].to_numpy(), len(years) * 12),
+        'Year': np.tile(np.repeat(years, 12), len(taxpayers_df)),
+        'Month': np.tile(months, len(taxpayers_df) * len(years)),
+        'TaxType': np.repeat(taxpayers_df['TaxType'].to_numpy(), len(years) * 12),
+        'IncomeAmount': income,
+        'TaxAmount': (income * 0.06).round(2),
+        'transactions_count': rng.integers(1, 200, n)
+    })
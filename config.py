@@ -0,0 +1,97 @@
+import os
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def _env_flag(name, default):
+    """Boolean environment setting: 1/true/yes/on or 0/false/no/off, any case"""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    value = value.strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValueError(f"{name}={value!r}: expected one of {', '.join(_TRUE + _FALSE)}")
+
+
+class Config:
+    """Application settings, each can be overridden by an environment variable"""
+
+    # database and connection pool, shared by all blueprints
+    # DB_BACKEND: "mssql" (SQL Server) or "sqlite" (embedded file at DB_PATH)
+    DB_BACKEND = os.environ.get("DB_BACKEND", "mssql")
+    DB_PATH = os.environ.get("DB_PATH", "taxpayers.db")
+    DB_SERVER = os.environ.get("DB_SERVER", "localhost")
+    DB_DATABASE = os.environ.get("DB_DATABASE", "Taxpayer_Database_DiplomaProject")
+    DB_DRIVER = os.environ.get("DB_DRIVER", "ODBC Driver 17 for SQL Server")
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", True)
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    # queries slower than this are written to the slow-query log, negative disables it
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+    # bound parameter values (taxpayer INNs among them) in that log, off by default
+    SLOW_QUERY_LOG_PARAMS = _env_flag("SLOW_QUERY_LOG_PARAMS", False)
+
+    # "background" | "sync" | "off"
+    PREDICTIONS_ON_STARTUP = os.environ.get("PREDICTIONS_ON_STARTUP", "background")
+
+    # dashboard repository cache
+    REPOSITORY_CACHE_MAX_ENTRIES = int(os.environ.get("REPOSITORY_CACHE_MAX_ENTRIES", 512))
+    REPOSITORY_CACHE_MAX_BYTES = int(os.environ.get("REPOSITORY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    REPOSITORY_CACHE_MAX_ITEM_BYTES = int(os.environ.get("REPOSITORY_CACHE_MAX_ITEM_BYTES", 8 * 1024 * 1024))
+    REPOSITORY_CACHE_TTLS = {
+        "get_years": int(os.environ.get("CACHE_TTL_YEARS", 600)),
+        "get_taxpayers_count": int(os.environ.get("CACHE_TTL_TAXPAYERS_COUNT", 600)),
+        "get_monthly_summary": int(os.environ.get("CACHE_TTL_MONTHLY_SUMMARY", 300)),
+        "get_monthly_data": int(os.environ.get("CACHE_TTL_MONTHLY_DATA", 300)),
+        "get_yearly_growth_by_type": int(os.environ.get("CACHE_TTL_YEARLY_GROWTH", 300))
+    }
+
+    # HTTP caching of /api/dashboard: ETags from the data version, answered with 304.
+    # Writes made by other processes show up after at most DATA_VERSION_MAX_STALENESS seconds.
+    # The version is process-local and starts at 0: after a restart without writes,
+    # ETags issued before it can validate stale bodies for up to that long as well
+    DATA_VERSION_MAX_STALENESS = int(os.environ.get("DATA_VERSION_MAX_STALENESS", 300))
+    # Cache-Control max-age per view, 0 - the browser revalidates every time
+    DASHBOARD_CACHE_MAX_AGE = int(os.environ.get("DASHBOARD_CACHE_MAX_AGE", 0))
+    DASHBOARD_CACHE_MAX_AGES = {
+        "get_global_year_range": int(os.environ.get("CACHE_MAX_AGE_YEAR_RANGE", 300)),
+        "get_taxpayers_api": int(os.environ.get("CACHE_MAX_AGE_TAXPAYERS_COUNT", 300)),
+        "get_prediction_general_result": int(os.environ.get("CACHE_MAX_AGE_PREDICT_RESULT", 60))
+    }
+
+    # seconds a /api/taxpayers total count per filter is reused
+    TAXPAYER_COUNT_TTL = int(os.environ.get("TAXPAYER_COUNT_TTL", 30))
+    # in-memory INN search: larger match sets fall back to SQL LIKE;
+    # new taxpayers are picked up at least every INN_INDEX_REFRESH_INTERVAL seconds
+    INN_INDEX_MAX_IDS = int(os.environ.get("INN_INDEX_MAX_IDS", 1000))
+    INN_INDEX_REFRESH_INTERVAL = int(os.environ.get("INN_INDEX_REFRESH_INTERVAL", 60))
+
+    # /predict_inn: live forecasts not covered by the Predict table are kept in an LRU
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 10000))
+    PREDICTION_CACHE_MAX_BYTES = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    PREDICTION_CACHE_TTL = int(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+
+    # POST /api/dashboard/batch/*: INNs per request; each is bound twice,
+    # SQL Server accepts at most 2100 parameters per statement
+    BATCH_MAX_INNS = int(os.environ.get("BATCH_MAX_INNS", 1000))
+
+    # forecast models: loaded on first use from MODELS_PATH, numpy arrays memory-mapped
+    # (MODELS_MMAP_MODE, empty - read into memory). MODELS_PRELOAD=1 loads them in
+    # create_app; with `gunicorn --preload "app:create_app()"` that happens in the
+    # master process and the forked workers share the loaded models
+    MODELS_PATH = os.environ.get(
+        "MODELS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "regression", "Linear regression")
+    )
+    MODELS_MMAP_MODE = os.environ.get("MODELS_MMAP_MODE", "r") or None
+    MODELS_PRELOAD = _env_flag("MODELS_PRELOAD", False)
+
+    # batch forecasting
+    FORECAST_WORKERS = int(os.environ.get("FORECAST_WORKERS", os.cpu_count() or 1))
+    FORECAST_CHUNK_SIZE = int(os.environ.get("FORECAST_CHUNK_SIZE", 5000))
+    PREDICT_BULK_CHUNK_SIZE = int(os.environ.get("PREDICT_BULK_CHUNK_SIZE", 50000))
@@ -0,0 +1,99 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+from model.ForecastService import ForecastService
+
+logger = logging.getLogger(__name__)
+
+# forecaster of a pool worker, created by _init_worker; its models load on the first chunk
+_worker_forecaster = None
+
+
+def _init_worker(models_path, deduplicate):
+    global _worker_forecaster
+    _worker_forecaster = ForecastService(models_path, deduplicate=deduplicate)
+
+
+def _predict_chunk(taxpayers_chunk, target_year):
+    monthly_df, _ = _worker_forecaster.predict_for_taxpayers(taxpayers_chunk, target_year)
+    return monthly_df
+
+
+class BatchForecastEngine:
+    """
+    Forecast a taxpayer population in fixed-size chunks.
+
+    Chunks are predicted in a process pool (one model copy per worker) and
+    handed to the writer one by one in chunk order, so the written rows are
+    the same as for a single predict_for_taxpayers call over the whole frame.
+    At most 2 * workers chunks are in flight at any time.
+    """
+
+    def __init__(self, forecaster, workers=1, chunk_size=5000):
+        self.forecaster = forecaster
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+
+    def iter_chunks(self, taxpayers_df):
+        for start in range(0, len(taxpayers_df), self.chunk_size):
+            yield taxpayers_df.iloc[start:start + self.chunk_size]
+
+    def run(self, taxpayers_df, target_year, writer):
+        """
+        Predict all taxpayers for target_year.
+
+        Parameters:
+        -----------
+        taxpayers_df : DataFrame
+            Taxpayers to forecast (output of TaxDataRepository.get_taxpayers)
+        target_year : int
+            Year to predict for
+        writer : callable
+            Called with the monthly forecast DataFrame of every chunk, in order
+
+        Returns:
+        --------
+        int: number of monthly rows passed to the writer
+        """
+        chunk_count = -(-len(taxpayers_df) // self.chunk_size)
+        workers = min(self.workers, chunk_count)
+        logger.info(
+            f"Batch forecast: {len(taxpayers_df)} taxpayers, {chunk_count} chunks, {workers} workers"
+        )
+
+        if workers <= 1:
+            results = (
+                self.forecaster.predict_for_taxpayers(chunk, target_year)[0]
+                for chunk in self.iter_chunks(taxpayers_df)
+            )
+            return self._write_all(results, writer)
+
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.forecaster.models_path, self.forecaster.deduplicate)
+        ) as pool:
+            return self._write_all(self._iter_pool_results(pool, taxpayers_df, target_year, workers), writer)
+
+    def _iter_pool_results(self, pool, taxpayers_df, target_year, workers):
+        """Yield chunk forecasts in submission order with a bounded window"""
+        chunks = self.iter_chunks(taxpayers_df)
+        in_flight = deque()
+
+        for chunk in chunks:
+            in_flight.append(pool.submit(_predict_chunk, chunk, target_year))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    @staticmethod
+    def _write_all(results, writer):
+        rows = 0
+        for index, monthly_df in enumerate(results):
+            writer(monthly_df)
+            rows += len(monthly_df)
+            logger.info(f"Chunk {index} written: {len(monthly_df)} rows")
+        return rows
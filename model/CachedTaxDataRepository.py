@@ -0,0 +1,72 @@
+import inspect
+
+import pandas as pd
+
+from config import Config
+from model.QueryCache import QueryCache
+
+
+class CachedTaxDataRepository:
+    """
+    Caching proxy around TaxDataRepository.
+
+    Methods listed in ttls are served from a QueryCache; the key is the method
+    name plus its arguments bound to the method signature (defaults applied),
+    so get_years() and get_monthly_data(tax_type=None) hit the same entry
+    however they are called. Every other attribute goes straight to the
+    wrapped repository. invalidate() clears the cache; the owner subscribes
+    it to data change notifications (see routes_dashboard), so instances
+    don't stay registered after they are dropped.
+    ttls defaults to Config.REPOSITORY_CACHE_TTLS.
+    """
+
+    def __init__(self, repository, cache=None, ttls=None):
+        self.repository = repository
+        self.cache = cache if cache is not None else QueryCache()
+        self.ttls = dict(Config.REPOSITORY_CACHE_TTLS if ttls is None else ttls)
+        self.method_stats = {name: {"hits": 0, "misses": 0} for name in self.ttls}
+        # counters are updated from request threads, under the cache's lock
+        self._stats_lock = self.cache._lock
+
+    def __getattr__(self, name):
+        attr = getattr(self.repository, name)
+        if name not in self.ttls or not callable(attr):
+            return attr
+        cached = self._cached_method(name, attr)
+        # keep the wrapper on the instance, __getattr__ is not called again for it
+        self.__dict__[name] = cached
+        return cached
+
+    def _cached_method(self, name, method):
+        signature = inspect.signature(method)
+        ttl = self.ttls[name]
+
+        def cached(*args, **kwargs):
+            key = self.make_key(name, signature, args, kwargs)
+            hit, value = self.cache.get(key)
+            with self._stats_lock:
+                self.method_stats[name]["hits" if hit else "misses"] += 1
+            if not hit:
+                value = method(*args, **kwargs)
+                # empty results may come from a swallowed query error, do not keep them
+                if value is not None and not (isinstance(value, pd.DataFrame) and value.empty):
+                    self.cache.set(key, value, ttl)
+            return value.copy() if isinstance(value, pd.DataFrame) else value
+
+        return cached
+
+    @staticmethod
+    def make_key(name, signature, args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return (name,) + tuple(sorted(bound.arguments.items()))
+
+    def invalidate(self, source=None):
+        """Data change hook: drop every cached query result"""
+        return self.cache.invalidate()
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._stats_lock:
+            stats["methods"] = {name: dict(counts) for name, counts in self.method_stats.items()}
+        return stats
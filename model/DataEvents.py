@@ -0,0 +1,68 @@
+"""
+Notifications about writes to the tax data tables.
+
+Writers (prediction loads, growth and median loaders, the rollup job)
+call notify_data_changed after their transaction is committed; caches
+subscribe to drop whatever they hold for that data. Notifications stay
+in the process that made the write.
+
+Every notification also bumps the data version, a token for HTTP
+validators (ETags) of responses computed from the tables.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_subscribers = []
+_lock = threading.Lock()
+_generation = 0
+
+
+def data_version(max_staleness=None):
+    """
+    Token that changes after every committed write notified in this process.
+
+    Writes made by other processes (another worker, the rollup job CLI)
+    are not notified here; with max_staleness (seconds) the token also
+    changes every max_staleness seconds, which bounds how long a
+    response validated by it may stay stale.
+    """
+    if not max_staleness:
+        return str(_generation)
+    return f"{_generation}.{int(time.time() // max_staleness)}"
+
+
+def subscribe(callback):
+    """Register callback(source), called after every committed write"""
+    with _lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    """Remove a callback registered by subscribe; unknown callbacks are ignored"""
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def notify_data_changed(source):
+    """
+    source: what was written - 'predict', 'growth', 'median', 'rollups'
+    """
+    global _generation
+    with _lock:
+        subscribers = list(_subscribers)
+
+    for callback in subscribers:
+        try:
+            callback(source)
+        except Exception:
+            logger.exception(f"Data change subscriber failed for source={source}")
+
+    # after the caches are dropped: a response tagged with the new version
+    # can't have been built from data cached before the write
+    with _lock:
+        _generation += 1
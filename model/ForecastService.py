@@ -1,35 +1,62 @@
 # services/forecast_service.py
-import joblib
 import pandas as pd
-from sqlalchemy import text
 import logging
 
+from config import Config
+from model.ModelStore import get_model_store
+from model.PredictBulkLoader import PREDICT_DTYPES, PredictBulkLoader
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class ForecastService:
+    FUTURE_COLUMNS = [
+        'TaxpayerId', 'FullName', 'INN', 'Year', 'Month', 'season',
+        'TaxType', 'TaxpayerType', 'activity_type',
+        'registration_district', 'has_employees', 'employees_count'
+    ]
+
+    PREDICT_COLUMNS = list(PREDICT_DTYPES)
+
+    # model attribute -> file in models_path
+    MODEL_FILES = {
+        'income_model': 'linear_income_model.pkl',
+        'transactions_model': 'linear_transactions_model.pkl',
+        'tax_model': 'linear_tax_model.pkl'
+    }
 
-    def __init__(self, models_path=None):
-        if models_path is None:
-            models_path = r"C:\Users\blino\DiplomaProject\model\regression\Linear regression\\"
+    _calendar = None
+
+    def __init__(self, models_path=None, deduplicate=True, store=None):
+        """
+        models_path: directory of the model files, Config.MODELS_PATH by default.
+        Models are not loaded here: they come from the process-wide ModelStore
+        on first use, or by load_models().
+        """
+        self.store = store if store is not None else get_model_store(models_path)
+        self.models_path = self.store.models_path
+        self.deduplicate = deduplicate
 
-        self.models_path = models_path
-        self.model_version = "linear_regression_v1.0"
-        self.load_models()
+    @property
+    def model_version(self):
+        """Changes when a model file is replaced, e.g. by a retrained model"""
+        return f"linear_regression-{self.store.version(self.MODEL_FILES.values())}"
+
+    def __getattr__(self, name):
+        # income_model, transactions_model, tax_model: loaded on first access
+        if name in ForecastService.MODEL_FILES and 'store' in self.__dict__:
+            return self.store.get(self.MODEL_FILES[name])
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
 
     def load_models(self):
-        """Loading models ML"""
-        try:
-            self.income_model = joblib.load(f"{self.models_path}linear_income_model.pkl")
-            self.transactions_model = joblib.load(f"{self.models_path}linear_transactions_model.pkl")
-            self.tax_model = joblib.load(f"{self.models_path}linear_tax_model.pkl")
-            logger.info("Models loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading models: {e}")
-            raise
-
-    def get_season(self, month):
+        """Loading models ML now instead of on first use"""
+        for filename in self.MODEL_FILES.values():
+            self.store.get(filename)
+        logger.info("Models loaded successfully")
+
+    @staticmethod
+    def get_season(month):
         """to determine seasons by month"""
         if month in [12, 1, 2]:
             return 'winter'
@@ -39,6 +66,48 @@ class ForecastService:
             return 'summer'
         return 'autumn'
 
+    @classmethod
+    def get_calendar(cls):
+        """12-month calendar frame (Month, season), built once per process"""
+        if cls._calendar is None:
+            months = list(range(1, 13))
+            cls._calendar = pd.DataFrame({
+                'Month': months,
+                'season': [cls.get_season(month) for month in months]
+            })
+        return cls._calendar
+
+    @classmethod
+    def build_future_frame(cls, taxpayers_df, target_year):
+        """
+        Build the frame to forecast: one row per taxpayer per month.
+
+        The taxpayer frame is cross-joined with the calendar frame, so rows
+        keep the order taxpayer -> month 1..12.
+        """
+        taxpayers = taxpayers_df.reset_index(drop=True)
+
+        def column(name, default):
+            if name in taxpayers.columns:
+                return taxpayers[name]
+            return default
+
+        base = pd.DataFrame({
+            'TaxpayerId': taxpayers['TaxpayerId'],
+            'FullName': column('FullName', ''),
+            'INN': column('INN', ''),
+            'Year': target_year,
+            'TaxType': column('TaxType', taxpayers['TaxpayerType']),
+            'TaxpayerType': taxpayers['TaxpayerType'],
+            'activity_type': taxpayers['activity_type'],
+            'registration_district': taxpayers['registration_district'],
+            'has_employees': taxpayers['has_employees'],
+            'employees_count': taxpayers['employees_count']
+        }, index=taxpayers.index)
+
+        future_df = base.merge(cls.get_calendar(), how='cross')
+        return future_df.reindex(columns=cls.FUTURE_COLUMNS)
+
     def prepare_features(self, df):
         """prepare of signs"""
         features = [
@@ -49,6 +118,38 @@ class ForecastService:
         ]
         return df[features]
 
+    def predict_features(self, X):
+        """
+        Run income, transactions and tax models on prepared features.
+
+        In deduplicate mode every model runs once per unique feature row and
+        the results are scattered back to all rows sharing that row.
+
+        Returns:
+        --------
+        tuple of arrays: (income, transactions, tax), aligned with X
+        """
+        if not self.deduplicate:
+            return (
+                self.income_model.predict(X),
+                self.transactions_model.predict(X),
+                self.tax_model.predict(X)
+            )
+
+        # groups are numbered in order of first appearance,
+        # so first occurrences line up with group numbers 0..n-1
+        codes = X.groupby(list(X.columns), sort=False, dropna=False).ngroup().to_numpy()
+        first_rows = pd.Series(codes).drop_duplicates().index
+        X_unique = X.iloc[first_rows]
+
+        logger.info(f"Predicting {len(X_unique)} unique feature rows for {len(X)} rows")
+
+        return (
+            self.income_model.predict(X_unique)[codes],
+            self.transactions_model.predict(X_unique)[codes],
+            self.tax_model.predict(X_unique)[codes]
+        )
+
     def predict_for_taxpayers(self, taxpayers_df, target_year):
         """
         Forecast for all taxpayers
@@ -67,33 +168,15 @@ class ForecastService:
 
         logger.info(f"Starting prediction for {len(taxpayers_df)} taxpayers for year {target_year}")
 
-        future_rows = []
-
-        for _, taxpayer in taxpayers_df.iterrows():
-            for month in range(1, 13):
-                future_rows.append({
-                    'TaxpayerId': taxpayer['TaxpayerId'],
-                    'FullName': taxpayer.get('FullName', ''),
-                    'INN': taxpayer.get('INN', ''),
-                    'Year': target_year,
-                    'Month': month,
-                    'season': self.get_season(month),
-                    'TaxType': taxpayer.get('TaxType', taxpayer.get('TaxpayerType')),
-                    'TaxpayerType': taxpayer['TaxpayerType'],
-                    'activity_type': taxpayer['activity_type'],
-                    'registration_district': taxpayer['registration_district'],
-                    'has_employees': taxpayer['has_employees'],
-                    'employees_count': taxpayer['employees_count']
-                })
-
-        future_df = pd.DataFrame(future_rows)
+        future_df = self.build_future_frame(taxpayers_df, target_year)
 
         X_future = self.prepare_features(future_df)
 
         # Forecast
-        future_df['PredictedIncome'] = self.income_model.predict(X_future)
-        future_df['PredictedTransactions'] = self.transactions_model.predict(X_future)
-        future_df['PredictedTax'] = self.tax_model.predict(X_future)
+        income, transactions, tax = self.predict_features(X_future)
+        future_df['PredictedIncome'] = income
+        future_df['PredictedTransactions'] = transactions
+        future_df['PredictedTax'] = tax
 
         cols_to_clip = ['PredictedIncome', 'PredictedTransactions', 'PredictedTax']
         future_df[cols_to_clip] = future_df[cols_to_clip].clip(lower=0)
@@ -116,7 +199,7 @@ class ForecastService:
 
         return future_df, yearly_summary
 
-    def save_predictions_to_db(self, engine, monthly_df, yearly_df):
+    def save_predictions_to_db(self, engine, monthly_df, yearly_df, chunk_size=None):
         """
             Save monthly (and optionally yearly) forecasts into the Predict table.
             Deletes only data for the forecast year (not full table).
@@ -132,43 +215,40 @@ class ForecastService:
                  'activity_type', 'registration_district', 'has_employees', 'employees_count']
             yearly_df : pd.DataFrame, optional
                 Yearly summary data (can be ignored if only monthly data is needed)
+            chunk_size : int, optional
+                Rows per insert batch into the staging table (Config.PREDICT_BULK_CHUNK_SIZE by default)
         """
+        forecast_year = int(monthly_df['Year'].iloc[0])
+
+        loader = PredictBulkLoader(engine, chunk_size=chunk_size or Config.PREDICT_BULK_CHUNK_SIZE)
+        rows = loader.load(self.to_predict_frame(monthly_df), forecast_year)
+
+        logger.info(f"Saved {rows} monthly predictions to Predict table.")
+
+        if yearly_df is not None:
+            logger.info("Yearly summary not saved in this function, only monthly data is saved.")
+
+    def from_predict_frame(self, predict_df):
+        """Predict table rows -> the layout of the monthly forecast of predict_for_taxpayers"""
+        monthly_df = predict_df.rename(columns={
+            'Income': 'PredictedIncome',
+            'Transactions': 'PredictedTransactions',
+            'Tax': 'PredictedTax'
+        })
+        monthly_df['season'] = monthly_df['Month'].map(self.get_season)
+        columns = self.FUTURE_COLUMNS + ['PredictedIncome', 'PredictedTransactions', 'PredictedTax']
+        return monthly_df.reindex(columns=columns).reset_index(drop=True)
+
+    def to_predict_frame(self, monthly_df):
+        """Rename forecast columns to the Predict table layout"""
         monthly_save_df = monthly_df.rename(columns={
             'PredictedIncome': 'Income',
             'PredictedTransactions': 'Transactions',
             'PredictedTax': 'Tax'
         })
 
-        predict_columns = [
-            'TaxpayerId', 'FullName', 'INN', 'Year', 'Month',
-            'Income', 'Transactions', 'Tax',
-            'TaxType', 'TaxpayerType', 'activity_type',
-            'registration_district', 'has_employees', 'employees_count'
-        ]
-
-        missing_cols = set(predict_columns) - set(monthly_save_df.columns)
+        missing_cols = set(self.PREDICT_COLUMNS) - set(monthly_save_df.columns)
         for col in missing_cols:
             monthly_save_df[col] = None
 
-        forecast_year = int(monthly_save_df['Year'].iloc[0])
-
-        logger.info(f"Deleting old predictions for Year = {forecast_year}...")
-
-        with engine.begin() as conn:
-            conn.execute(
-                text("DELETE FROM Predict WHERE Year = :year"),
-                {"year": forecast_year}
-            )
-
-            logger.info("Old data deleted successfully.")
-
-        monthly_save_df[predict_columns].to_sql(
-            'Predict',
-            con=engine,
-            if_exists='append',
-            index=False)
-
-        logger.info(f"Saved {len(monthly_save_df)} monthly predictions to Predict table.")
-
-        if yearly_df is not None:
-            logger.info("Yearly summary not saved in this function, only monthly data is saved.")
+        return monthly_save_df[self.PREDICT_COLUMNS]
@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pandas as pd
+
+from model.QueryCache import QueryCache
+from model.QueryStats import LatencyWindow
+
+
+class InnPredictionService:
+    """
+    Forecast of one taxpayer for the year after its latest real data year.
+
+    Served, in order, from:
+    - "predict_table": the batch forecast in Predict, when its year is the target year;
+    - "cache": an LRU of earlier live forecasts keyed by (INN, target year, model version);
+    - "inference": the models; the result is put in the LRU.
+
+    LRU entries expire after ttl seconds only: taxpayer features are
+    written by the offline loading scripts, no data change event reports them.
+    Requests and latency percentiles are kept per source, see stats();
+    predict_batch() counts its INNs per source, without latency.
+    """
+
+    SOURCES = ("predict_table", "cache", "inference")
+
+    def __init__(self, repository, forecaster, cache=None, ttl=3600, max_samples=1024):
+        self.repository = repository
+        self.forecaster = forecaster
+        self.cache = cache if cache is not None else QueryCache(max_entries=10000)
+        self.ttl = ttl
+        self.requests = dict.fromkeys(self.SOURCES, 0)
+        self.latency = {source: LatencyWindow(max_samples) for source in self.SOURCES}
+        self._lock = threading.Lock()
+
+    def predict(self, inn, taxpayer=None, history=None):
+        """
+        {"year", "data", "source"}, or None for an unknown taxpayer
+        or a taxpayer without real data.
+        taxpayer (its Taxpayer row) and history (get_monthly_by_inn with
+        with_source=True) may be passed by a caller that has read them
+        already; the forecast is then served without further queries
+        unless it has to be inferred.
+        """
+        started = time.perf_counter()
+
+        if taxpayer is not None and history is not None:
+            real = history[history["Source"] == "real"] if not history.empty else history
+            if real.empty:
+                return None
+            year = int(real["Year"].max()) + 1
+            stored = history[(history["Source"] == "predict") & (history["Year"] == year)]
+            if not stored.empty:
+                result = {
+                    "year": year,
+                    "data": self.forecaster.from_predict_frame(self._predict_rows(taxpayer, stored)),
+                    "source": "predict_table"
+                }
+            else:
+                result = self._predict_live(inn, taxpayer, year)
+        else:
+            stored = self.repository.get_stored_prediction(inn)
+            if not stored.empty:
+                result = {
+                    "year": int(stored["Year"].iloc[0]),
+                    "data": self.forecaster.from_predict_frame(stored),
+                    "source": "predict_table"
+                }
+            else:
+                taxpayer = self.repository.get_taxpayer_with_last_year(inn)
+                if taxpayer.empty or pd.isna(taxpayer["LastRealYear"].iloc[0]):
+                    return None
+                year = int(taxpayer["LastRealYear"].iloc[0]) + 1
+                result = self._predict_live(inn, taxpayer.drop(columns="LastRealYear"), year)
+
+        self._record(result["source"], time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _predict_rows(taxpayer, history):
+        """Predict table rows rebuilt from the history rows of one year and the Taxpayer row"""
+        rows = history.rename(columns={
+            "TotalIncome": "Income",
+            "TotalTransactions": "Transactions",
+            "TotalTax": "Tax"
+        }).drop(columns="Source").reset_index(drop=True)
+        row = taxpayer.iloc[0]
+        for column in ("TaxpayerId", "FullName", "INN", "TaxpayerType", "activity_type",
+                       "registration_district", "has_employees", "employees_count"):
+            rows[column] = row.get(column)
+        return rows
+
+    def predict_batch(self, inns):
+        """
+        INN -> {"year", "data", "source"} as predict() returns it, for many INNs.
+        Taxpayers, their latest real data years and their stored forecasts
+        are read with one query each; INNs without a stored forecast are
+        served from the LRU, the rest by one forecast run per distinct target
+        year (normally a single one). Unknown INNs and INNs without real data
+        are left out.
+        """
+        taxpayers = self.repository.get_taxpayers_by_inns(inns)
+        last_years = self.repository.get_last_years_by_inns(inns)
+        if taxpayers.empty or last_years.empty:
+            return {}
+
+        targets = taxpayers.merge(last_years, on="INN")
+        targets["TargetYear"] = targets["LastYear"].astype(int) + 1
+
+        result = {}
+        stored = self.repository.get_stored_predictions_by_inns(targets["INN"].tolist())
+        if not stored.empty:
+            for inn, frame in stored.groupby("INN", sort=False):
+                result[inn] = {
+                    "year": int(frame["Year"].iloc[0]),
+                    "data": self.forecaster.from_predict_frame(frame),
+                    "source": "predict_table"
+                }
+
+        model_version = self.forecaster.model_version
+        live = []
+        for index, inn, year in zip(targets.index, targets["INN"], targets["TargetYear"]):
+            if inn in result:
+                continue
+            hit, data = self.cache.get((inn, int(year), model_version))
+            if hit:
+                result[inn] = {"year": int(year), "data": data.copy(), "source": "cache"}
+            else:
+                live.append(index)
+
+        for year, group in targets.loc[live].groupby("TargetYear"):
+            prediction_df, _ = self.forecaster.predict_for_taxpayers(
+                group.drop(columns=["LastYear", "TargetYear"]), int(year)
+            )
+            for inn, data in prediction_df.groupby("INN", sort=False):
+                data = data.reset_index(drop=True)
+                self.cache.set((inn, int(year), model_version), data, self.ttl)
+                result[inn] = {"year": int(year), "data": data.copy(), "source": "inference"}
+
+        with self._lock:
+            for item in result.values():
+                self.requests[item["source"]] += 1
+        return result
+
+    def _predict_live(self, inn, taxpayer, year):
+        key = (inn, year, self.forecaster.model_version)
+        hit, data = self.cache.get(key)
+        if hit:
+            return {"year": year, "data": data.copy(), "source": "cache"}
+
+        data, _ = self.forecaster.predict_for_taxpayers(taxpayer, year)
+        self.cache.set(key, data, self.ttl)
+        return {"year": year, "data": data.copy(), "source": "inference"}
+
+    def _record(self, source, seconds):
+        with self._lock:
+            self.requests[source] += 1
+            self.latency[source].add(seconds)
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.requests.values())
+            served = total - self.requests["inference"]
+            return {
+                "requests": total,
+                "hit_rate": served / total if total else None,
+                "sources": {
+                    source: {
+                        "requests": self.requests[source],
+                        "p50_ms": self.latency[source].percentile(50) * 1000,
+                        "p95_ms": self.latency[source].percentile(95) * 1000,
+                        "p99_ms": self.latency[source].percentile(99) * 1000
+                    }
+                    for source in self.SOURCES
+                },
+                "cache": self.cache.stats()
+            }
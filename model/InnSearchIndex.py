@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _to_matrix(inns, width):
+    """INN strings -> (n, width) uint8 matrix of ASCII codes, right padded with 0"""
+    packed = np.array(inns, dtype=f"S{width}")
+    return packed.view(np.uint8).reshape(len(packed), width)
+
+
+def _matches(matrix, pattern, prefix):
+    """Rows of matrix that start with (prefix=True) or contain pattern"""
+    length = len(pattern)
+    width = matrix.shape[1]
+    if length > width:
+        return np.zeros(len(matrix), dtype=bool)
+    if prefix:
+        return (matrix[:, :length] == pattern).all(axis=1)
+
+    mask = np.zeros(len(matrix), dtype=bool)
+    for start in range(width - length + 1):
+        mask |= (matrix[:, start:start + length] == pattern).all(axis=1)
+    return mask
+
+
+class _Snapshot:
+    """
+    Immutable index over (TaxpayerId, INN) pairs:
+    - INNs packed into integers over their alphabet and sorted, a prefix
+      is a contiguous key range found by binary search;
+    - trigram -> (row, position) posting lists: substring candidates are
+      the rows holding the rarest trigram of the query, verified at the
+      one offset that trigram implies;
+    - rows added after the build (delta) are scanned directly.
+    """
+
+    def __init__(self, ids, matrix):
+        self.ids = ids
+        self.matrix = matrix
+        self.width = matrix.shape[1]
+        self.delta_ids = ids[:0]
+        self.delta_matrix = matrix[:0]
+
+        # dense symbol codes: 0 for padding, 1..A for the characters in use
+        present = np.zeros(256, dtype=bool)
+        present[matrix.ravel()] = True
+        present[0] = False
+        self.symbols = np.zeros(256, dtype=np.uint8)
+        self.symbols[present] = np.arange(1, present.sum() + 1)
+        self.base = int(present.sum()) + 1
+        dense = self.symbols[matrix]
+
+        self.packed = None
+        if self.base ** self.width < 2 ** 63:
+            keys = np.zeros(len(matrix), dtype=np.int64)
+            for column in range(self.width):
+                keys = keys * self.base + dense[:, column]
+            self.order = np.argsort(keys).astype(np.int32)
+            self.packed = keys[self.order]
+            self.weights = self.base ** np.arange(self.width - 1, -1, -1, dtype=np.int64)
+        else:
+            inns = matrix.view(f"S{self.width}").ravel()
+            self.order = np.argsort(inns).astype(np.int32)
+            self.sorted_inns = inns[self.order]
+
+        code_type = np.uint16 if self.base ** 3 <= np.iinfo(np.uint16).max else np.int64
+        codes, rows, positions = [], [], []
+        row_numbers = np.arange(len(matrix), dtype=np.int32)
+        for start in range(max(self.width - 2, 0)):
+            code = dense[:, start].astype(code_type)
+            code = code * self.base + dense[:, start + 1]
+            code = code * self.base + dense[:, start + 2]
+            valid = dense[:, start + 2] > 0
+            if valid.all():
+                codes.append(code)
+                rows.append(row_numbers)
+            else:
+                codes.append(code[valid])
+                rows.append(row_numbers[valid])
+            positions.append(np.full(len(rows[-1]), start, dtype=np.int8))
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=code_type)
+
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        boundaries = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+        self.gram_starts = np.concatenate([[0], boundaries]) if len(codes) else boundaries
+        self.gram_codes = sorted_codes[self.gram_starts]
+        self.gram_ends = np.append(boundaries, len(codes))
+        self.gram_rows = np.concatenate(rows)[order] if rows else np.empty(0, dtype=np.int32)
+        self.gram_positions = np.concatenate(positions)[order] if positions else np.empty(0, dtype=np.int8)
+
+    @property
+    def max_id(self):
+        max_id = int(self.ids.max()) if len(self.ids) else 0
+        if len(self.delta_ids):
+            max_id = max(max_id, int(self.delta_ids.max()))
+        return max_id
+
+    def __len__(self):
+        return len(self.ids) + len(self.delta_ids)
+
+    def with_delta(self, ids, matrix):
+        """Copy sharing the built structures, with rows appended to the delta"""
+        snapshot = object.__new__(_Snapshot)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.delta_ids = np.concatenate([self.delta_ids, ids])
+        snapshot.delta_matrix = np.concatenate([self.delta_matrix, matrix])
+        return snapshot
+
+    def _prefix_rows(self, pattern, dense):
+        if self.packed is None:
+            key = pattern.tobytes()
+            lo = np.searchsorted(self.sorted_inns, key, side="left")
+            hi = np.searchsorted(self.sorted_inns, key + b"\xff", side="left")
+        else:
+            low = int(dense.astype(np.int64) @ self.weights[:len(dense)])
+            lo, hi = np.searchsorted(self.packed, [low, low + int(self.weights[len(dense) - 1])])
+        return self.order[lo:hi]
+
+    def _substring_rows(self, pattern, dense):
+        length = len(pattern)
+        if length < 3:
+            return np.flatnonzero(_matches(self.matrix, pattern, prefix=False))
+
+        best = None
+        for offset in range(length - 2):
+            code = (int(dense[offset]) * self.base + int(dense[offset + 1])) * self.base + int(dense[offset + 2])
+            position = np.searchsorted(self.gram_codes, code)
+            if position == len(self.gram_codes) or self.gram_codes[position] != code:
+                return np.empty(0, dtype=np.int32)
+            size = self.gram_ends[position] - self.gram_starts[position]
+            if best is None or size < best[0]:
+                best = (size, position, offset)
+
+        _, position, offset = best
+        posting = slice(self.gram_starts[position], self.gram_ends[position])
+        rows = self.gram_rows[posting]
+        starts = self.gram_positions[posting].astype(np.int64) - offset
+        fits = (starts >= 0) & (starts <= self.width - length)
+
+        # flat offsets of the would-be match starts, filtered one character at a time
+        rows = rows[fits]
+        cells = rows.astype(np.int64) * self.width + starts[fits]
+        flat = self.matrix.ravel()
+        for index in range(length):
+            if offset <= index < offset + 3:
+                continue
+            keep = flat[cells + index] == pattern[index]
+            rows, cells = rows[keep], cells[keep]
+        return np.unique(rows)
+
+    def search(self, pattern, prefix):
+        dense = self.symbols[pattern]
+        if len(pattern) > self.width or not dense.all():
+            rows = self.order[:0]
+        else:
+            rows = self._prefix_rows(pattern, dense) if prefix else self._substring_rows(pattern, dense)
+        ids = self.ids[rows]
+        if len(self.delta_ids):
+            ids = np.concatenate([ids, self.delta_ids[_matches(self.delta_matrix, pattern, prefix)]])
+        return np.sort(ids)
+
+
+class InnSearchIndex:
+    """
+    In-memory INN prefix / substring search over the Taxpayer table.
+
+    Built from the database on first use; taxpayers added later
+    (TaxpayerId above the largest indexed one) are picked up incrementally
+    by refresh(), which a search runs once refresh_interval seconds have
+    passed since the last one. Taxpayers are written by the offline
+    loading scripts only, so there is no data change event to react to:
+    a new taxpayer shows up after at most refresh_interval seconds.
+    Rows appended since the last build are kept in a small delta that is
+    scanned directly and merged by a rebuild once it exceeds delta_limit.
+
+    search() returns the sorted TaxpayerIds or None when the match set is
+    larger than max_ids, meaning the caller should filter with SQL LIKE.
+    If loading from the database fails, the previous index is kept (None -
+    SQL LIKE - while there is none) and the load is retried after
+    refresh_interval seconds.
+    """
+
+    def __init__(self, db_engine, max_ids=1000, delta_limit=10000, refresh_interval=60):
+        self.db_engine = db_engine
+        self.max_ids = max_ids
+        self.delta_limit = delta_limit
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._refreshed_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.build_seconds = None
+        self.searches = 0
+        self.fallbacks = 0
+
+    def _load(self, after_id=0):
+        """TaxpayerIds and INNs above after_id; database errors are raised, unlike execute_query"""
+        query = "SELECT TaxpayerId, INN FROM Taxpayer WHERE TaxpayerId > ? ORDER BY TaxpayerId"
+        chunks = list(self.db_engine.iter_query(query, [after_id]))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        if df.empty:
+            return np.empty(0, dtype=np.int64), []
+        return df['TaxpayerId'].to_numpy(dtype=np.int64), df['INN'].fillna('').astype(str).str.strip().tolist()
+
+    def _build(self, ids, matrix):
+        started = time.perf_counter()
+        self._snapshot = _Snapshot(ids, matrix)
+        self.build_seconds = time.perf_counter() - started
+
+    def rebuild(self):
+        """Full build from the Taxpayer table"""
+        with self._lock:
+            ids, inns = self._load()
+            self._build(ids, _to_matrix(inns, max((len(inn) for inn in inns), default=12)))
+            self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Index taxpayers added since the last build or refresh"""
+        if self._snapshot is None:
+            self.rebuild()
+            return
+
+        with self._lock:
+            snapshot = self._snapshot
+            ids, inns = self._load(snapshot.max_id)
+            if len(ids):
+                width = max(snapshot.width, max(len(inn) for inn in inns))
+                matrix = _to_matrix(inns, width)
+                if len(snapshot.delta_ids) + len(ids) <= self.delta_limit and width == snapshot.width:
+                    self._snapshot = snapshot.with_delta(ids, matrix)
+                else:
+                    # merge the delta into the built structures without reading the table again
+                    indexed = np.concatenate([snapshot.matrix, snapshot.delta_matrix])
+                    indexed = np.pad(indexed, ((0, 0), (0, width - snapshot.width)))
+                    self._build(
+                        np.concatenate([snapshot.ids, snapshot.delta_ids, ids]),
+                        np.concatenate([indexed, matrix])
+                    )
+            self._refreshed_at = time.monotonic()
+
+    def search(self, query, mode="substring"):
+        """
+        query: INN fragment; mode: "substring" or "prefix".
+        Returns a sorted array of TaxpayerIds, or None if more than max_ids match.
+        """
+        if mode not in ("substring", "prefix"):
+            raise ValueError(f"Unknown INN match mode: {mode}")
+        now = time.monotonic()
+        if now >= self._retry_at and (self._snapshot is None
+                                      or now - self._refreshed_at > self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"INN index refresh failed, retry in {self.refresh_interval} s: {e}")
+                self._retry_at = now + self.refresh_interval
+
+        snapshot = self._snapshot
+        with self._lock:
+            self.searches += 1
+        try:
+            pattern = np.frombuffer(query.strip().encode("ascii"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            return np.empty(0, dtype=np.int64)
+
+        ids = snapshot.search(pattern, prefix=(mode == "prefix")) if snapshot is not None and len(pattern) else None
+        if ids is None or len(ids) > self.max_ids:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        return ids
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "taxpayers": len(snapshot) if snapshot is not None else 0,
+            "delta": len(snapshot.delta_ids) if snapshot is not None else 0,
+            "build_ms": self.build_seconds * 1000 if self.build_seconds is not None else None,
+            "searches": self.searches,
+            "fallbacks": self.fallbacks,
+            "max_ids": self.max_ids
+        }
@@ -0,0 +1,183 @@
+import gc
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from config import Config
+
+try:
+    import psutil
+except ImportError:  # optional, /proc/self/statm is read instead
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def _resident_bytes():
+    """Resident set size of this process, None where it can't be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _mapped_bytes(obj, seen=None):
+    """Bytes of the numpy arrays of obj backed by a memory-mapped file"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.memmap):
+        return obj.nbytes
+    if isinstance(obj, np.ndarray):
+        return 0
+    if isinstance(obj, dict):
+        return sum(_mapped_bytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_mapped_bytes(value, seen) for value in obj)
+    if hasattr(obj, "__dict__"):
+        return _mapped_bytes(vars(obj), seen)
+    return 0
+
+
+def dump_atomic(model, path):
+    """
+    joblib.dump to a temporary file in the same directory, then os.replace
+    it onto path, so readers see either the old or the new file, never a
+    partially written (or truncated) one
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{filename}.", dir=directory)
+    os.close(fd)
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ModelStore:
+    """
+    Read-only ML models of one directory, loaded on first use.
+
+    Files are opened with joblib mmap_mode, so the numpy arrays of
+    uncompressed joblib dumps stay in the page cache, shared by every
+    process reading them. Models loaded before gunicorn forks its workers
+    (--preload, see freeze_preloaded) are shared copy-on-write.
+
+    A file replaced on disk (a retrained model) is loaded again on the
+    next get(); version() identifies the files by modification time and size.
+    Replace files atomically (dump_atomic, or os.replace of a file written
+    next to it): overwriting a file in place truncates it under the memory
+    maps of the model still in use, and reading them then kills the process
+    with SIGBUS. A replaced file stays readable through the old maps.
+
+    stats() reports, per model, the load time and how much the process
+    resident size grew while loading it (the first load also includes
+    importing the libraries the model is built on).
+    """
+
+    def __init__(self, models_path, mmap_mode="r"):
+        self.models_path = models_path
+        self.mmap_mode = mmap_mode
+        self._models = {}  # filename -> (model, file signature)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, filename):
+        """(modification time, size) of the file, None if it can't be read"""
+        try:
+            stat = os.stat(os.path.join(self.models_path, filename))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, filename):
+        signature = self._signature(filename)
+        entry = self._models.get(filename)
+        if entry is None or entry[1] != signature:
+            with self._lock:
+                entry = self._models.get(filename)
+                if entry is None or entry[1] != signature:
+                    entry = self._models[filename] = (self._load(filename), signature)
+        return entry[0]
+
+    def version(self, filenames):
+        """Short hash of the names, modification times and sizes of the files"""
+        digest = hashlib.sha1()
+        for filename in filenames:
+            digest.update(f"{filename}:{self._signature(filename)}".encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    def _load(self, filename):
+        path = os.path.join(self.models_path, filename)
+        resident_before = _resident_bytes()
+        started = time.perf_counter()
+        try:
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            logger.error(f"Error loading model {path}: {e}")
+            raise
+        seconds = time.perf_counter() - started
+        resident_after = _resident_bytes()
+
+        self._stats[filename] = {
+            "path": path,
+            "load_ms": seconds * 1000,
+            "resident_bytes": (resident_after - resident_before
+                               if resident_before is not None and resident_after is not None else None),
+            "mapped_bytes": _mapped_bytes(model),
+            "file_bytes": os.path.getsize(path)
+        }
+        logger.info(f"Model {filename} loaded in {seconds * 1000:.1f} ms")
+        return model
+
+    def is_loaded(self, filename):
+        return filename in self._models
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "models_path": self.models_path,
+                "mmap_mode": self.mmap_mode,
+                "models": {filename: dict(stats) for filename, stats in self._stats.items()}
+            }
+
+
+def freeze_preloaded():
+    """
+    Move every object allocated so far to the permanent GC generation.
+    Called in the gunicorn master after the models are loaded: the
+    workers' garbage collections then don't write to (and so copy) the
+    pages holding them.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_model_store(models_path=None):
+    """Process-wide ModelStore of models_path (Config.MODELS_PATH by default)"""
+    models_path = models_path or Config.MODELS_PATH
+    store = _stores.get(models_path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(models_path)
+            if store is None:
+                store = _stores[models_path] = ModelStore(models_path, mmap_mode=Config.MODELS_MMAP_MODE)
+    return store
@@ -0,0 +1,149 @@
+import logging
+import os
+import time
+import uuid
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table, Unicode, text
+
+from model.DataEvents import notify_data_changed
+
+logger = logging.getLogger(__name__)
+
+PREDICT_DTYPES = {
+    'TaxpayerId': Integer(),
+    'FullName': Unicode(255),
+    'INN': String(12),
+    'Year': Integer(),
+    'Month': Integer(),
+    'Income': Float(),
+    'Transactions': Integer(),
+    'Tax': Float(),
+    'TaxType': String(10),
+    'TaxpayerType': String(10),
+    'activity_type': Unicode(50),
+    'registration_district': Unicode(100),
+    'has_employees': Boolean(),
+    'employees_count': Integer()
+}
+
+
+def predict_table(name, metadata=None):
+    """SQLAlchemy table with the Predict column layout"""
+    return Table(
+        name,
+        metadata if metadata is not None else MetaData(),
+        *[Column(column, dtype) for column, dtype in PREDICT_DTYPES.items()]
+    )
+
+
+class PredictBulkLoader:
+    """
+    Replace one forecast year of the Predict table.
+
+    Rows are written in large batches into a staging table; commit() then
+    deletes the year from Predict and copies the staging rows in within one
+    transaction, so readers see either the old or the new year, never a
+    partially loaded one. Each begin() stages into a table of its own
+    (Predict_staging_<pid>_<random>) unless staging_table is given, so
+    concurrent loads, in other workers or processes, don't share one.
+
+    Usage:
+        loader.begin(2025)
+        loader.write(chunk_df)   # any number of times
+        loader.commit()          # or loader.abort()
+    """
+
+    def __init__(self, engine, chunk_size=50000, target_table="Predict", staging_table=None):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.target_table = target_table
+        self.staging_name = staging_table
+        self.staging_table = None
+        self.year = None
+        self.rows = 0
+        self.batch_timings = []
+
+    def begin(self, year):
+        """Create an empty staging table for the given forecast year"""
+        self.year = int(year)
+        self.rows = 0
+        self.batch_timings = []
+        self.staging_table = self.staging_name or (
+            f"{self.target_table}_staging_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        )
+
+        staging = predict_table(self.staging_table)
+        with self.engine.begin() as conn:
+            staging.drop(conn, checkfirst=True)
+            staging.create(conn)
+
+        logger.info(f"Staging table {self.staging_table} created for Year = {self.year}")
+
+    def write(self, predict_df):
+        """Append rows (in Predict column layout) to the staging table"""
+        if self.year is None:
+            raise RuntimeError("begin() must be called before write()")
+
+        for start in range(0, len(predict_df), self.chunk_size):
+            batch = predict_df.iloc[start:start + self.chunk_size]
+
+            started = time.perf_counter()
+            batch.to_sql(
+                self.staging_table,
+                con=self.engine,
+                if_exists='append',
+                index=False,
+                dtype=PREDICT_DTYPES
+            )
+            elapsed = time.perf_counter() - started
+
+            self.rows += len(batch)
+            self.batch_timings.append((len(batch), elapsed))
+            logger.info(
+                f"Batch {len(self.batch_timings)}: {len(batch)} rows in {elapsed:.3f}s "
+                f"({len(batch) / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+    def commit(self):
+        """Swap the staged rows into the target table in one transaction"""
+        if self.year is None:
+            raise RuntimeError("begin() must be called before commit()")
+
+        columns = ", ".join(PREDICT_DTYPES)
+        started = time.perf_counter()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {self.target_table} WHERE Year = :year"),
+                {"year": self.year}
+            )
+            conn.execute(text(
+                f"INSERT INTO {self.target_table} ({columns}) "
+                f"SELECT {columns} FROM {self.staging_table}"
+            ))
+            predict_table(self.staging_table).drop(conn)
+
+        notify_data_changed("predict")
+        logger.info(
+            f"Swapped {self.rows} rows into {self.target_table} for Year = {self.year} "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        self.year = None
+        return self.rows
+
+    def abort(self):
+        """Drop the staging table, the target table stays untouched"""
+        if self.staging_table is None:
+            return
+        with self.engine.begin() as conn:
+            predict_table(self.staging_table).drop(conn, checkfirst=True)
+        self.year = None
+
+    def load(self, predict_df, year):
+        """begin + write + commit for a frame that is already in memory"""
+        self.begin(year)
+        try:
+            self.write(predict_df)
+            return self.commit()
+        except Exception:
+            self.abort()
+            raise
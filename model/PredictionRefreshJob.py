@@ -0,0 +1,70 @@
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionRefreshJob:
+    """
+    Runs the prediction refresh in a background thread and tracks its status.
+
+    Only one refresh runs at a time; start() while a refresh is running is a no-op.
+    """
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {
+            "state": "idle",
+            "started_at": None,
+            "finished_at": None,
+            "rows": None,
+            "error": None
+        }
+
+    def start(self):
+        """Start a refresh in the background, returns False if one is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+
+            self._status = {
+                "state": "running",
+                "started_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "rows": None,
+                "error": None
+            }
+            self._thread = threading.Thread(target=self._run, name="prediction-refresh", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        try:
+            rows = self.refresh()
+            self._finish("succeeded", rows=rows)
+            logger.info(f"Prediction refresh complete. Rows: {rows}")
+        except Exception as e:
+            self._finish("failed", error=str(e))
+            logger.exception("Prediction refresh failed")
+
+    def _finish(self, state, rows=None, error=None):
+        with self._lock:
+            self._status.update({
+                "state": state,
+                "finished_at": datetime.now().isoformat(),
+                "rows": rows,
+                "error": error
+            })
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def wait(self, timeout=None):
+        """Block until the running refresh (if any) finishes"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,158 @@
+import logging
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+PHASES = ("connect", "execute", "fetch", "build")
+
+
+def fingerprint(statement):
+    """
+    Normalized form of a SQL statement: literals become ?, IN-lists collapse
+    to IN (?...), whitespace is collapsed. Statements differing only by
+    values share one fingerprint.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (?...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class LatencyWindow:
+    """Most recent max_samples durations (seconds) for percentile estimates"""
+
+    def __init__(self, max_samples=1024):
+        self._samples = deque(maxlen=max_samples)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, q):
+        if not self._samples:
+            return 0.0
+        return float(np.percentile(np.fromiter(self._samples, dtype=float), q))
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class StatementStats:
+    """Counters of one statement fingerprint"""
+
+    def __init__(self, statement, max_samples):
+        self.statement = statement
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.latency = LatencyWindow(max_samples)
+
+    def snapshot(self):
+        calls = self.calls or 1
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total / calls * 1000,
+            "p50_ms": self.latency.percentile(50) * 1000,
+            "p95_ms": self.latency.percentile(95) * 1000,
+            "max_ms": self.max * 1000,
+            "phases_ms": {phase: seconds * 1000 for phase, seconds in self.phases.items()}
+        }
+
+
+class QueryStats:
+    """
+    Thread-safe per-fingerprint query timings.
+
+    Every recorded query is split into connect (pool checkout), execute,
+    fetch and build (DataFrame construction) phases. Queries slower than
+    slow_query_ms are written to the "model.QueryStats" log; the latest
+    max_slow_queries of them are also kept in memory. Bound parameters
+    (INNs among them) are included only with log_params=True, otherwise
+    just their number.
+    """
+
+    def __init__(self, slow_query_ms=500, max_samples=1024, max_slow_queries=100, log_params=False):
+        self.slow_query_ms = slow_query_ms
+        self.log_params = log_params
+        self.max_samples = max_samples
+        self._statements = {}
+        self._slow = deque(maxlen=max_slow_queries)
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, statement):
+        # the repositories reuse a small set of statement texts, normalize each once
+        result = self._fingerprints.get(statement)
+        if result is None:
+            result = fingerprint(statement)
+            if len(self._fingerprints) < 10000:
+                self._fingerprints[statement] = result
+        return result
+
+    def record(self, statement, phases, rows=0, size=0, params=None, error=None):
+        """phases: dict of phase name -> seconds"""
+        key = self._fingerprint(statement)
+        elapsed = sum(phases.values())
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key, self.max_samples)
+            stats.calls += 1
+            stats.rows += rows
+            stats.bytes += size
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.latency.add(elapsed)
+            for phase, seconds in phases.items():
+                stats.phases[phase] = stats.phases.get(phase, 0.0) + seconds
+            if error is not None:
+                stats.errors += 1
+
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            entry = {
+                "statement": key,
+                "params": [str(p) for p in params] if params and self.log_params else None,
+                "param_count": len(params) if params else 0,
+                "elapsed_ms": elapsed * 1000,
+                "phases_ms": {phase: seconds * 1000 for phase, seconds in phases.items()},
+                "rows": rows,
+                "error": str(error) if error is not None else None
+            }
+            with self._lock:
+                self._slow.append(entry)
+            shown = entry['params'] if self.log_params else f"<{entry['param_count']} redacted>"
+            logger.warning(f"Slow query {entry['elapsed_ms']:.1f} ms, rows={rows}: {key} params={shown}")
+
+    def top(self, n=10, order="total"):
+        """Top n statements by "total", "p95", "avg" or "calls" """
+        with self._lock:
+            snapshots = [stats.snapshot() for stats in self._statements.values()]
+        sort_key = {"total": "total_ms", "p95": "p95_ms", "avg": "avg_ms", "calls": "calls"}[order]
+        return sorted(snapshots, key=lambda s: s[sort_key], reverse=True)[:n]
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
@@ -0,0 +1,140 @@
+import argparse
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from model.DataEvents import notify_data_changed
+
+
+class RollupPrecomputeJob:
+    """
+    Precompute yearly_growth_general, yearly_growth_median and yearly_stats_median
+    for every tax type in one pass.
+
+    MonthlyTaxData and Predict are read once (with TaxType), split by TaxType
+    plus the all-types rollup stored with TaxType IS NULL, and the three tables
+    are rewritten in a single transaction.
+    """
+
+    MEDIAN_TABLE = "yearly_stats_median"
+
+    def __init__(self, db_engine, repository, growth_loader, median_loader, chunksize=200000):
+        self.db_engine = db_engine
+        self.repository = repository
+        self.growth_loader = growth_loader
+        self.median_loader = median_loader
+        self.aggregator = growth_loader.aggregator
+        self.chunksize = chunksize
+
+    def _read_monthly(self, source):
+        """
+        Stream monthly rows in chunks and keep them in compact dtypes,
+        medians need every row but not the object overhead of a single read_sql
+        """
+        chunks = []
+        for chunk in self.repository.iter_monthly_data(
+                source=source, with_tax_type=True, chunksize=self.chunksize
+        ):
+            chunk["TaxType"] = chunk["TaxType"].astype("category")
+            chunk["Year"] = chunk["Year"].astype("int16")
+            chunk["Month"] = chunk["Month"].astype("int8")
+            chunks.append(chunk)
+
+        if not chunks:
+            return pd.DataFrame(columns=["TaxType", "Year", "Month", "TotalIncome", "TotalTransactions", "TotalTax"])
+        return pd.concat(chunks, ignore_index=True)
+
+    def _groups(self, df_real, df_pred):
+        """(tax_type, real rows, predicted rows); tax_type None is the all-types rollup"""
+        yield None, df_real, df_pred
+
+        real_by_type = dict(tuple(df_real.groupby("TaxType", observed=True))) if not df_real.empty else {}
+        pred_by_type = dict(tuple(df_pred.groupby("TaxType", observed=True))) if not df_pred.empty else {}
+        empty = df_real.iloc[0:0] if not df_real.empty else df_pred.iloc[0:0]
+
+        for tax_type in sorted(set(real_by_type) | set(pred_by_type)):
+            yield (
+                tax_type,
+                real_by_type.get(tax_type, empty),
+                pred_by_type.get(tax_type, empty)
+            )
+
+    def run(self):
+        """Returns {table name: inserted rows}"""
+        started = time.perf_counter()
+
+        df_real = self._read_monthly("real")
+        df_pred = self._read_monthly("predict")
+
+        if df_real.empty and df_pred.empty:
+            print("No data for rollups")
+            return {}
+
+        tables = list(self.growth_loader.GROWTH_TABLES) + [self.MEDIAN_TABLE]
+        inserted = dict.fromkeys(tables, 0)
+
+        engine = self.db_engine.get_engine()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM yearly_growth_general"))
+            conn.execute(text("DELETE FROM yearly_growth_median"))
+            conn.execute(text(f"DELETE FROM dbo.{self.MEDIAN_TABLE}"))
+
+            # the tables are empty now: rows go in without the existing-keys lookups
+            for tax_type, real, pred in self._groups(df_real, df_pred):
+                for table_name, mode in self.growth_loader.GROWTH_TABLES.items():
+                    growth = self.growth_loader.build_growth(real, pred, mode)
+                    inserted[table_name] += self.growth_loader.write_growth(
+                        conn, table_name, growth, tax_type, skip_existing=False
+                    )
+
+                median_df = self.aggregator.aggregate_monthly(
+                    pd.concat([real, pred], ignore_index=True), "median"
+                )
+                inserted[self.MEDIAN_TABLE] += self.median_loader.write_monthly_median(
+                    conn, median_df, tax_type, skip_existing=False
+                )
+
+        notify_data_changed("rollups")
+        print(f"Rollups precomputed in {time.perf_counter() - started:.1f}s: {inserted}")
+        return inserted
+
+
+def main():
+    from model.AggregationService import AggregationService
+    from model.TaxDataRepository import TaxDataRepository
+    from model.YearlyGrowthLoader import YearlyGrowthLoader
+    from model.YearlyMedianLoader import YearlyMedianLoader
+    from model.database import get_db_engine
+
+    parser = argparse.ArgumentParser(description="Precompute growth and median tables for all tax types")
+    parser.add_argument("--every", type=float, default=None,
+                        help="repeat every N minutes instead of running once")
+    args = parser.parse_args()
+
+    db_engine = get_db_engine()
+    repository = TaxDataRepository(db_engine)
+    aggregator = AggregationService()
+    job = RollupPrecomputeJob(
+        db_engine,
+        repository,
+        YearlyGrowthLoader(db_engine, repository, aggregator),
+        YearlyMedianLoader(db_engine, repository, aggregator)
+    )
+
+    while True:
+        try:
+            job.run()
+        except Exception as e:
+            print("Rollup precompute failed:", e)
+            if args.every is None:
+                raise
+        if args.every is None:
+            break
+        time.sleep(args.every * 60)
+
+    db_engine.dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,59 @@
+import time
+
 import pandas as pd
 
 
 class TaxDataRepository:
 
-    def __init__(self, db_engine):
+    def __init__(self, db_engine, freshness_ttl=60):
         self.db_engine = db_engine
+        self.freshness_ttl = freshness_ttl
+        self._freshness = None
+        self._freshness_loaded_at = 0.0
 
     def get_years(self):
         query = "SELECT DISTINCT Year FROM MonthlyTaxData ORDER BY Year"
         return self.db_engine.execute_query(query)
 
+    def get_freshness(self, refresh=False):
+        """
+        Freshness record of the real and predicted data:
+        {'last_real_year', 'last_predict_year', 'predict_rows'}.
+        Fetched with one single-row query and cached for freshness_ttl seconds.
+        """
+        expired = time.monotonic() - self._freshness_loaded_at > self.freshness_ttl
+        if refresh or self._freshness is None or expired:
+            query = """
+                SELECT
+                    (SELECT MAX(Year) FROM MonthlyTaxData) AS LastRealYear,
+                    (SELECT MAX(Year) FROM Predict) AS LastPredictYear,
+                    (SELECT COUNT(*) FROM Predict) AS PredictRows
+            """
+            result = self.db_engine.execute_query(query)
+            if result.empty:
+                return {'last_real_year': None, 'last_predict_year': None, 'predict_rows': 0}
+
+            row = result.iloc[0]
+            self._freshness = {
+                'last_real_year': int(row['LastRealYear']) if pd.notna(row['LastRealYear']) else None,
+                'last_predict_year': int(row['LastPredictYear']) if pd.notna(row['LastPredictYear']) else None,
+                'predict_rows': int(row['PredictRows']) if pd.notna(row['PredictRows']) else 0
+            }
+            self._freshness_loaded_at = time.monotonic()
+        return dict(self._freshness)
+
+    def invalidate_freshness(self):
+        self._freshness = None
+
+    def get_max_real_year(self):
+        return self.get_freshness()['last_real_year']
+
+    def get_max_predict_year(self):
+        return self.get_freshness()['last_predict_year']
+
+    def get_predict_row_count(self):
+        return self.get_freshness()['predict_rows']
+
     def get_taxpayers_count(self, tax_type=None):
         if tax_type is None:
             query = "SELECT COUNT(*) FROM Taxpayer"
@@ -62,7 +106,7 @@ class TaxDataRepository:
         Universal function for getting monthly taxpayer data
         column_name: 'IncomeAmount', 'transactions_count', 'TaxAmount'
         """
-        last_year = self.get_years()  # last year
+        last_year = self.get_max_real_year()
         if tax_type is None:
             query = f"""
                 SELECT SUM([{column_name}]) AS Total
@@ -88,9 +132,16 @@ class TaxDataRepository:
         query = "SELECT * FROM Taxpayer WHERE INN = ?"
         return self.db_engine.execute_query(query, [inn])
 
-    def get_monthly_by_inn(self, inn: str, start_year=None, end_year=None):
-        query = """
+    def get_monthly_by_inn(self, inn: str, start_year=None, end_year=None, with_source=False):
+        """
+        Real and predicted monthly rows of the INN, ordered by Year, Month.
+        with_source adds Source ('real' | 'predict') and TaxType columns.
+        """
+        real_source_cols = "'real' AS Source, m.TaxType," if with_source else ""
+        predict_source_cols = "'predict' AS Source, p.TaxType," if with_source else ""
+        query = f"""
             SELECT 
+                {real_source_cols}
                 m.Year,
                 m.Month,
                 m.IncomeAmount AS TotalIncome,
@@ -103,6 +154,7 @@ class TaxDataRepository:
             UNION ALL
 
             SELECT
+                {predict_source_cols}
                 p.Year,
                 p.Month,
                 p.Income AS TotalIncome,
@@ -126,12 +178,78 @@ class TaxDataRepository:
 
         return self.db_engine.execute_query(query, params)
 
-    def get_predict_data(self):
+    @staticmethod
+    def _in_list(values):
+        return ", ".join("?" * len(values))
+
+    def get_taxpayers_by_inns(self, inns):
+        """Taxpayer rows of all the INNs in one query"""
+        if not inns:
+            return pd.DataFrame()
+        query = f"SELECT * FROM Taxpayer WHERE INN IN ({self._in_list(inns)})"
+        return self.db_engine.execute_query(query, list(inns))
+
+    def get_monthly_by_inns(self, inns):
         """
-            Returns prediction data from Predict table.
-            If year is provided, filters by year.
+        get_monthly_by_inn for many INNs in one set-based query,
+        with an INN column; ordered by INN, Year, Month
+        """
+        if not inns:
+            return pd.DataFrame()
+        in_list = self._in_list(inns)
+        query = f"""
+            SELECT
+                t.INN,
+                m.Year,
+                m.Month,
+                m.IncomeAmount AS TotalIncome,
+                m.transactions_count AS TotalTransactions,
+                m.TaxAmount AS TotalTax
+            FROM MonthlyTaxData m
+            JOIN Taxpayer t ON t.TaxpayerId = m.TaxpayerId
+            WHERE t.INN IN ({in_list})
+
+            UNION ALL
+
+            SELECT
+                p.INN,
+                p.Year,
+                p.Month,
+                p.Income AS TotalIncome,
+                p.Transactions AS TotalTransactions,
+                p.Tax AS TotalTax
+            FROM Predict p
+            WHERE p.INN IN ({in_list})
+
+            ORDER BY INN, Year, Month
+        """
+        return self.db_engine.execute_query(query, list(inns) * 2)
+
+    def get_last_years_by_inns(self, inns):
+        """INN, LastYear: the latest year of real data of each INN, in one query"""
+        if not inns:
+            return pd.DataFrame()
+        query = f"""
+            SELECT t.INN, MAX(m.Year) AS LastYear
+            FROM MonthlyTaxData m
+            JOIN Taxpayer t ON t.TaxpayerId = m.TaxpayerId
+            WHERE t.INN IN ({self._in_list(inns)})
+            GROUP BY t.INN
         """
+        return self.db_engine.execute_query(query, list(inns))
+
+    def get_taxpayer_with_last_year(self, inn: str):
+        """Taxpayer row with LastRealYear - the latest year of its real data (NULL without data)"""
         query = """
+            SELECT
+                t.*,
+                (SELECT MAX(m.Year) FROM MonthlyTaxData m WHERE m.TaxpayerId = t.TaxpayerId) AS LastRealYear
+            FROM Taxpayer t
+            WHERE t.INN = ?
+        """
+        return self.db_engine.execute_query(query, [inn])
+
+    PREDICT_DATA_QUERY = """
                 SELECT 
                     TaxpayerId,
                     FullName,
@@ -149,7 +267,52 @@ class TaxDataRepository:
                     employees_count
                 FROM Predict
             """
-        return self.db_engine.execute_query(query)
+
+    def get_stored_prediction(self, inn: str):
+        """
+        Predict rows of the INN for the year after its latest real data year,
+        empty if the batch forecast does not cover that year
+        """
+        query = self.PREDICT_DATA_QUERY + """
+                WHERE INN = ?
+                  AND Year = (
+                      SELECT MAX(m.Year) + 1
+                      FROM MonthlyTaxData m
+                      JOIN Taxpayer t ON t.TaxpayerId = m.TaxpayerId
+                      WHERE t.INN = ?
+                  )
+                ORDER BY Month
+            """
+        return self.db_engine.execute_query(query, [inn, inn])
+
+    def get_stored_predictions_by_inns(self, inns):
+        """
+        get_stored_prediction for many INNs in one set-based query;
+        ordered by INN, Month
+        """
+        if not inns:
+            return pd.DataFrame()
+        query = self.PREDICT_DATA_QUERY + f"""
+                WHERE INN IN ({self._in_list(inns)})
+                  AND Year = (
+                      SELECT MAX(m.Year) + 1
+                      FROM MonthlyTaxData m
+                      JOIN Taxpayer t ON t.TaxpayerId = m.TaxpayerId
+                      WHERE t.INN = Predict.INN
+                  )
+                ORDER BY INN, Month
+            """
+        return self.db_engine.execute_query(query, list(inns))
+
+    def get_predict_data(self):
+        """
+            Returns prediction data from Predict table.
+        """
+        return self.db_engine.execute_query(self.PREDICT_DATA_QUERY)
+
+    def iter_predict_data(self, chunksize=50000):
+        """Prediction data from Predict table as a stream of DataFrame chunks"""
+        return self.db_engine.iter_query(self.PREDICT_DATA_QUERY, chunksize=chunksize)
 
     def get_monthly_data(
             self,
@@ -157,8 +320,30 @@ class TaxDataRepository:
             tax_type=None,
             aggregate=False,
             start_year=None,
-            end_year=None
+            end_year=None,
+            with_tax_type=False
     ):
+        query, params = self._monthly_data_query(
+            source, tax_type, aggregate, start_year, end_year, with_tax_type
+        )
+        return self.db_engine.execute_query(query, params)
+
+    def iter_monthly_data(
+            self,
+            source="real",  # "real" | "predict"
+            tax_type=None,
+            start_year=None,
+            end_year=None,
+            with_tax_type=False,
+            chunksize=50000
+    ):
+        """Monthly rows (not aggregated) as a stream of DataFrame chunks"""
+        query, params = self._monthly_data_query(
+            source, tax_type, False, start_year, end_year, with_tax_type
+        )
+        return self.db_engine.iter_query(query, params, chunksize=chunksize)
+
+    def _monthly_data_query(self, source, tax_type, aggregate, start_year, end_year, with_tax_type):
         if source == "real":
             table = "MonthlyTaxData"
             income_col = "IncomeAmount"
@@ -172,19 +357,23 @@ class TaxDataRepository:
         else:
             raise ValueError("Invalid source type")
 
+        tax_type_col = "TaxType," if with_tax_type else ""
+
         if aggregate:
             select_part = f"""
                 SELECT 
+                    {tax_type_col}
                     Year,
                     Month,
                     SUM({income_col}) AS TotalIncome,
                     SUM({trans_col}) AS TotalTransactions,
                     SUM({tax_col}) AS TotalTax
             """
-            group_part = "GROUP BY Year, Month"
+            group_part = f"GROUP BY {tax_type_col} Year, Month"
         else:
             select_part = f"""
                 SELECT 
+                    {tax_type_col}
                     Year,
                     Month,
                     {income_col} AS TotalIncome,
@@ -220,7 +409,7 @@ class TaxDataRepository:
                ORDER BY Year, Month
            """
 
-        return self.db_engine.execute_query(query, params)
+        return query, params
 
     def get_yearly_growth_by_type(
             self,
@@ -0,0 +1,97 @@
+class TaxpayerDashboardService:
+    """
+    Everything the dashboard of one taxpayer shows, from a single read of
+    the taxpayer and its monthly history: totals, medians and growth are
+    computed in memory from the same frame; the forecast comes from
+    InnPredictionService (batch forecast, cache or live inference).
+    """
+
+    PARTS = ("taxpayer", "monthly", "yearly_totals", "yearly_median", "yearly_growth", "prediction")
+    HISTORY_PARTS = ("monthly", "yearly_totals", "yearly_median", "yearly_growth")
+
+    def __init__(self, repository, aggregator, predictions):
+        self.repository = repository
+        self.aggregator = aggregator
+        self.predictions = predictions
+
+    @classmethod
+    def parse_parts(cls, value):
+        """?parts=monthly,yearly_growth -> tuple of parts; all of them when empty"""
+        if not value:
+            return cls.PARTS
+        parts = tuple(part.strip() for part in value.split(",") if part.strip())
+        unknown = [part for part in parts if part not in cls.PARTS]
+        if unknown:
+            raise ValueError(f"Unknown parts: {', '.join(unknown)}, expected any of {', '.join(cls.PARTS)}")
+        return parts
+
+    def get_bundle(self, inn, parts=PARTS):
+        """
+        dict of part -> DataFrame (prediction: InnPredictionService.predict
+        result, None without real data); None if the taxpayer does not exist.
+        Reads the taxpayer and its history (real and predicted rows) once:
+        two queries, the prediction is served from them unless it has to be inferred.
+        """
+        taxpayer = self.repository.get_taxpayer(inn)
+        if taxpayer is None or taxpayer.empty:
+            return None
+
+        bundle = {}
+        if "taxpayer" in parts:
+            bundle["taxpayer"] = taxpayer
+        if not set(parts) & (set(self.HISTORY_PARTS) | {"prediction"}):
+            return bundle
+
+        history = self.repository.get_monthly_by_inn(inn, with_source=True)
+        if "prediction" in parts:
+            bundle["prediction"] = self.predictions.predict(inn, taxpayer, history)
+        if not set(parts) & set(self.HISTORY_PARTS):
+            return bundle
+
+        monthly = history.drop(columns=["Source", "TaxType"], errors="ignore")
+        if "monthly" in parts:
+            bundle["monthly"] = monthly
+        if "yearly_totals" in parts:
+            bundle["yearly_totals"] = self.aggregator.aggregate_yearly(monthly, "sum")
+        if "yearly_median" in parts or "yearly_growth" in parts:
+            median = self.aggregator.aggregate_yearly(monthly, "median")
+            if "yearly_median" in parts:
+                bundle["yearly_median"] = median
+            if "yearly_growth" in parts:
+                bundle["yearly_growth"] = self.aggregator.calculate_growth(median)
+        return bundle
+
+    # several taxpayers at once
+
+    @staticmethod
+    def parse_inns(payload, max_inns):
+        """{"inns": [...]} request body -> list of distinct INN strings in request order"""
+        inns = payload.get("inns") if isinstance(payload, dict) else None
+        if not isinstance(inns, list) or not inns:
+            raise ValueError('Expected a JSON body {"inns": [...]} with a non-empty list')
+        inns = list(dict.fromkeys(str(inn).strip() for inn in inns if str(inn).strip()))
+        if len(inns) > max_inns:
+            raise ValueError(f"At most {max_inns} INNs per request, got {len(inns)}")
+        return inns
+
+    @staticmethod
+    def _split_by_inn(df, drop_inn=False):
+        if df is None or df.empty:
+            return {}
+        return {
+            inn: (group.drop(columns="INN") if drop_inn else group).reset_index(drop=True)
+            for inn, group in df.groupby("INN", sort=False)
+        }
+
+    def get_monthly_batch(self, inns):
+        """INN -> monthly history (as get_monthly_by_inn), from one query; INNs without data are left out"""
+        return self._split_by_inn(self.repository.get_monthly_by_inns(inns), drop_inn=True)
+
+    def predict_batch(self, inns):
+        """
+        INN -> {"year", "data", "source"}: forecast for the year after the
+        latest real data year of each taxpayer, as /predict_inn serves it
+        (see InnPredictionService.predict_batch). Unknown INNs and INNs
+        without history are left out.
+        """
+        return self.predictions.predict_batch(inns)
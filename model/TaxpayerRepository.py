@@ -5,6 +5,41 @@ class TaxpayerRepository():
     def __init__(self, db_engine):
         self.db_engine = db_engine
 
+    # columns a keyset page can be ordered by; True - the column is nullable
+    KEYSET_SORT_COLUMNS = {
+        "TaxpayerId": False,
+        "FullName": False,
+        "INN": False,
+        "registration_district": True,
+        "has_employees": False,
+        "employees_count": True
+    }
+
+    @staticmethod
+    def _filters(inn_filter, district_filter, taxpayer_ids=None, inn_match="substring"):
+        """
+        taxpayer_ids: TaxpayerIds already matching inn_filter (from the INN search index),
+        used instead of LIKE; inn_match: "substring" or "prefix"
+        """
+        query = ""
+        params = []
+
+        if taxpayer_ids is not None:
+            if len(taxpayer_ids) == 0:
+                query += " AND 1=0"
+            else:
+                query += f" AND TaxpayerId IN ({', '.join('?' * len(taxpayer_ids))})"
+                params.extend(int(taxpayer_id) for taxpayer_id in taxpayer_ids)
+        elif inn_filter:
+            query += " AND INN LIKE ?"
+            params.append(f"{inn_filter}%" if inn_match == "prefix" else f"%{inn_filter}%")
+
+        if district_filter:
+            query += " AND registration_district = ?"
+            params.append(district_filter)
+
+        return query, params
+
     def get_taxpayers_paginated_raw(
             self,
             page: int,
@@ -12,7 +47,9 @@ class TaxpayerRepository():
             inn_filter: Optional[str],
             district_filter: Optional[str],
             sort_by: str,
-            sort_order: str
+            sort_order: str,
+            taxpayer_ids=None,
+            inn_match: str = "substring"
     ) -> pd.DataFrame:
 
         offset = (page - 1) * page_size
@@ -24,27 +61,112 @@ class TaxpayerRepository():
                 INN,
                 registration_district,
                 has_employees,
-                employees_count,
-                COUNT(*) OVER() as total_count
+                employees_count
             FROM Taxpayer
             WHERE 1=1
         """
 
-        params = []
-
-        if inn_filter:
-            query += " AND INN LIKE ?"
-            params.append(f"%{inn_filter}%")
-
-        if district_filter:
-            query += " AND registration_district = ?"
-            params.append(district_filter)
+        filters, params = self._filters(inn_filter, district_filter, taxpayer_ids, inn_match)
+        query += filters
 
         query += f" ORDER BY {sort_by} {sort_order} OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
         params.extend([offset, page_size])
 
         return self.db_engine.execute_query(query, params=params)
 
+    def count_taxpayers_raw(self, inn_filter: Optional[str], district_filter: Optional[str],
+                            taxpayer_ids=None, inn_match: str = "substring") -> Optional[int]:
+        """Number of taxpayers matching the listing filters, None if the query failed"""
+        query = "SELECT COUNT(*) AS total_count FROM Taxpayer WHERE 1=1"
+        filters, params = self._filters(inn_filter, district_filter, taxpayer_ids, inn_match)
+        query += filters
+
+        df = self.db_engine.execute_query(query, params=params)
+        if df.empty:
+            # COUNT(*) always returns a row, an empty frame is a swallowed query error
+            return None
+        return int(df['total_count'].iloc[0])
+
+    @classmethod
+    def _seek_condition(cls, sort_by, ascending, after):
+        """
+        WHERE condition for rows that follow after = (sort value, TaxpayerId)
+        in ORDER BY sort_by, TaxpayerId (both ascending or both descending).
+        NULLs sort first in ascending order, as in SQL Server and SQLite.
+        """
+        key, taxpayer_id = after
+        op = ">" if ascending else "<"
+
+        if sort_by == "TaxpayerId":
+            return f"TaxpayerId {op} ?", [taxpayer_id]
+
+        # the leading range bound on sort_by alone makes the condition an index seek
+        if not cls.KEYSET_SORT_COLUMNS[sort_by]:
+            return (f"{sort_by} {op}= ? AND ({sort_by} {op} ? OR ({sort_by} = ? AND TaxpayerId {op} ?))",
+                    [key, key, key, taxpayer_id])
+
+        if key is None:
+            if ascending:
+                return f"({sort_by} IS NOT NULL OR ({sort_by} IS NULL AND TaxpayerId > ?))", [taxpayer_id]
+            return f"({sort_by} IS NULL AND TaxpayerId < ?)", [taxpayer_id]
+
+        if ascending:
+            return (f"{sort_by} >= ? AND ({sort_by} > ? OR ({sort_by} = ? AND TaxpayerId > ?))",
+                    [key, key, key, taxpayer_id])
+        return f"({sort_by} < ? OR {sort_by} IS NULL OR ({sort_by} = ? AND TaxpayerId < ?))", [key, key, taxpayer_id]
+
+    def get_taxpayers_keyset_raw(
+            self,
+            limit: int,
+            inn_filter: Optional[str],
+            district_filter: Optional[str],
+            sort_by: str,
+            sort_order: str,
+            after: Optional[tuple] = None,
+            backward: bool = False,
+            taxpayer_ids=None,
+            inn_match: str = "substring"
+    ) -> pd.DataFrame:
+        """
+        Seek pagination: up to limit rows ordered by (sort_by, TaxpayerId)
+        that come after the row after = (sort value, TaxpayerId).
+        With backward=True rows preceding after are returned, nearest first.
+        The cost does not depend on how deep the page is.
+        """
+        if sort_by not in self.KEYSET_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort_by}")
+        if sort_order not in ("ASC", "DESC"):
+            raise ValueError(f"Unsupported sort order: {sort_order}")
+
+        ascending = (sort_order == "ASC") != backward
+        direction = "ASC" if ascending else "DESC"
+
+        query = """
+            SELECT 
+                TaxpayerId,
+                FullName,
+                INN,
+                registration_district,
+                has_employees,
+                employees_count
+            FROM Taxpayer
+            WHERE 1=1
+        """
+
+        filters, params = self._filters(inn_filter, district_filter, taxpayer_ids, inn_match)
+        query += filters
+
+        if after is not None:
+            condition, seek_params = self._seek_condition(sort_by, ascending, after)
+            query += f" AND {condition}"
+            params.extend(seek_params)
+
+        order_by = "TaxpayerId" if sort_by == "TaxpayerId" else f"{sort_by} {direction}, TaxpayerId"
+        query += f" ORDER BY {order_by} {direction} OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+        params.extend([0, limit])
+
+        return self.db_engine.execute_query(query, params=params)
+
     def get_taxpayer_by_inn_raw(self, inn: str) -> pd.DataFrame:
 
         query = """
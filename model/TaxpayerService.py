@@ -1,10 +1,85 @@
+import base64
+import binascii
+import json
+
+import numpy as np
 import pandas as pd
 
+from model.QueryCache import QueryCache
+
+
+def encode_cursor(sort_by, sort_order, key, taxpayer_id, backward=False):
+    """Opaque page cursor: the position (sort value, TaxpayerId) and the ordering it belongs to"""
+    if key is None or pd.isna(key):
+        key = None
+    elif isinstance(key, np.generic):
+        key = key.item()
+    payload = json.dumps(
+        {"s": sort_by, "o": sort_order, "k": key, "id": int(taxpayer_id), "b": backward},
+        separators=(",", ":"), ensure_ascii=False
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the cursor payload dict, ValueError for a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {
+            "sort_by": payload["s"],
+            "sort_order": payload["o"],
+            "after": (payload["k"], int(payload["id"])),
+            "backward": bool(payload["b"])
+        }
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
 
 class TaxpayerService:
 
-    def __init__(self, repository):
+    def __init__(self, repository, count_ttl=30, count_cache=None, inn_index=None):
+        """
+        count_ttl: seconds a total count per (inn_filter, district_filter) is reused,
+        so scrolling through pages does not re-count the table; counts expire by
+        this TTL only, taxpayers are written by the offline loading scripts
+        inn_index: InnSearchIndex resolving INN filters to TaxpayerIds (None - SQL LIKE)
+        """
         self.repository = repository
+        self.count_ttl = count_ttl
+        self.count_cache = count_cache if count_cache is not None else QueryCache(max_entries=1024)
+        self.inn_index = inn_index
+
+    @staticmethod
+    def _clean_inn_filter(inn_filter):
+        """Whitespace-stripped INN filter, None when nothing is left; the index, LIKE and count key all use it"""
+        if inn_filter is None:
+            return None
+        return str(inn_filter).strip() or None
+
+    def _inn_ids(self, inn_filter, inn_match):
+        """TaxpayerIds matching inn_filter from the index, None to filter with LIKE"""
+        if not inn_filter or self.inn_index is None:
+            return None
+        return self.inn_index.search(inn_filter, inn_match)
+
+    def count_taxpayers(self, inn_filter=None, district_filter=None, inn_match='substring', taxpayer_ids=None):
+        """Total of the filtered listing, cached for count_ttl seconds"""
+        inn_filter = self._clean_inn_filter(inn_filter)
+        if taxpayer_ids is not None and not district_filter:
+            return len(taxpayer_ids)
+
+        key = (inn_filter, district_filter, inn_match)
+        hit, total = self.count_cache.get(key)
+        if not hit:
+            total = self.repository.count_taxpayers_raw(
+                inn_filter, district_filter, taxpayer_ids=taxpayer_ids, inn_match=inn_match
+            )
+            if total is None:
+                # failed count: not cached, the next page asks again
+                return 0
+            self.count_cache.set(key, total, self.count_ttl)
+        return total
 
     # pagination
     def get_taxpayers_paginated(
@@ -14,43 +89,126 @@ class TaxpayerService:
             inn_filter=None,
             district_filter=None,
             sort_by='TaxpayerId',
-            sort_order='ASC'
+            sort_order='ASC',
+            with_total=True,
+            inn_match='substring'
     ):
+        """with_total=False skips the count: total and total_pages are None"""
 
+        inn_filter = self._clean_inn_filter(inn_filter)
+        taxpayer_ids = self._inn_ids(inn_filter, inn_match)
         df = self.repository.get_taxpayers_paginated_raw(
             page,
             page_size,
             inn_filter,
             district_filter,
             sort_by,
-            sort_order
+            sort_order,
+            taxpayer_ids=taxpayer_ids,
+            inn_match=inn_match
         )
 
+        total_count = self.count_taxpayers(inn_filter, district_filter, inn_match, taxpayer_ids) if with_total else None
+        total_pages = (total_count + page_size - 1) // page_size if with_total else None
+
         if not isinstance(df, pd.DataFrame) or df.empty:
             return {
                 'data': pd.DataFrame(),
-                'total': 0,
+                'total': total_count,
                 'page': page,
                 'page_size': page_size,
-                'total_pages': 0
+                'total_pages': total_pages
             }
 
-        total_count = int(df['total_count'].iloc[0])
-        data_df = df.drop('total_count', axis=1).copy()
+        data_df = df.copy()
 
         # normalization of types
         data_df['TaxpayerId'] = data_df['TaxpayerId'].astype(int)
         data_df['has_employees'] = data_df['has_employees'].astype(bool)
-        data_df['employees_count'] = data_df['employees_count'].apply(
-            lambda x: int(x) if pd.notna(x) else None
-        )
+        data_df['employees_count'] = data_df['employees_count'].astype('Int64')
 
         return {
             'data': data_df,
             'total': total_count,
             'page': page,
             'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size
+            'total_pages': total_pages
+        }
+
+    # keyset pagination
+    def get_taxpayers_keyset(
+            self,
+            page_size: int,
+            cursor=None,
+            inn_filter=None,
+            district_filter=None,
+            sort_by='TaxpayerId',
+            sort_order='ASC',
+            with_total=True,
+            inn_match='substring'
+    ):
+        """
+        Page of taxpayers after (or before) the cursor position.
+        No cursor - the first page. Returns the page data with
+        next_cursor / prev_cursor (None when there is no such page)
+        and the cached total unless with_total=False.
+        """
+        after = None
+        backward = False
+        if cursor:
+            position = decode_cursor(cursor)
+            if (position['sort_by'], position['sort_order']) != (sort_by, sort_order):
+                raise ValueError("Cursor does not match sortBy/sortOrder")
+            after = position['after']
+            backward = position['backward']
+
+        # one extra row tells whether there is a page beyond this one
+        inn_filter = self._clean_inn_filter(inn_filter)
+        taxpayer_ids = self._inn_ids(inn_filter, inn_match)
+        df = self.repository.get_taxpayers_keyset_raw(
+            page_size + 1,
+            inn_filter,
+            district_filter,
+            sort_by,
+            sort_order,
+            after=after,
+            backward=backward,
+            taxpayer_ids=taxpayer_ids,
+            inn_match=inn_match
+        )
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame()
+
+        has_more = len(df) > page_size
+        data_df = df.iloc[:page_size]
+        if backward:
+            data_df = data_df.iloc[::-1]
+        data_df = data_df.reset_index(drop=True)
+
+        if backward:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, after is not None
+
+        next_cursor = prev_cursor = None
+        if not data_df.empty:
+            first, last = data_df.iloc[0], data_df.iloc[-1]
+            if has_next:
+                next_cursor = encode_cursor(sort_by, sort_order, last[sort_by], last['TaxpayerId'])
+            if has_prev:
+                prev_cursor = encode_cursor(sort_by, sort_order, first[sort_by], first['TaxpayerId'], backward=True)
+
+            data_df = data_df.copy()
+            data_df['TaxpayerId'] = data_df['TaxpayerId'].astype(int)
+            data_df['has_employees'] = data_df['has_employees'].astype(bool)
+            data_df['employees_count'] = data_df['employees_count'].astype('Int64')
+
+        return {
+            'data': data_df,
+            'total': self.count_taxpayers(inn_filter, district_filter, inn_match, taxpayer_ids) if with_total else None,
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
         }
 
     # find by inn
@@ -63,8 +221,6 @@ class TaxpayerService:
 
         df['TaxpayerId'] = df['TaxpayerId'].astype(int)
         df['has_employees'] = df['has_employees'].astype(bool)
-        df['employees_count'] = df['employees_count'].apply(
-            lambda x: int(x) if pd.notna(x) else None
-        )
+        df['employees_count'] = df['employees_count'].astype('Int64')
 
         return df
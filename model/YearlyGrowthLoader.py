@@ -1,90 +1,93 @@
 import pandas as pd
 from sqlalchemy import text
 
+from model.DataEvents import notify_data_changed
+
+
 class YearlyGrowthLoader:
+    # growth table -> yearly aggregation it is built from
+    GROWTH_TABLES = {
+        "yearly_growth_general": "sum",
+        "yearly_growth_median": "median"
+    }
 
     def __init__(self, db_engine, repository, aggregator):
         self.db_engine = db_engine
         self.repository = repository
         self.aggregator = aggregator
 
-    def _record_exists(self, conn, table_name, year, tax_type):
+    def _existing_years(self, conn, table_name, tax_type):
+        """All years already stored for the tax type, in one query"""
         if tax_type is None:
             query = text(f"""
-                SELECT COUNT(1)
+                SELECT [Year]
                 FROM {table_name}
-                WHERE [Year] = :year
-                AND TaxType IS NULL
+                WHERE TaxType IS NULL
             """)
-            result = conn.execute(query, {"year": year}).scalar()
+            result = conn.execute(query)
         else:
             query = text(f"""
-                SELECT COUNT(1)
+                SELECT [Year]
                 FROM {table_name}
-                WHERE [Year] = :year
-                AND TaxType = :taxtype
+                WHERE TaxType = :taxtype
             """)
-            result = conn.execute(query, {
-                "year": year,
-                "taxtype": tax_type
-            }).scalar()
+            result = conn.execute(query, {"taxtype": tax_type})
 
-        return result > 0
-
-    def load_general_growth(self, tax_type=None):
-        df_real = self.repository.get_monthly_data(
-            source="real",
-            tax_type=tax_type,
-            aggregate=False
-        )
-
-        df_pred = self.repository.get_monthly_data(
-            source="predict",
-            tax_type=tax_type,
-            aggregate=False
-        )
+        return {int(row[0]) for row in result}
 
-        if df_real.empty and df_pred.empty:
-            print("No data for general")
-            return
-        yearly_real = self.aggregator.aggregate_yearly(df_real, "sum")
-        yearly_pred = self.aggregator.aggregate_yearly(df_pred, "sum")
+    def build_growth(self, df_real, df_pred, mode):
+        """Yearly totals (sum or median) of real + predicted rows with growth in %"""
+        yearly_real = self.aggregator.aggregate_yearly(df_real, mode)
+        yearly_pred = self.aggregator.aggregate_yearly(df_pred, mode)
         combined = pd.concat([yearly_real, yearly_pred], ignore_index=True)
         combined = combined.sort_values("Year")
-        growth = self.aggregator.calculate_growth(combined)
-        engine = self.db_engine.get_engine()
-        with engine.begin() as conn:
-            for _, row in growth.iterrows():
-
-                year_value = int(row["Year"])
-
-                if self._record_exists(conn, "yearly_growth_general", year_value, tax_type):
-                    print(f"Skip: {year_value} already exists")
-                    continue
-
-                conn.execute(text("""
-                    INSERT INTO yearly_growth_general
-                    ([Year], TaxType,
-                     IncomeTotal, TaxTotal, TransactionTotal,
-                     IncomeGrowth, TaxGrowth, TransactionsGrowth)
-                    VALUES
-                    (:year, :taxtype,
-                     :income_total, :tax_total, :trans_total,
-                     :income_growth, :tax_growth, :trans_growth)
-                """), {
-                    "year": int(row["Year"]),
-                    "taxtype": tax_type,
-                    "income_total": float(row["Income"]),
-                    "tax_total": float(row["Tax"]),
-                    "trans_total": float(row["Transactions"]),
-                    "income_growth": float(row["IncomeGrowth_%"]) if pd.notna(row["IncomeGrowth_%"]) else 0,
-                    "tax_growth": float(row["TaxGrowth_%"]) if pd.notna(row["TaxGrowth_%"]) else 0,
-                    "trans_growth": float(row["TransactionsGrowth_%"]) if pd.notna(row["TransactionsGrowth_%"]) else 0
-                })
-
-        print("yearly_growth_general is full")
+        return self.aggregator.calculate_growth(combined)
+
+    def write_growth(self, conn, table_name, growth, tax_type, skip_existing=True):
+        """
+        Insert growth rows whose year is not stored yet.
+        Existing keys are read with one SELECT (skipped with skip_existing=False,
+        for a table known to be empty), new rows go in with one executemany.
+        Returns the number of inserted rows.
+        """
+        existing = self._existing_years(conn, table_name, tax_type) if skip_existing else set()
+
+        rows = pd.DataFrame({
+            "year": growth["Year"].astype(int),
+            "taxtype": tax_type,
+            "income_total": growth["Income"].astype(float),
+            "tax_total": growth["Tax"].astype(float),
+            "trans_total": growth["Transactions"].astype(float),
+            "income_growth": growth["IncomeGrowth_%"].fillna(0).astype(float),
+            "tax_growth": growth["TaxGrowth_%"].fillna(0).astype(float),
+            "trans_growth": growth["TransactionsGrowth_%"].fillna(0).astype(float)
+        })
+        rows = rows[~rows["year"].isin(existing)]
+
+        if rows.empty:
+            return 0
+
+        conn.execute(text(f"""
+            INSERT INTO {table_name}
+            ([Year], TaxType,
+             IncomeTotal, TaxTotal, TransactionTotal,
+             IncomeGrowth, TaxGrowth, TransactionsGrowth)
+            VALUES
+            (:year, :taxtype,
+             :income_total, :tax_total, :trans_total,
+             :income_growth, :tax_growth, :trans_growth)
+        """), rows.to_dict("records"))
+
+        return len(rows)
+
+    def load_growth(self, tax_type=None, tables=None):
+        """
+        Fill growth tables for one tax type (None - all types)
+        from a single read of real and predicted monthly rows.
+        """
+        if tables is None:
+            tables = list(self.GROWTH_TABLES)
 
-    def load_median_growth(self, tax_type=None):
         df_real = self.repository.get_monthly_data(
             source="real",
             tax_type=tax_type,
@@ -98,44 +101,20 @@ class YearlyGrowthLoader:
         )
 
         if df_real.empty and df_pred.empty:
-            print("No data for median")
+            print("No data for growth")
             return
 
-        yearly_real = self.aggregator.aggregate_yearly(df_real, "median")
-        yearly_pred = self.aggregator.aggregate_yearly(df_pred, "median")
-
-        combined = pd.concat([yearly_real, yearly_pred], ignore_index=True)
-        combined = combined.sort_values("Year")
+        engine = self.db_engine.get_engine()
+        with engine.begin() as conn:
+            for table_name in tables:
+                growth = self.build_growth(df_real, df_pred, self.GROWTH_TABLES[table_name])
+                inserted = self.write_growth(conn, table_name, growth, tax_type)
+                print(f"{table_name}: inserted {inserted}, skipped {len(growth) - inserted}")
 
-        growth = self.aggregator.calculate_growth(combined)
+        notify_data_changed("growth")
 
-        engine = self.db_engine.get_engine()
+    def load_general_growth(self, tax_type=None):
+        self.load_growth(tax_type, ["yearly_growth_general"])
 
-        with engine.begin() as conn:
-            for _, row in growth.iterrows():
-                year_value = int(row["Year"])
-
-                if self._record_exists(conn, "yearly_growth_median", year_value, tax_type):
-                    print(f"Skip: {year_value} already exists")
-                    continue
-                conn.execute(text("""
-                    INSERT INTO yearly_growth_median
-                    ([Year], TaxType,
-                     IncomeTotal, TaxTotal, TransactionTotal,
-                     IncomeGrowth, TaxGrowth, TransactionsGrowth)
-                    VALUES
-                    (:year, :taxtype,
-                     :income_total, :tax_total, :trans_total,
-                     :income_growth, :tax_growth, :trans_growth)
-                """), {
-                    "year": int(row["Year"]),
-                    "taxtype": tax_type,
-                    "income_total": float(row["Income"]),
-                    "tax_total": float(row["Tax"]),
-                    "trans_total": float(row["Transactions"]),
-                    "income_growth": float(row["IncomeGrowth_%"]) if pd.notna(row["IncomeGrowth_%"]) else 0,
-                    "tax_growth": float(row["TaxGrowth_%"]) if pd.notna(row["TaxGrowth_%"]) else 0,
-                    "trans_growth": float(row["TransactionsGrowth_%"]) if pd.notna(row["TransactionsGrowth_%"]) else 0
-                })
-
-        print("yearly_growth_median full")
+    def load_median_growth(self, tax_type=None):
+        self.load_growth(tax_type, ["yearly_growth_median"])
@@ -1,5 +1,8 @@
 import pandas as pd
 from datetime import datetime
+from sqlalchemy import text
+
+from model.DataEvents import notify_data_changed
 
 
 class YearlyMedianLoader:
@@ -9,30 +12,66 @@ class YearlyMedianLoader:
         self.repository = repository
         self.aggregator = aggregator
 
-    def _median_exists(self, year: int, month: int, tax_type=None):
+    def _existing_keys(self, conn, tax_type=None):
+        """All (Year, Month) pairs already stored for the tax type, in one query"""
 
         if tax_type is None:
-            query = """
-                SELECT COUNT(*) as Cnt
+            query = text("""
+                SELECT [Year], [Month]
                 FROM dbo.yearly_stats_median
-                WHERE [Year] = ?
-                  AND [Month] = ?
-                  AND TaxType IS NULL
-            """
-            params = [year, month]
+                WHERE TaxType IS NULL
+            """)
+            result = conn.execute(query)
         else:
-            query = """
-                SELECT COUNT(*) as Cnt
+            query = text("""
+                SELECT [Year], [Month]
                 FROM dbo.yearly_stats_median
-                WHERE [Year] = ?
-                  AND [Month] = ?
-                  AND TaxType = ?
-            """
-            params = [year, month, tax_type]
+                WHERE TaxType = :taxtype
+            """)
+            result = conn.execute(query, {"taxtype": tax_type})
+
+        return pd.DataFrame(result.fetchall(), columns=["Year", "Month"])
+
+    def write_monthly_median(self, conn, median_df, tax_type=None, skip_existing=True):
+        """
+        Insert monthly medians whose (Year, Month) is not stored yet for the tax type.
+        skip_existing=False inserts every row without reading the stored keys,
+        for a table known to be empty.
+        Returns the number of inserted rows.
+        """
+        if skip_existing:
+            existing = self._existing_keys(conn, tax_type)
+        else:
+            existing = pd.DataFrame()
+
+        if not existing.empty:
+            existing_keys = pd.MultiIndex.from_frame(existing.astype(int))
+            median_keys = pd.MultiIndex.from_frame(median_df[["Year", "Month"]].astype(int))
+            median_df = median_df[~median_keys.isin(existing_keys)]
+
+        if median_df.empty:
+            print("No new rows to insert")
+            return 0
+
+        insert_df = pd.DataFrame({
+            "Year": median_df["Year"].astype(int),
+            "Month": median_df["Month"].astype(int),
+            "TaxType": tax_type,
+            "IncomeMedian": median_df["Income"].astype(float),
+            "TaxMedian": median_df["Tax"].astype(float),
+            "TransactionsMedian": median_df["Transactions"].astype(float),
+            "CreatedAt": datetime.now()
+        })
 
-        df = self.db_engine.execute_query(query, params)
+        insert_df.to_sql(
+            "yearly_stats_median",
+            conn,
+            schema=self.db_engine.schema,
+            if_exists="append",
+            index=False
+        )
 
-        return not df.empty and int(df.iloc[0]["Cnt"]) > 0
+        return len(insert_df)
 
     def load_monthly_median(self, tax_type=None):
 
@@ -54,46 +93,17 @@ class YearlyMedianLoader:
             print("No data for median (real + predict)")
             return
 
-        median_df = self.aggregator.aggregate_yearly(df, "median")
+        median_df = self.aggregator.aggregate_monthly(df, "median")
 
         if median_df.empty:
             print("No data after aggregation")
             return
 
         engine = self.db_engine.get_engine()
-        rows_to_insert = []
-
-        for _, row in median_df.iterrows():
+        with engine.begin() as conn:
+            inserted = self.write_monthly_median(conn, median_df, tax_type)
 
-            year = int(row["Year"])
-            month = int(row["Month"])
-
-            if self._median_exists(year, month, tax_type):
-                print(f"⚠ Already exists: {year}-{month}, tax_type={tax_type}")
-                continue
-
-            rows_to_insert.append({
-                "Year": year,
-                "Month": month,
-                "TaxType": tax_type,
-                "IncomeMedian": float(row["Income"]),
-                "TaxMedian": float(row["Tax"]),
-                "TransactionsMedian": float(row["Transactions"]),
-                "CreatedAt": datetime.now()
-            })
-
-        if not rows_to_insert:
-            print("No new rows to insert")
-            return
-
-        insert_df = pd.DataFrame(rows_to_insert)
-
-        insert_df.to_sql(
-            "yearly_stats_median",
-            engine,
-            schema="dbo",
-            if_exists="append",
-            index=False
-        )
+        notify_data_changed("median")
 
-        print(f"✅ Inserted rows: {len(insert_df)}")
+        if inserted:
+            print(f"✅ Inserted rows: {inserted}")
@@ -1,48 +1,367 @@
-from sqlalchemy import create_engine, text
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import StaticPool
 import pandas as pd
 
+from config import Config
+from model.QueryStats import QueryStats
+
+_SCHEMA_PREFIX = re.compile(r"\bdbo\.", re.IGNORECASE)
+_OFFSET_FETCH = re.compile(r"OFFSET\s+\?\s+ROWS\s+FETCH\s+NEXT\s+\?\s+ROWS\s+ONLY", re.IGNORECASE)
+
+
+def translate_for_sqlite(statement, parameters):
+    """
+    Rewrite the SQL Server dialect used across the repositories for SQLite:
+    - dbo. schema prefixes are dropped (SQLite has a single schema);
+    - OFFSET ? ROWS FETCH NEXT ? ROWS ONLY becomes LIMIT ? OFFSET ?, the two
+      parameters are swapped (they are always the last two of the statement).
+    [Year] style quoting is understood by SQLite as is.
+    """
+    statement = _SCHEMA_PREFIX.sub("", statement)
+    if _OFFSET_FETCH.search(statement):
+        statement = _OFFSET_FETCH.sub("LIMIT ? OFFSET ?", statement)
+        parameters = list(parameters)
+        parameters[-2], parameters[-1] = parameters[-1], parameters[-2]
+        parameters = tuple(parameters)
+    return statement, parameters
+
+
+class PoolMetrics:
+    """Checkout wait time and saturation of a connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_checked_out = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checked_out(self, checked_out):
+        with self._lock:
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "peak_checked_out": self.peak_checked_out
+            }
+
 
 class DatabaseEngine:
+    BACKENDS = ("mssql", "sqlite")
+
     def __init__(self, server="localhost", database="Taxpayer_Database_DiplomaProject",
-                 driver="ODBC Driver 17 for SQL Server"):
+                 driver="ODBC Driver 17 for SQL Server", pool_size=5, max_overflow=10,
+                 pool_timeout=30, pool_pre_ping=True, pool_recycle=1800,
+                 backend="mssql", path=None, slow_query_ms=500, log_query_params=False):
+        """
+        backend: "mssql" - SQL Server through pyodbc (trusted connection);
+                 "sqlite" - embedded SQLite file at path (":memory:" for a private database)
+        slow_query_ms: queries slower than this are logged (None disables the slow-query log)
+        log_query_params: include bound parameter values in the slow-query log
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown database backend: {backend}")
+        self.backend = backend
+        self.path = path
+        # schema of the tables, for APIs that take it separately (DataFrame.to_sql)
+        self.schema = "dbo" if backend == "mssql" else None
         self.server = server
         self.database = database
         self.driver = driver
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_recycle = pool_recycle
         self.engine = None
+        self.pool_metrics = PoolMetrics()
+        self.query_stats = QueryStats(slow_query_ms=slow_query_ms, log_params=log_query_params)
+        self._engine_lock = threading.Lock()
 
     def get_engine(self):
         """Create or return exist SQLAlchemy engine"""
         if self.engine is None:
-            connection_string = (
-                f"mssql+pyodbc://@{self.server}/{self.database}?"
-                f"trusted_connection=yes&"
-                f"driver={self.driver.replace(' ', '+')}"
-            )
-            try:
-                self.engine = create_engine(connection_string, fast_executemany=True)
-            except Exception as e:
-                print(f"The error in create engine: {e}")
-                return None
+            with self._engine_lock:
+                if self.engine is None:
+                    self.engine = self._create_engine()
         return self.engine
 
+    def _create_engine(self):
+        try:
+            if self.backend == "sqlite":
+                engine = self._create_sqlite_engine()
+            else:
+                engine = self._create_mssql_engine()
+        except Exception as e:
+            print(f"The error in create engine: {e}")
+            return None
+
+        if hasattr(engine.pool, "checkedout"):
+            event.listen(
+                engine, "checkout",
+                lambda dbapi_conn, record, proxy: self.pool_metrics.record_checked_out(engine.pool.checkedout())
+            )
+        return engine
+
+    def _create_mssql_engine(self):
+        connection_string = (
+            f"mssql+pyodbc://@{self.server}/{self.database}?"
+            f"trusted_connection=yes&"
+            f"driver={self.driver.replace(' ', '+')}"
+        )
+        return create_engine(
+            connection_string,
+            fast_executemany=True,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=self.pool_pre_ping,
+            pool_recycle=self.pool_recycle
+        )
+
+    def _create_sqlite_engine(self):
+        if not self.path:
+            raise ValueError("path is required for the sqlite backend")
+
+        if self.path == ":memory:":
+            # one shared connection, otherwise every checkout sees an empty database
+            engine = create_engine(
+                "sqlite://",
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool
+            )
+        else:
+            engine = create_engine(
+                f"sqlite:///{self.path}",
+                connect_args={"check_same_thread": False},
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_pre_ping=self.pool_pre_ping,
+                pool_recycle=self.pool_recycle
+            )
+
+        event.listen(
+            engine, "before_cursor_execute",
+            lambda conn, cursor, statement, parameters, context, executemany:
+                translate_for_sqlite(statement, parameters),
+            retval=True
+        )
+        return engine
+
+    @contextmanager
+    def connect(self):
+        """Pooled connection; time spent waiting for the checkout is recorded"""
+        engine = self.get_engine()
+        started = time.perf_counter()
+        try:
+            conn = engine.connect()
+        except PoolTimeoutError:
+            self.pool_metrics.record_timeout()
+            raise
+        self.pool_metrics.record_wait(time.perf_counter() - started)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _normalize_params(params):
+        if isinstance(params, list):
+            return tuple(params)
+        return params
+
     def execute_query(self, query, params=None):
-        """Execute SQL-query and return DataFrame"""
+        """
+        Execute SQL-query and return DataFrame.
+        Connect, execute, fetch and DataFrame build times, rows and frame size
+        are recorded in query_stats.
+        """
         engine = self.get_engine()
         if engine is None:
             return pd.DataFrame()
 
+        params = self._normalize_params(params)
+        phases = {}
+        rows = size = 0
+        error = None
+        started = time.perf_counter()
         try:
-            with engine.connect() as conn:
-                if params is not None:
-                    if isinstance(params, list):
-                        params = tuple(params)
-                return pd.read_sql(query, conn, params=params)
+            with self.connect() as conn:
+                now = time.perf_counter()
+                phases["connect"], started = now - started, now
+
+                if params is None:
+                    result = conn.exec_driver_sql(query)
+                else:
+                    result = conn.exec_driver_sql(query, params)
+                now = time.perf_counter()
+                phases["execute"], started = now - started, now
+
+                records = result.fetchall()
+                columns = list(result.keys())
+                now = time.perf_counter()
+                phases["fetch"], started = now - started, now
+
+                # same construction as pd.read_sql
+                df = pd.DataFrame.from_records(records, columns=columns, coerce_float=True)
+                phases["build"] = time.perf_counter() - started
+
+                rows = len(df)
+                size = int(df.memory_usage(index=False, deep=True).sum())
+                return df
         except Exception as e:
+            error = e
             print(f"Request execution error: {e}")
             return pd.DataFrame()
+        finally:
+            self.query_stats.record(query, phases, rows=rows, size=size, params=params, error=error)
+
+    def iter_query(self, query, params=None, chunksize=50000):
+        """
+        Execute SQL-query and yield the result as DataFrame chunks of chunksize rows.
+        Rows are fetched from a streaming cursor, so memory stays bounded by one chunk.
+        Unlike execute_query, errors are raised.
+        Time spent outside the generator (in the consumer) is not counted.
+        """
+        params = self._normalize_params(params)
+        phases = dict.fromkeys(("connect", "fetch"), 0.0)
+        rows = size = 0
+        error = None
+        started = time.perf_counter()
+        try:
+            with self.connect() as conn:
+                phases["connect"] = time.perf_counter() - started
+                conn = conn.execution_options(stream_results=True)
+                started = time.perf_counter()
+                for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+                    phases["fetch"] += time.perf_counter() - started
+                    rows += len(chunk)
+                    size += int(chunk.memory_usage(index=False, deep=True).sum())
+                    yield chunk
+                    started = time.perf_counter()
+                phases["fetch"] += time.perf_counter() - started
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.query_stats.record(query, phases, rows=rows, size=size, params=params, error=error)
+
+    def iter_rows(self, query, params=None, batch_size=10000):
+        """
+        Execute SQL-query and yield result rows one by one,
+        fetching batch_size rows at a time from a streaming cursor.
+        Errors are raised and, like the rows, recorded in query_stats
+        (no frame is built, so no size is recorded).
+        """
+        params = self._normalize_params(params)
+        phases = dict.fromkeys(("connect", "execute", "fetch"), 0.0)
+        rows = 0
+        error = None
+        started = time.perf_counter()
+        try:
+            with self.connect() as conn:
+                now = time.perf_counter()
+                phases["connect"], started = now - started, now
+
+                conn = conn.execution_options(stream_results=True)
+                if params is None:
+                    result = conn.exec_driver_sql(query)
+                else:
+                    result = conn.exec_driver_sql(query, params)
+                now = time.perf_counter()
+                phases["execute"], started = now - started, now
+
+                for partition in result.partitions(batch_size):
+                    phases["fetch"] += time.perf_counter() - started
+                    rows += len(partition)
+                    yield from partition
+                    started = time.perf_counter()
+                phases["fetch"] += time.perf_counter() - started
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.query_stats.record(query, phases, rows=rows, params=params, error=error)
+
+    def pool_status(self):
+        """Pool configuration, current usage and checkout statistics"""
+        status = {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle
+        }
+        status.update(self.pool_metrics.snapshot())
+
+        pool = self.engine.pool if self.engine is not None else None
+        if pool is not None and hasattr(pool, "checkedout"):
+            capacity = self.pool_size + self.max_overflow
+            status.update({
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "saturation": pool.checkedout() / capacity if capacity else None
+            })
+        return status
+
+    def release_idle_connections(self):
+        """Close pooled idle connections; connections in use finish normally"""
+        if self.engine:
+            self.engine.dispose()
 
     def dispose_engine(self):
         """Close engine"""
         if self.engine:
             self.engine.dispose()
             self.engine = None
+
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_db_engine():
+    """Application-scoped DatabaseEngine configured from Config, one pool per process"""
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = DatabaseEngine(
+                    server=Config.DB_SERVER,
+                    database=Config.DB_DATABASE,
+                    driver=Config.DB_DRIVER,
+                    pool_size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_MAX_OVERFLOW,
+                    pool_timeout=Config.DB_POOL_TIMEOUT,
+                    pool_pre_ping=Config.DB_POOL_PRE_PING,
+                    pool_recycle=Config.DB_POOL_RECYCLE,
+                    backend=Config.DB_BACKEND,
+                    path=Config.DB_PATH,
+                    slow_query_ms=Config.SLOW_QUERY_MS if Config.SLOW_QUERY_MS >= 0 else None,
+                    log_query_params=Config.SLOW_QUERY_LOG_PARAMS
+                )
+    return _shared_engine
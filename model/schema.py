@@ -0,0 +1,124 @@
+"""
+Table definitions of the tax database.
+
+Used to create the schema on an embedded backend (SQLite) so the services,
+loaders and the Flask app can run and be benchmarked without SQL Server:
+
+    python -m model.schema taxpayers.db
+"""
+import argparse
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Unicode,
+    create_engine
+)
+
+from model.PredictBulkLoader import predict_table
+
+metadata = MetaData()
+
+Taxpayer = Table(
+    "Taxpayer", metadata,
+    Column("TaxpayerId", Integer, primary_key=True, autoincrement=True),
+    Column("FullName", Unicode(255), nullable=False),
+    Column("PassportNumber", String(20)),
+    Column("INN", String(12), nullable=False, unique=True),
+    Column("TaxpayerType", String(10), nullable=False),
+    Column("registration_district", Unicode(100)),
+    Column("activity_type", Unicode(50)),
+    Column("has_employees", Boolean, nullable=False, default=False),
+    Column("employees_count", Integer),
+    # keyset pagination of /api/taxpayers seeks on (sort column, TaxpayerId)
+    Index("IX_Taxpayer_FullName_TaxpayerId", "FullName", "TaxpayerId"),
+    Index("IX_Taxpayer_District_TaxpayerId", "registration_district", "TaxpayerId"),
+    Index("IX_Taxpayer_EmployeesCount_TaxpayerId", "employees_count", "TaxpayerId")
+)
+
+MonthlyTaxData = Table(
+    "MonthlyTaxData", metadata,
+    Column("RecordId", Integer, primary_key=True, autoincrement=True),
+    Column("TaxpayerId", Integer, ForeignKey("Taxpayer.TaxpayerId"), nullable=False),
+    Column("Year", Integer, nullable=False),
+    Column("Month", Integer, nullable=False),
+    Column("TaxType", String(10), nullable=False),
+    Column("IncomeAmount", Float),
+    Column("TaxAmount", Float),
+    Column("season", String(10)),
+    Column("transactions_count", Integer),
+    Index("IX_MonthlyTaxData_TaxpayerId", "TaxpayerId"),
+    Index("IX_MonthlyTaxData_TaxType_Year_Month", "TaxType", "Year", "Month")
+)
+
+Predict = predict_table("Predict", metadata)
+Index("IX_Predict_Year", Predict.c.Year)
+Index("IX_Predict_INN", Predict.c.INN)
+
+
+def _growth_table(name):
+    return Table(
+        name, metadata,
+        Column("Id", Integer, primary_key=True, autoincrement=True),
+        Column("Year", Integer, nullable=False),
+        Column("TaxType", String(10)),
+        Column("IncomeTotal", Float),
+        Column("TaxTotal", Float),
+        Column("TransactionTotal", Float),
+        Column("IncomeGrowth", Float),
+        Column("TaxGrowth", Float),
+        Column("TransactionsGrowth", Float)
+    )
+
+
+yearly_growth_general = _growth_table("yearly_growth_general")
+yearly_growth_median = _growth_table("yearly_growth_median")
+
+yearly_stats_median = Table(
+    "yearly_stats_median", metadata,
+    Column("Id", Integer, primary_key=True, autoincrement=True),
+    Column("Year", Integer, nullable=False),
+    Column("Month", Integer, nullable=False),
+    Column("TaxType", String(10)),
+    Column("IncomeMedian", Float),
+    Column("TaxMedian", Float),
+    Column("TransactionsMedian", Float),
+    Column("CreatedAt", DateTime)
+)
+
+model_metrics = Table(
+    "model_metrics", metadata,
+    Column("Id", Integer, primary_key=True, autoincrement=True),
+    Column("ModelName", Unicode(100), nullable=False),
+    Column("TargetName", Unicode(50), nullable=False),
+    Column("DatasetType", Unicode(20)),
+    Column("MAE", Float),
+    Column("RMSE", Float),
+    Column("MSE", Float),
+    Column("R2", Float),
+    Column("MAPE", Float),
+    Column("MedianAE", Float),
+    Column("MaxError", Float),
+    Column("Observations", Integer),
+    Column("ModelVersion", Unicode(50)),
+    Column("TaxType", String(10)),
+    Column("CreatedAt", DateTime)
+)
+
+
+def create_schema(engine):
+    """Create all tables and indexes that do not exist yet"""
+    metadata.create_all(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the tax database schema in a SQLite file")
+    parser.add_argument("path", help="SQLite database file")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.path}")
+    create_schema(engine)
+    engine.dispose()
+    print(f"Schema created in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ from app import create_app
 @pytest.fixture
 def app():
     app = create_app({
-        "TESTING": True
+        "TESTING": True,
+        "PREDICTIONS_ON_STARTUP": "off"
     })
     yield app
 
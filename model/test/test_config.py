@@ -0,0 +1,23 @@
+import pytest
+
+from config import _env_flag
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("true", True), ("Yes", True), (" ON ", True),
+    ("0", False), ("false", False), ("NO", False), ("off", False)
+])
+def test_env_flag_spellings(monkeypatch, value, expected):
+    monkeypatch.setenv("DB_POOL_PRE_PING", value)
+    assert _env_flag("DB_POOL_PRE_PING", not expected) is expected
+
+
+def test_env_flag_default_and_invalid_value(monkeypatch):
+    monkeypatch.delenv("DB_POOL_PRE_PING", raising=False)
+    assert _env_flag("DB_POOL_PRE_PING", True) is True
+    monkeypatch.setenv("DB_POOL_PRE_PING", "")
+    assert _env_flag("DB_POOL_PRE_PING", False) is False
+
+    monkeypatch.setenv("DB_POOL_PRE_PING", "enabled")
+    with pytest.raises(ValueError, match="DB_POOL_PRE_PING"):
+        _env_flag("DB_POOL_PRE_PING", True)
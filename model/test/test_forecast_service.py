@@ -0,0 +1,156 @@
+from concurrent.futures import Future
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model.BatchForecastEngine import BatchForecastEngine
+from model.ForecastService import ForecastService
+
+
+def build_future_rows(taxpayers_df, target_year):
+    """Reference: the per-taxpayer loop the frame builder replaced"""
+    rows = []
+    for _, taxpayer in taxpayers_df.iterrows():
+        for month in range(1, 13):
+            rows.append({
+                'TaxpayerId': taxpayer['TaxpayerId'],
+                'FullName': taxpayer.get('FullName', ''),
+                'INN': taxpayer.get('INN', ''),
+                'Year': target_year,
+                'Month': month,
+                'season': ForecastService.get_season(month),
+                'TaxType': taxpayer.get('TaxType', taxpayer.get('TaxpayerType')),
+                'TaxpayerType': taxpayer['TaxpayerType'],
+                'activity_type': taxpayer['activity_type'],
+                'registration_district': taxpayer['registration_district'],
+                'has_employees': taxpayer['has_employees'],
+                'employees_count': taxpayer['employees_count']
+            })
+    return pd.DataFrame(rows)
+
+
+def make_taxpayers():
+    return pd.DataFrame({
+        'TaxpayerId': [7, 3, 11],
+        'FullName': ['Ivanov', 'Petrov', 'Sidorov'],
+        'INN': ['770000000001', '770000000002', '770000000003'],
+        'TaxpayerType': ['IPP', 'SZ', 'IP15'],
+        'activity_type': ['IT', 'TRADE', 'SERVICES'],
+        'registration_district': ['Central', 'North', 'South'],
+        'has_employees': [True, False, True],
+        'employees_count': [3, np.nan, 12],
+        'TaxType': ['IPP', 'SZ', 'IPOS']
+    }, index=[40, 10, 25])
+
+
+def test_future_frame_matches_row_loop():
+    taxpayers = make_taxpayers()
+    expected = build_future_rows(taxpayers, 2025)
+    result = ForecastService.build_future_frame(taxpayers, 2025)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_future_frame_falls_back_to_taxpayer_type():
+    taxpayers = make_taxpayers().drop(columns=['TaxType', 'FullName'])
+    expected = build_future_rows(taxpayers, 2025)
+    result = ForecastService.build_future_frame(taxpayers, 2025)
+    pd.testing.assert_frame_equal(result, expected)
+    assert (result['TaxType'] == result['TaxpayerType']).all()
+
+
+class RowSumModel:
+    """Stand-in pipeline: predicts Month * 10 + employees_count and counts rows seen"""
+
+    def __init__(self):
+        self.rows_seen = 0
+
+    def predict(self, X):
+        self.rows_seen += len(X)
+        return (X['Month'] * 10 + X['employees_count'].fillna(0)).to_numpy(dtype=float)
+
+
+def make_forecaster(monkeypatch, deduplicate):
+    monkeypatch.setattr(ForecastService, "load_models", lambda self: None)
+    forecaster = ForecastService(models_path="", deduplicate=deduplicate)
+    forecaster.income_model = RowSumModel()
+    forecaster.transactions_model = RowSumModel()
+    forecaster.tax_model = RowSumModel()
+    return forecaster
+
+
+def test_deduplicated_prediction_matches_full_prediction(monkeypatch):
+    taxpayers = pd.concat([make_taxpayers()] * 50, ignore_index=True)
+    taxpayers['TaxpayerId'] = range(len(taxpayers))
+
+    full = make_forecaster(monkeypatch, deduplicate=False)
+    deduplicated = make_forecaster(monkeypatch, deduplicate=True)
+
+    expected, expected_yearly = full.predict_for_taxpayers(taxpayers, 2025)
+    result, result_yearly = deduplicated.predict_for_taxpayers(taxpayers, 2025)
+
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(result_yearly, expected_yearly)
+    assert full.income_model.rows_seen == 150 * 12
+    assert deduplicated.income_model.rows_seen == 3 * 12
+
+
+def test_batch_engine_chunks_match_single_call(monkeypatch):
+    taxpayers = pd.concat([make_taxpayers()] * 5, ignore_index=True)
+    taxpayers['TaxpayerId'] = range(len(taxpayers))
+    forecaster = make_forecaster(monkeypatch, deduplicate=True)
+
+    expected, _ = forecaster.predict_for_taxpayers(taxpayers, 2025)
+    chunks = []
+    rows = BatchForecastEngine(forecaster, workers=1, chunk_size=4).run(taxpayers, 2025, chunks.append)
+
+    assert rows == len(expected)
+    assert [len(chunk) for chunk in chunks] == [48, 48, 48, 36]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_batch_engine_process_pool_keeps_chunk_order(tmp_path):
+    # pool workers load the models from models_path in _init_worker
+    for filename in ForecastService.MODEL_FILES.values():
+        joblib.dump(RowSumModel(), tmp_path / filename)
+    forecaster = ForecastService(models_path=str(tmp_path))
+    taxpayers = pd.concat([make_taxpayers()] * 4, ignore_index=True)
+    taxpayers['TaxpayerId'] = range(len(taxpayers))
+
+    expected, _ = forecaster.predict_for_taxpayers(taxpayers, 2025)
+    chunks = []
+    rows = BatchForecastEngine(forecaster, workers=2, chunk_size=2).run(taxpayers, 2025, chunks.append)
+
+    assert rows == len(expected) == 12 * 12
+    assert len(chunks) == 6
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+class RecordingPool:
+    """Runs submitted chunks inline and tracks how many results are not consumed yet"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def submit(self, fn, chunk, target_year):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future = Future()
+        future.set_result(chunk.assign(Year=target_year))
+        return future
+
+
+def test_batch_engine_bounds_chunks_in_flight():
+    taxpayers = pd.concat([make_taxpayers()] * 10, ignore_index=True)
+    engine = BatchForecastEngine(forecaster=None, workers=2, chunk_size=1)
+    pool = RecordingPool()
+
+    results = []
+    for result in engine._iter_pool_results(pool, taxpayers, 2025, workers=2):
+        results.append(result)
+        pool.in_flight -= 1
+
+    assert pool.max_in_flight == 4
+    assert len(results) == 30
+    pd.testing.assert_frame_equal(pd.concat(results), taxpayers.assign(Year=2025))
@@ -0,0 +1,50 @@
+from flask import Blueprint, Flask, jsonify
+
+from model.DataEvents import data_version, notify_data_changed
+from routes.http_cache import register_etag_caching
+
+
+def make_client(calls):
+    bp = Blueprint("series", __name__)
+
+    @bp.route("/series")
+    def get_series():
+        calls.append(1)
+        return jsonify({"success": True})
+
+    @bp.route("/status")
+    def get_status():
+        return jsonify({"success": True})
+
+    register_etag_caching(bp, version=data_version, max_ages={"get_series": 60}, exempt=("get_status",))
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+def test_if_none_match_is_answered_without_running_the_view():
+    calls = []
+    client = make_client(calls)
+
+    response = client.get("/series?year=2024")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "max-age=60"
+
+    not_modified = client.get("/series?year=2024", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert len(calls) == 1
+
+    assert client.get("/series?year=2025").headers["ETag"] != etag
+    assert client.get("/status").headers.get("ETag") is None
+
+
+def test_data_change_invalidates_etag():
+    client = make_client([])
+    etag = client.get("/series").headers["ETag"]
+
+    notify_data_changed("predict")
+
+    response = client.get("/series", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
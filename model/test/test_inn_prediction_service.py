@@ -0,0 +1,134 @@
+import pandas as pd
+import pytest
+
+from model.InnPredictionService import InnPredictionService
+
+
+class StubRepository:
+    def __init__(self):
+        self.stored = pd.DataFrame()
+        self.calls = []
+
+    def get_stored_prediction(self, inn):
+        return self.stored
+
+    def get_taxpayer_with_last_year(self, inn):
+        if inn == "0000":
+            return pd.DataFrame()
+        return pd.DataFrame({"TaxpayerId": [1], "INN": [inn], "LastRealYear": [2024]})
+
+
+    def get_taxpayers_by_inns(self, inns):
+        self.calls.append("taxpayers")
+        taxpayers = pd.DataFrame({"TaxpayerId": [1, 2, 3], "INN": ["7701", "7702", "7703"]})
+        return taxpayers[taxpayers["INN"].isin(inns)]
+
+    def get_last_years_by_inns(self, inns):
+        self.calls.append("last_years")
+        return pd.DataFrame({"INN": ["7701", "7702", "7703"], "LastYear": [2024, 2023, 2024]})
+
+    def get_stored_predictions_by_inns(self, inns):
+        self.calls.append(("stored", sorted(inns)))
+        return self.stored[self.stored["INN"].isin(inns)]
+
+
+class CountingForecaster:
+    model_version = "v1"
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+
+    def predict_for_taxpayers(self, taxpayers_df, target_year):
+        self.calls += 1
+        self.batches.append((target_year, taxpayers_df["INN"].tolist()))
+        assert not {"LastRealYear", "LastYear", "TargetYear"} & set(taxpayers_df.columns)
+        rows = taxpayers_df.loc[taxpayers_df.index.repeat(2)].reset_index(drop=True)
+        return rows.assign(Year=target_year, Month=[1, 2] * len(taxpayers_df), PredictedTax=1.0), None
+
+    def from_predict_frame(self, predict_df):
+        return predict_df.rename(columns={"Tax": "PredictedTax"})
+
+
+@pytest.fixture
+def repository():
+    return StubRepository()
+
+
+@pytest.fixture
+def forecaster():
+    return CountingForecaster()
+
+
+def test_serves_stored_then_cache_then_inference(repository, forecaster):
+    service = InnPredictionService(repository, forecaster)
+
+    first = service.predict("7701")
+    second = service.predict("7701")
+    assert (first["source"], second["source"]) == ("inference", "cache")
+    assert first["year"] == second["year"] == 2025
+    assert forecaster.calls == 1
+
+    repository.stored = pd.DataFrame({"INN": ["7701"], "Year": [2025], "Month": [1], "Tax": [2.0]})
+    stored = service.predict("7701")
+    assert stored["source"] == "predict_table"
+    assert stored["data"]["PredictedTax"].tolist() == [2.0]
+
+    stats = service.stats()
+    assert stats["requests"] == 3
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["sources"]["inference"]["requests"] == 1
+
+
+def test_cache_is_keyed_by_model_version(repository, forecaster):
+    service = InnPredictionService(repository, forecaster)
+    service.predict("7701")
+
+    forecaster.model_version = "v2"
+    assert service.predict("7701")["source"] == "inference"
+    assert service.predict("7701")["source"] == "cache"
+    assert forecaster.calls == 2
+
+
+def test_unknown_taxpayer(repository, forecaster):
+    assert InnPredictionService(repository, forecaster).predict("0000") is None
+
+
+def test_frames_read_by_the_caller_are_reused(repository, forecaster):
+    repository.get_stored_prediction = repository.get_taxpayer_with_last_year = None
+    service = InnPredictionService(repository, forecaster)
+    taxpayer = pd.DataFrame({"TaxpayerId": [1], "INN": ["7701"], "FullName": ["A"]})
+    history = pd.DataFrame({
+        "Source": ["real", "real", "predict", "predict"], "TaxType": ["IPP"] * 4,
+        "Year": [2023, 2024, 2024, 2025], "Month": [1, 1, 1, 1],
+        "TotalIncome": [1.0, 2.0, 3.0, 4.0], "TotalTransactions": [1, 1, 1, 1], "TotalTax": [0.1, 0.2, 0.3, 0.4]
+    })
+
+    stored = service.predict("7701", taxpayer, history)
+    assert (stored["year"], stored["source"]) == (2025, "predict_table")
+    assert stored["data"][["INN", "FullName", "PredictedTax"]].values.tolist() == [["7701", "A", 0.4]]
+
+    live = service.predict("7701", taxpayer, history.iloc[:3])
+    assert (live["year"], live["source"]) == (2025, "inference")
+    assert service.predict("7701", taxpayer, history.iloc[2:]) is None
+    assert forecaster.calls == 1
+
+
+def test_batch_reads_stored_forecasts_at_once_and_infers_only_the_rest(repository, forecaster):
+    service = InnPredictionService(repository, forecaster)
+    service.predict("7703")
+    repository.stored = pd.DataFrame({"INN": ["7701", "7701"], "Year": [2025, 2025], "Month": [1, 2], "Tax": [2.0, 3.0]})
+
+    result = service.predict_batch(["7701", "7702", "7703", "0000"])
+
+    assert repository.calls == ["taxpayers", "last_years", ("stored", ["7701", "7702", "7703"])]
+    assert {inn: (item["year"], item["source"]) for inn, item in result.items()} == {
+        "7701": (2025, "predict_table"), "7702": (2024, "inference"), "7703": (2025, "cache")
+    }
+    assert result["7701"]["data"]["PredictedTax"].tolist() == [2.0, 3.0]
+    assert result["7702"]["data"]["Month"].tolist() == [1, 2]
+    assert forecaster.batches == [(2025, ["7703"]), (2024, ["7702"])]
+
+    assert service.predict_batch(["7702"])["7702"]["source"] == "cache"
+    assert forecaster.calls == 2
+    assert service.stats()["requests"] == 5
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.InnSearchIndex import InnSearchIndex
+from model.TaxpayerRepository import TaxpayerRepository
+from model.TaxpayerService import TaxpayerService
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+
+def insert_taxpayers(db_engine, inns, first_id):
+    pd.DataFrame({
+        "TaxpayerId": range(first_id, first_id + len(inns)),
+        "FullName": [f"Taxpayer {inn}" for inn in inns],
+        "INN": inns,
+        "TaxpayerType": "SZ",
+        "has_employees": False
+    }).to_sql("Taxpayer", db_engine.get_engine(), if_exists="append", index=False)
+
+
+@pytest.fixture
+def db_engine():
+    db_engine = DatabaseEngine(backend="sqlite", path=":memory:")
+    create_schema(db_engine.get_engine())
+    yield db_engine
+    db_engine.dispose_engine()
+
+
+def expected_ids(inns, query, prefix):
+    return [i + 1 for i, inn in enumerate(inns) if (inn.startswith(query) if prefix else query in inn)]
+
+
+def test_search_matches_like_semantics(db_engine):
+    rng = np.random.default_rng(1)
+    inns = [f"{x:012d}" for x in rng.integers(10 ** 11, 10 ** 12, 3000)] + ["7707083893"]
+    insert_taxpayers(db_engine, inns, 1)
+    index = InnSearchIndex(db_engine, max_ids=10000)
+
+    for query in ["7", "12", "123", "4567", "98765", "7707083893", "0000000000000", "77a"]:
+        assert index.search(query).tolist() == expected_ids(inns, query, prefix=False), query
+        assert index.search(query, "prefix").tolist() == expected_ids(inns, query, prefix=True), query
+
+
+def test_large_match_sets_fall_back_to_like(db_engine):
+    insert_taxpayers(db_engine, [f"7700000000{i:02d}" for i in range(20)], 1)
+    index = InnSearchIndex(db_engine, max_ids=5)
+
+    assert index.search("770") is None
+    assert index.search("77000000001", "prefix") is None
+    assert index.search("7700000000", "prefix") is None
+    assert index.search("770000000019").tolist() == [20]
+
+
+def test_new_taxpayers_are_added_incrementally(db_engine):
+    insert_taxpayers(db_engine, ["770000000001", "770000000002"], 1)
+    index = InnSearchIndex(db_engine, delta_limit=1, refresh_interval=0)
+    assert index.search("0002").tolist() == [2]
+
+    insert_taxpayers(db_engine, ["780000000003"], 3)
+    assert index.search("780", "prefix").tolist() == [3]
+    assert index.stats()["delta"] == 1
+
+    # past delta_limit the delta is merged into a rebuilt index
+    insert_taxpayers(db_engine, ["7800000000045"], 4)
+    assert index.search("0000000004").tolist() == [4]
+    assert index.stats() | {"build_ms": None} == {
+        "taxpayers": 4, "delta": 0, "build_ms": None, "searches": 3, "fallbacks": 0, "max_ids": 1000
+    }
+
+
+def test_failed_load_keeps_previous_index_or_falls_back_to_like(db_engine, monkeypatch):
+    insert_taxpayers(db_engine, ["770000000001", "780000000002"], 1)
+    index = InnSearchIndex(db_engine, refresh_interval=0)
+    assert index.search("780", "prefix").tolist() == [2]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(db_engine, "iter_query", fail)
+    assert index.search("780", "prefix").tolist() == [2]
+
+    unbuilt = InnSearchIndex(db_engine, refresh_interval=0)
+    assert unbuilt.search("780", "prefix") is None
+    assert unbuilt.stats()["fallbacks"] == 1
+
+
+def test_refresh_merges_delta_on_width_change_and_past_delta_limit(db_engine):
+    inns = ["770000000001", "770000000002", "780000000003"]
+    insert_taxpayers(db_engine, inns, 1)
+    index = InnSearchIndex(db_engine, delta_limit=2)
+    index.rebuild()
+
+    def check():
+        for query in ["7", "77", "000", "0003", "00000045", "1234", "770000000001", "7800000000045"]:
+            assert index.search(query).tolist() == expected_ids(inns, query, prefix=False), query
+            assert index.search(query, "prefix").tolist() == expected_ids(inns, query, prefix=True), query
+
+    # a row of the same width goes to the delta
+    inns.append("790000000004")
+    insert_taxpayers(db_engine, inns[-1:], 4)
+    index.refresh()
+    assert index.stats()["delta"] == 1
+    check()
+
+    # a longer INN widens the matrix: snapshot, delta and new rows are merged into one build
+    inns.append("7800000000045")
+    insert_taxpayers(db_engine, inns[-1:], 5)
+    index.refresh()
+    assert (index.stats()["taxpayers"], index.stats()["delta"]) == (5, 0)
+    check()
+
+    # the delta of the widened index fills up again and is merged past delta_limit
+    inns.extend(["770000001234", "7700000012345", "12340000000"])
+    for offset in range(3):
+        insert_taxpayers(db_engine, inns[5 + offset:6 + offset], 6 + offset)
+        index.refresh()
+    assert (index.stats()["taxpayers"], index.stats()["delta"]) == (8, 0)
+    check()
+
+
+def test_padded_filter_gives_the_same_page_with_and_without_index(db_engine):
+    insert_taxpayers(db_engine, ["770100000001", "770200000002", "780100000003"], 1)
+    with_index = TaxpayerService(TaxpayerRepository(db_engine), inn_index=InnSearchIndex(db_engine))
+    with_like = TaxpayerService(TaxpayerRepository(db_engine))
+
+    for service in (with_index, with_like):
+        for inn_match in ("substring", "prefix"):
+            page = service.get_taxpayers_paginated(1, 10, inn_filter=" 7701 ", inn_match=inn_match)
+            assert (page["data"]["TaxpayerId"].tolist(), page["total"]) == ([1], 1), inn_match
+        assert service.get_taxpayers_keyset(10, inn_filter="  ")["total"] == 3
+    assert with_index.inn_index.stats()["fallbacks"] == 0
@@ -0,0 +1,66 @@
+import joblib
+import numpy as np
+import pytest
+
+from model.ForecastService import ForecastService
+from model.ModelStore import ModelStore, dump_atomic
+
+
+class ArrayModel:
+    def __init__(self, size):
+        self.coef_ = np.arange(size, dtype=np.float64)
+
+
+def make_store(tmp_path, mmap_mode="r"):
+    for filename in ForecastService.MODEL_FILES.values():
+        joblib.dump(ArrayModel(1000), tmp_path / filename)
+    return ModelStore(str(tmp_path), mmap_mode=mmap_mode)
+
+
+def test_models_load_on_first_use(tmp_path):
+    store = make_store(tmp_path)
+    forecaster = ForecastService(store=store)
+    assert not any(store.is_loaded(filename) for filename in ForecastService.MODEL_FILES.values())
+
+    model = forecaster.income_model
+    assert forecaster.income_model is model
+    assert isinstance(model.coef_, np.memmap)
+    assert list(store.stats()["models"]) == ["linear_income_model.pkl"]
+
+    forecaster.load_models()
+    stats = store.stats()["models"]
+    assert set(stats) == set(ForecastService.MODEL_FILES.values())
+    assert stats["linear_tax_model.pkl"]["mapped_bytes"] == 8000
+    assert stats["linear_tax_model.pkl"]["load_ms"] >= 0
+
+
+def test_mmap_mode_can_be_disabled(tmp_path):
+    store = make_store(tmp_path, mmap_mode=None)
+    model = store.get("linear_income_model.pkl")
+    assert not isinstance(model.coef_, np.memmap)
+    assert store.stats()["models"]["linear_income_model.pkl"]["mapped_bytes"] == 0
+
+
+def test_replaced_model_file_is_reloaded_with_a_new_version(tmp_path):
+    store = make_store(tmp_path)
+    forecaster = ForecastService(store=store)
+    version = forecaster.model_version
+    assert forecaster.income_model.coef_.shape == (1000,)
+
+    old_model = forecaster.income_model
+    dump_atomic(ArrayModel(10), tmp_path / "linear_income_model.pkl")
+    assert forecaster.model_version != version
+    assert forecaster.income_model.coef_.shape == (10,)
+    # the replaced file is still mapped by the old model and stays readable
+    assert old_model.coef_[-1] == 999.0
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(ForecastService.MODEL_FILES.values())
+
+
+def test_failed_atomic_dump_keeps_the_old_file(tmp_path):
+    path = tmp_path / "linear_income_model.pkl"
+    dump_atomic(ArrayModel(3), path)
+
+    with pytest.raises(Exception):
+        dump_atomic(lambda: None, path)
+    assert [p.name for p in tmp_path.iterdir()] == ["linear_income_model.pkl"]
+    assert joblib.load(path).coef_.tolist() == [0.0, 1.0, 2.0]
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from model.PredictBulkLoader import PREDICT_DTYPES, PredictBulkLoader, predict_table
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # SQLite stands in for SQL Server
+    engine = create_engine(f"sqlite:///{tmp_path / 'predict.db'}")
+    with engine.begin() as conn:
+        predict_table("Predict").create(conn)
+    yield engine
+    engine.dispose()
+
+
+def make_predictions(year, taxpayers, tax=1.0):
+    rows = []
+    for taxpayer_id in range(1, taxpayers + 1):
+        for month in range(1, 13):
+            rows.append({
+                'TaxpayerId': taxpayer_id,
+                'FullName': f"Taxpayer {taxpayer_id}",
+                'INN': str(770000000000 + taxpayer_id),
+                'Year': year,
+                'Month': month,
+                'Income': 100.5,
+                'Transactions': 3,
+                'Tax': tax,
+                'TaxType': 'IPP',
+                'TaxpayerType': 'IPP',
+                'activity_type': 'IT',
+                'registration_district': 'Central',
+                'has_employees': False,
+                'employees_count': None
+            })
+    return pd.DataFrame(rows, columns=list(PREDICT_DTYPES))
+
+
+def read_counts(engine):
+    return pd.read_sql(
+        "SELECT Year, COUNT(*) AS Cnt, SUM(Tax) AS Tax FROM Predict GROUP BY Year ORDER BY Year",
+        engine
+    )
+
+
+def test_load_replaces_only_forecast_year(engine):
+    PredictBulkLoader(engine).load(make_predictions(2024, 2), 2024)
+    PredictBulkLoader(engine).load(make_predictions(2025, 2), 2025)
+
+    loader = PredictBulkLoader(engine, chunk_size=10)
+    rows = loader.load(make_predictions(2025, 3, tax=2.0), 2025)
+
+    counts = read_counts(engine)
+    assert rows == 36
+    assert counts['Year'].tolist() == [2024, 2025]
+    assert counts['Cnt'].tolist() == [24, 36]
+    assert counts['Tax'].tolist() == [24.0, 72.0]
+    assert [size for size, _ in loader.batch_timings] == [10, 10, 10, 6]
+    assert inspect(engine).get_table_names() == ["Predict"]
+
+
+def test_abort_keeps_previous_year(engine):
+    PredictBulkLoader(engine).load(make_predictions(2025, 2), 2025)
+
+    loader = PredictBulkLoader(engine)
+    loader.begin(2025)
+    loader.write(make_predictions(2025, 1, tax=5.0))
+    loader.abort()
+
+    counts = read_counts(engine)
+    assert counts['Cnt'].tolist() == [24]
+    assert counts['Tax'].tolist() == [24.0]
+    assert inspect(engine).get_table_names() == ["Predict"]
+
+
+def test_concurrent_loads_use_separate_staging_tables(engine):
+    first = PredictBulkLoader(engine)
+    second = PredictBulkLoader(engine)
+    first.begin(2025)
+    second.begin(2026)
+    assert first.staging_table != second.staging_table
+
+    first.write(make_predictions(2025, 1))
+    second.write(make_predictions(2026, 2))
+    assert first.commit() == 12
+    assert second.commit() == 24
+
+    counts = read_counts(engine)
+    assert counts['Year'].tolist() == [2025, 2026]
+    assert counts['Cnt'].tolist() == [12, 24]
+    assert inspect(engine).get_table_names() == ["Predict"]
@@ -0,0 +1,47 @@
+import threading
+
+from model.PredictionRefreshJob import PredictionRefreshJob
+
+
+def test_successful_refresh_reports_rows():
+    job = PredictionRefreshJob(lambda: 120)
+    assert job.status()["state"] == "idle"
+
+    assert job.start()
+    job.wait(5)
+
+    status = job.status()
+    assert (status["state"], status["rows"], status["error"]) == ("succeeded", 120, None)
+    assert status["finished_at"] is not None
+
+
+def test_failed_refresh_reports_error():
+    def refresh():
+        raise RuntimeError("database is down")
+
+    job = PredictionRefreshJob(refresh)
+    job.start()
+    job.wait(5)
+
+    status = job.status()
+    assert (status["state"], status["rows"], status["error"]) == ("failed", None, "database is down")
+
+
+def test_start_while_running_is_a_no_op():
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(5)
+        return len(calls)
+
+    job = PredictionRefreshJob(refresh)
+    assert job.start()
+    assert not job.start()
+    assert job.status()["state"] == "running"
+
+    release.set()
+    job.wait(5)
+    assert calls == [1]
+    assert job.status()["state"] == "succeeded"
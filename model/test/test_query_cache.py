@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from model.CachedTaxDataRepository import CachedTaxDataRepository
+from model import DataEvents
+from model.DataEvents import notify_data_changed, subscribe, unsubscribe
+from model.QueryCache import QueryCache
+
+
+class CountingRepository:
+    def __init__(self):
+        self.calls = 0
+
+    def get_monthly_data(self, source="real", tax_type=None, aggregate=False, start_year=None, end_year=None):
+        self.calls += 1
+        return pd.DataFrame({"Year": [2024], "Month": [1], "TotalTax": [10.0]})
+
+    def get_taxpayers(self):
+        self.calls += 1
+        return pd.DataFrame({"TaxpayerId": [1]})
+
+
+def test_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries_and_limits_bytes():
+    cache = QueryCache(max_bytes=10_000, max_item_bytes=10_000)
+    cache.set("expired", 1, ttl=-1)
+    assert cache.get("expired") == (False, None)
+
+    big = pd.DataFrame({"x": range(5_000)})
+    assert cache.set("big", big, ttl=60) is False
+    assert cache.stats()["bytes"] == 0
+
+
+def test_cached_repository_normalizes_arguments():
+    raw = CountingRepository()
+    repository = CachedTaxDataRepository(raw, cache=QueryCache(), ttls={"get_monthly_data": 60})
+
+    repository.get_monthly_data("real", None, True)
+    repository.get_monthly_data(aggregate=True)
+    repository.get_monthly_data(source="real", aggregate=True, end_year=None)
+    assert raw.calls == 1
+
+    repository.get_monthly_data(aggregate=False)
+    repository.get_taxpayers()
+    repository.get_taxpayers()
+    assert raw.calls == 4
+    assert repository.stats()["methods"]["get_monthly_data"] == {"hits": 2, "misses": 2}
+
+
+def test_cached_repository_is_invalidated_on_data_change():
+    raw = CountingRepository()
+    subscribers = list(DataEvents._subscribers)
+    repository = CachedTaxDataRepository(raw, cache=QueryCache(), ttls={"get_monthly_data": 60})
+    assert DataEvents._subscribers == subscribers
+
+    subscribe(repository.invalidate)
+    try:
+        repository.get_monthly_data(aggregate=True)
+        notify_data_changed("predict")
+        repository.get_monthly_data(aggregate=True)
+    finally:
+        unsubscribe(repository.invalidate)
+
+    assert raw.calls == 2
+    assert DataEvents._subscribers == subscribers
+
+
+def test_cached_repository_counts_every_call_across_threads():
+    repository = CachedTaxDataRepository(CountingRepository(), cache=QueryCache(), ttls={"get_monthly_data": 60})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda year: repository.get_monthly_data(end_year=year % 4), range(2000)))
+
+    counts = repository.stats()["methods"]["get_monthly_data"]
+    assert counts["hits"] + counts["misses"] == 2000
@@ -0,0 +1,47 @@
+import logging
+
+from model.QueryStats import QueryStats, fingerprint
+from model.database import DatabaseEngine
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    a = fingerprint("SELECT *  FROM dbo.Taxpayer\n WHERE INN = '7700' AND Year = 2024 AND TaxpayerId IN (?, ?, ?)")
+    b = fingerprint("SELECT * FROM dbo.Taxpayer WHERE INN = '7811' AND Year = 2023 AND TaxpayerId IN (?)")
+    assert a == b == "SELECT * FROM dbo.Taxpayer WHERE INN = ? AND Year = ? AND TaxpayerId IN (?...)"
+
+
+def test_top_orders_by_total_and_p95():
+    stats = QueryStats(slow_query_ms=None)
+    for _ in range(10):
+        stats.record("SELECT * FROM Taxpayer", {"execute": 0.01})
+    stats.record("SELECT * FROM Predict", {"execute": 0.05})
+
+    assert [s["statement"] for s in stats.top(order="total")] == ["SELECT * FROM Taxpayer", "SELECT * FROM Predict"]
+    assert [s["statement"] for s in stats.top(order="p95")] == ["SELECT * FROM Predict", "SELECT * FROM Taxpayer"]
+    assert stats.top(1)[0]["calls"] == 10
+
+
+def test_execute_query_records_phases_and_slow_log(caplog):
+    db_engine = DatabaseEngine(backend="sqlite", path=":memory:", slow_query_ms=0)
+    with caplog.at_level(logging.WARNING, logger="model.QueryStats"):
+        df = db_engine.execute_query("SELECT ? AS a UNION ALL SELECT ?", [1, 2])
+
+    assert df["a"].tolist() == [1, 2]
+    [stats] = db_engine.query_stats.top()
+    assert stats["calls"] == 1 and stats["rows"] == 2 and stats["bytes"] > 0
+    assert set(stats["phases_ms"]) == {"connect", "execute", "fetch", "build"}
+    assert len(db_engine.query_stats.slow_queries()) == 1
+    assert "Slow query" in caplog.text
+
+
+def test_slow_query_params_are_redacted_unless_enabled(caplog):
+    with caplog.at_level(logging.WARNING, logger="model.QueryStats"):
+        QueryStats(slow_query_ms=0).record(
+            "SELECT * FROM Taxpayer WHERE INN = ?", {"execute": 0.01}, params=("770000000001",)
+        )
+    assert "770000000001" not in caplog.text
+    assert "<1 redacted>" in caplog.text
+
+    stats = QueryStats(slow_query_ms=0, log_params=True)
+    stats.record("SELECT * FROM Taxpayer WHERE INN = ?", {"execute": 0.01}, params=("770000000001",))
+    assert stats.slow_queries()[0]["params"] == ["770000000001"]
@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import routes.serialization as serialization
+from routes.routes_taxpayers import map_taxpayers_to_users
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_handles_numpy_and_missing_values(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+    payload = {
+        "b": np.int64(3),
+        "a": [np.float32(1.5), np.bool_(True), None, pd.NA],
+        "array": np.array([1, 2])
+    }
+    assert json.loads(serialization.dumps(payload)) == {"a": [1.5, True, None, None], "array": [1, 2], "b": 3}
+
+
+def test_taxpayers_are_mapped_by_columns():
+    df = pd.DataFrame({
+        "TaxpayerId": [1, 2],
+        "FullName": ["Ivanov", "Petrov"],
+        "INN": ["770000000001", "770000000002"],
+        "registration_district": ["Central", "North"],
+        "has_employees": [True, False],
+        "employees_count": pd.array([3, None], dtype="Int64")
+    })
+    users = map_taxpayers_to_users(df)
+
+    assert users[1] == {
+        "id": 2,
+        "name": "Petrov",
+        "INN": "770000000002",
+        "registration_district": "North",
+        "has_employees": False,
+        "employees_count": None,
+        "avatar": {"src": "https://api.dicebear.com/7.x/initials/svg?seed=Petrov"}
+    }
+    assert type(users[0]["id"]) is int and users[0]["employees_count"] == 3
+    assert map_taxpayers_to_users(df.iloc[:0]) == []
+
+
+def test_frame_response_writes_frames_once_with_nan_and_timestamps():
+    df = pd.DataFrame({
+        "Month": np.array([1, 2], dtype=np.int32),
+        "Income": [1.5, np.nan],
+        "CreatedAt": pd.to_datetime(["2025-01-01", "2025-02-01"])
+    })
+    response = serialization.frame_response(
+        {"success": True, "prediction_year": np.int64(2025), "data": df, "empty": df.iloc[:0]}
+    )
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == {
+        "success": True,
+        "prediction_year": 2025,
+        "empty": [],
+        "data": [
+            {"Month": 1, "Income": 1.5, "CreatedAt": "2025-01-01T00:00:00.000"},
+            {"Month": 2, "Income": None, "CreatedAt": "2025-02-01T00:00:00.000"}
+        ]
+    }
+
+
+def test_frame_response_fields_named_like_its_arguments_stay_fields():
+    response = serialization.frame_response({"status": "ok", "fmt": "x", "data": pd.DataFrame({"A": [1]})}, status=201)
+
+    assert response.status_code == 201
+    assert json.loads(response.get_data()) == {"status": "ok", "fmt": "x", "data": [{"A": 1}]}
+
+
+def test_columnar_and_arrow_formats_carry_the_same_frame():
+    pyarrow = pytest.importorskip("pyarrow")
+    df = pd.DataFrame({"Year": [2024, 2025], "Income": [1.5, np.nan], "TaxType": ["IPP", None]})
+
+    columnar = json.loads(serialization.frame_response({"success": True, "data": df}, fmt="columnar").get_data())
+    assert columnar["data"] == {
+        "schema": [{"name": "Year", "type": "int"}, {"name": "Income", "type": "float"},
+                   {"name": "TaxType", "type": "string"}],
+        "columns": [[2024, 2025], [1.5, None], ["IPP", None]]
+    }
+
+    response = serialization.frame_response({"success": True, "data": df}, fmt="arrow")
+    assert response.mimetype == serialization.ARROW_MIMETYPE
+    table = pyarrow.ipc.open_stream(response.get_data()).read_all()
+    assert table.column_names == ["Year", "Income", "TaxType"]
+    assert table.column("Year").to_pylist() == [2024, 2025]
+    assert table.schema.metadata[b"success"] == b"true"
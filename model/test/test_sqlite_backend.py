@@ -0,0 +1,283 @@
+import pandas as pd
+import pytest
+from sqlalchemy import event
+
+from model.AggregationService import AggregationService
+from model.ForecastService import ForecastService
+from model.InnPredictionService import InnPredictionService
+from model.ModelStore import ModelStore
+from model.RollupPrecomputeJob import RollupPrecomputeJob
+from model.TaxDataRepository import TaxDataRepository
+from model.TaxpayerDashboardService import TaxpayerDashboardService
+from model.TaxpayerRepository import TaxpayerRepository
+from model.TaxpayerService import TaxpayerService
+from model.YearlyGrowthLoader import YearlyGrowthLoader
+from model.YearlyMedianLoader import YearlyMedianLoader
+from model.database import DatabaseEngine, translate_for_sqlite
+from model.schema import create_schema
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    db_engine = DatabaseEngine(backend="sqlite", path=str(tmp_path / "tax.db"))
+    engine = db_engine.get_engine()
+    create_schema(engine)
+
+    taxpayers = pd.DataFrame({
+        "TaxpayerId": [1, 2, 3],
+        "FullName": ["Ivanov", "Petrov", "Sidorov"],
+        "INN": ["770000000001", "770000000002", "780000000003"],
+        "TaxpayerType": ["IPP", "SZ", "IPP"],
+        "registration_district": ["Central", "North", "Central"],
+        "activity_type": ["IT", "TRADE", "IT"],
+        "has_employees": [True, False, False],
+        "employees_count": [2, None, None]
+    })
+    monthly = pd.DataFrame({
+        "TaxpayerId": [1, 1, 2, 3],
+        "Year": [2023, 2024, 2024, 2024],
+        "Month": [1, 1, 1, 2],
+        "TaxType": ["IPP", "IPP", "SZ", "IPP"],
+        "IncomeAmount": [100.0, 200.0, 50.0, 300.0],
+        "TaxAmount": [6.0, 12.0, 3.0, 18.0],
+        "season": ["winter", "winter", "winter", "winter"],
+        "transactions_count": [1, 2, 3, 4]
+    })
+    taxpayers.to_sql("Taxpayer", engine, if_exists="append", index=False)
+    monthly.to_sql("MonthlyTaxData", engine, if_exists="append", index=False)
+
+    yield db_engine
+    db_engine.dispose_engine()
+
+
+def test_translate_offset_fetch_swaps_parameters():
+    statement, params = translate_for_sqlite(
+        "SELECT * FROM dbo.Taxpayer ORDER BY INN ASC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY",
+        ("77%", 20, 10)
+    )
+    assert statement == "SELECT * FROM Taxpayer ORDER BY INN ASC LIMIT ? OFFSET ?"
+    assert params == ("77%", 10, 20)
+
+
+def test_paginated_query_runs_on_sqlite(db_engine):
+    repository = TaxpayerRepository(db_engine)
+    df = repository.get_taxpayers_paginated_raw(2, 1, "77", None, "TaxpayerId", "ASC")
+
+    assert df["INN"].tolist() == ["770000000002"]
+    assert repository.count_taxpayers_raw("77", None) == 2
+
+
+def test_total_count_is_cached_per_filter(db_engine):
+    service = TaxpayerService(TaxpayerRepository(db_engine))
+    for page in (1, 2):
+        result = service.get_taxpayers_paginated(page, 1, inn_filter="77")
+        assert (result['total'], result['total_pages']) == (2, 2)
+    assert service.get_taxpayers_paginated(1, 1, with_total=False)['total'] is None
+
+    count_calls = [s['calls'] for s in db_engine.query_stats.top(order="calls") if "COUNT(*)" in s['statement']]
+    assert count_calls == [1]
+
+
+def test_failed_count_is_not_cached(db_engine):
+    repository = TaxpayerRepository(db_engine)
+    service = TaxpayerService(repository)
+    real_count = repository.count_taxpayers_raw
+    repository.count_taxpayers_raw = lambda *args, **kwargs: None
+
+    assert service.count_taxpayers("77") == 0
+
+    repository.count_taxpayers_raw = real_count
+    assert service.count_taxpayers("77") == 2
+
+
+@pytest.mark.parametrize("sort_by", ["TaxpayerId", "FullName", "employees_count"])
+@pytest.mark.parametrize("sort_order", ["ASC", "DESC"])
+def test_keyset_pages_walk_forward_and_back(db_engine, sort_by, sort_order):
+    service = TaxpayerService(TaxpayerRepository(db_engine))
+    expected = service.get_taxpayers_keyset(10, sort_by=sort_by, sort_order=sort_order)['data']['TaxpayerId'].tolist()
+
+    pages = [service.get_taxpayers_keyset(1, sort_by=sort_by, sort_order=sort_order)]
+    while pages[-1]['next_cursor']:
+        pages.append(service.get_taxpayers_keyset(1, pages[-1]['next_cursor'], sort_by=sort_by, sort_order=sort_order))
+    assert [int(page['data']['TaxpayerId'].iloc[0]) for page in pages] == expected
+    assert pages[0]['prev_cursor'] is None
+
+    back = service.get_taxpayers_keyset(2, pages[-1]['prev_cursor'], sort_by=sort_by, sort_order=sort_order)
+    assert back['data']['TaxpayerId'].tolist() == expected[:2]
+    assert back['prev_cursor'] is None
+
+    with pytest.raises(ValueError):
+        service.get_taxpayers_keyset(1, pages[-1]['next_cursor'] or pages[0]['next_cursor'], sort_by="INN")
+
+
+def test_repository_and_loader_run_on_sqlite(db_engine):
+    repository = TaxDataRepository(db_engine)
+    assert repository.get_freshness() == {'last_real_year': 2024, 'last_predict_year': None, 'predict_rows': 0}
+    assert repository.get_monthly_summary("TaxAmount", "IPP")["Total"].iloc[0] == 30.0
+
+    YearlyMedianLoader(db_engine, repository, AggregationService()).load_monthly_median("IPP")
+    median = repository.get_yearly_growth_by_type("dbo.yearly_stats_median", "IPP", has_month=True)
+    assert median[["Year", "Month", "IncomeMedian"]].values.tolist() == [[2023, 1, 100.0], [2024, 1, 200.0], [2024, 2, 300.0]]
+
+
+def test_batch_queries_match_single_inn_queries(db_engine):
+    repository = TaxDataRepository(db_engine)
+    inns = ["770000000001", "780000000003", "000000000000"]
+
+    monthly = repository.get_monthly_by_inns(inns)
+    for inn in inns[:2]:
+        single = repository.get_monthly_by_inn(inn)
+        batch = monthly[monthly["INN"] == inn].drop(columns="INN").reset_index(drop=True)
+        pd.testing.assert_frame_equal(batch, single)
+
+    last_years = repository.get_last_years_by_inns(inns)
+    assert dict(zip(last_years["INN"], last_years["LastYear"])) == {"770000000001": 2024, "780000000003": 2024}
+    assert repository.get_taxpayers_by_inns(inns)["TaxpayerId"].tolist() == [1, 3]
+
+
+def test_stored_prediction_is_the_year_after_real_data(db_engine):
+    repository = TaxDataRepository(db_engine)
+    predict = pd.DataFrame({
+        "TaxpayerId": [1, 1, 2], "FullName": ["Ivanov", "Ivanov", "Petrov"],
+        "INN": ["770000000001", "770000000001", "770000000002"], "Year": [2025, 2026, 2024],
+        "Month": [1, 1, 1], "Income": [1.0, 2.0, 3.0], "Transactions": [1, 1, 1], "Tax": [0.1, 0.2, 0.3]
+    })
+    predict.to_sql("Predict", db_engine.get_engine(), if_exists="append", index=False)
+
+    assert repository.get_stored_prediction("770000000001")["Year"].tolist() == [2025]
+    assert repository.get_stored_prediction("770000000002").empty
+    stored = repository.get_stored_predictions_by_inns(["770000000001", "770000000002", "780000000003"])
+    pd.testing.assert_frame_equal(stored, repository.get_stored_prediction("770000000001"))
+
+
+def test_bundle_prediction_matches_single_inn_prediction(db_engine, tmp_path):
+    pd.DataFrame({
+        "TaxpayerId": [1, 1], "FullName": ["Ivanov", "Ivanov"], "INN": ["770000000001", "770000000001"],
+        "Year": [2025, 2025], "Month": [1, 2], "Income": [1.0, 2.0], "Transactions": [1, 2], "Tax": [0.1, 0.2],
+        "TaxType": ["IPP", "IPP"], "TaxpayerType": ["IPP", "IPP"], "activity_type": ["IT", "IT"],
+        "registration_district": ["Central", "Central"], "has_employees": [True, True], "employees_count": [2, 2]
+    }).to_sql("Predict", db_engine.get_engine(), if_exists="append", index=False)
+    repository = TaxDataRepository(db_engine)
+    predictions = InnPredictionService(repository, ForecastService(store=ModelStore(str(tmp_path))))
+    service = TaxpayerDashboardService(repository, AggregationService(), predictions)
+
+    single = predictions.predict("770000000001")
+    bundle = service.get_bundle("770000000001", ("prediction", "monthly"))
+    assert bundle["prediction"]["source"] == single["source"] == "predict_table"
+    pd.testing.assert_frame_equal(bundle["prediction"]["data"], single["data"])
+    pd.testing.assert_frame_equal(bundle["monthly"], repository.get_monthly_by_inn("770000000001"))
+    assert repository.get_taxpayer_with_last_year("780000000003")["LastRealYear"].tolist() == [2024]
+
+
+@pytest.mark.parametrize("chunksize, sizes", [(2, [2, 2]), (3, [3, 1]), (4, [4]), (10, [4])])
+def test_iter_query_splits_rows_at_chunk_boundaries(db_engine, chunksize, sizes):
+    query = "SELECT RecordId, Year FROM MonthlyTaxData WHERE Year >= ? ORDER BY RecordId"
+    chunks = list(db_engine.iter_query(query, [2023], chunksize=chunksize))
+
+    assert [len(chunk) for chunk in chunks] == sizes
+    assert pd.concat(chunks)["RecordId"].tolist() == [1, 2, 3, 4]
+    assert db_engine.query_stats.top(10, order="calls")[0]["rows"] == 4
+
+
+def test_result_bytes_count_string_contents(db_engine):
+    query = "SELECT INN, FullName FROM Taxpayer"
+    df = db_engine.execute_query(query)
+    list(db_engine.iter_query(query + " WHERE TaxpayerId > ?", [0]))
+
+    expected = int(df.memory_usage(index=False, deep=True).sum())
+    bytes_by_statement = {s["statement"]: s["bytes"] for s in db_engine.query_stats.top(10)}
+    assert bytes_by_statement[query] == expected
+    assert bytes_by_statement[query + " WHERE TaxpayerId > ?"] == expected
+
+def test_iter_query_raises_errors(db_engine):
+    chunks = list(db_engine.iter_query("SELECT * FROM MonthlyTaxData WHERE Year > ?", [2100]))
+    assert sum(len(chunk) for chunk in chunks) == 0
+
+    with pytest.raises(Exception, match="no such table"):
+        list(db_engine.iter_query("SELECT * FROM MissingTable"))
+    errors = {s["statement"]: s["errors"] for s in db_engine.query_stats.top(10)}
+    assert errors["SELECT * FROM MissingTable"] == 1
+
+
+
+def test_iter_rows_streams_rows_in_batches(db_engine):
+    query = "SELECT RecordId, Year FROM MonthlyTaxData WHERE Year >= ? ORDER BY RecordId"
+    rows = db_engine.iter_rows(query, [2024], batch_size=2)
+
+    assert next(rows) == (2, 2024)
+    assert [tuple(row) for row in rows] == [(3, 2024), (4, 2024)]
+    stats = {s["statement"]: s for s in db_engine.query_stats.top(10)}
+    assert stats[query]["rows"] == 3
+
+    with pytest.raises(Exception, match="no such table"):
+        list(db_engine.iter_rows("SELECT * FROM MissingTable"))
+
+
+def test_predict_data_stream_matches_single_read(db_engine):
+    pd.DataFrame({
+        "TaxpayerId": [1, 2, 3], "FullName": ["Ivanov", "Petrov", "Sidorov"],
+        "INN": ["770000000001", "770000000002", "780000000003"], "Year": [2025, 2025, 2025],
+        "Month": [1, 1, 2], "Income": [1.0, 2.0, 3.0], "Transactions": [1, 1, 1], "Tax": [0.1, 0.2, 0.3]
+    }).to_sql("Predict", db_engine.get_engine(), if_exists="append", index=False)
+    repository = TaxDataRepository(db_engine)
+
+    chunks = list(repository.iter_predict_data(chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), repository.get_predict_data())
+
+
+ROLLUP_TABLES = {
+    "yearly_growth_general": ["TaxType", "Year"],
+    "yearly_growth_median": ["TaxType", "Year"],
+    "yearly_stats_median": ["TaxType", "Year", "Month"]
+}
+
+
+def read_rollups(db_engine):
+    tables = {}
+    for table, keys in ROLLUP_TABLES.items():
+        df = pd.read_sql(f"SELECT * FROM {table}", db_engine.get_engine())
+        df = df.drop(columns=["Id", "CreatedAt"], errors="ignore")
+        tables[table] = df.sort_values(keys, na_position="first").reset_index(drop=True)
+    return tables
+
+
+def test_rollup_job_matches_per_type_loaders(db_engine):
+    pd.DataFrame({
+        "TaxpayerId": [1, 2, 3], "FullName": ["Ivanov", "Petrov", "Sidorov"],
+        "INN": ["770000000001", "770000000002", "780000000003"], "Year": [2025, 2025, 2025],
+        "Month": [1, 1, 2], "Income": [220.0, 40.0, 330.0], "Transactions": [2, 3, 5], "Tax": [13.0, 2.0, 20.0],
+        "TaxType": ["IPP", "SZ", "IPP"]
+    }).to_sql("Predict", db_engine.get_engine(), if_exists="append", index=False)
+    repository = TaxDataRepository(db_engine)
+    aggregator = AggregationService()
+    growth_loader = YearlyGrowthLoader(db_engine, repository, aggregator)
+    median_loader = YearlyMedianLoader(db_engine, repository, aggregator)
+
+    job = RollupPrecomputeJob(db_engine, repository, growth_loader, median_loader, chunksize=2)
+    job.run()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine.get_engine(), "before_cursor_execute", record)
+    inserted = job.run()
+    event.remove(db_engine.get_engine(), "before_cursor_execute", record)
+    # rerun over filled tables: truncated, then written without reading their keys back
+    assert not [s for s in statements if "SELECT" in s and any(table in s for table in ROLLUP_TABLES)]
+
+    job_tables = read_rollups(db_engine)
+    assert inserted == {table: len(df) for table, df in job_tables.items()}
+
+    with db_engine.get_engine().begin() as conn:
+        for table in ROLLUP_TABLES:
+            conn.exec_driver_sql(f"DELETE FROM {table}")
+    for tax_type in (None, "IPP", "SZ"):
+        growth_loader.load_growth(tax_type)
+        median_loader.load_monthly_median(tax_type)
+    loader_tables = read_rollups(db_engine)
+
+    for table in ROLLUP_TABLES:
+        assert not job_tables[table].empty, table
+        pd.testing.assert_frame_equal(job_tables[table], loader_tables[table], check_dtype=False, obj=table)
@@ -0,0 +1,110 @@
+import pandas as pd
+import pytest
+
+from model.AggregationService import AggregationService
+from model.TaxpayerDashboardService import TaxpayerDashboardService
+
+
+class CountingRepository:
+    def __init__(self):
+        self.calls = []
+        self.taxpayer = pd.DataFrame({"TaxpayerId": [1], "INN": ["7701"], "FullName": ["A"]})
+        self.monthly = pd.DataFrame({
+            "Year": [2023, 2023, 2024, 2024],
+            "Month": [1, 2, 1, 2],
+            "TotalIncome": [100.0, 300.0, 200.0, 400.0],
+            "TotalTransactions": [1, 3, 2, 4],
+            "TotalTax": [10.0, 30.0, 20.0, 40.0]
+        })
+
+    def get_taxpayer(self, inn):
+        self.calls.append("taxpayer")
+        return self.taxpayer if inn == "7701" else self.taxpayer.iloc[:0]
+
+    def get_monthly_by_inn(self, inn, with_source=False):
+        self.calls.append("monthly")
+        if with_source:
+            return self.monthly.assign(Source="real", TaxType="IPP")
+        return self.monthly
+
+
+class StubPredictions:
+    def __init__(self):
+        self.frames = None
+
+    def predict(self, inn, taxpayer=None, history=None):
+        self.frames = (taxpayer, history)
+        return {"year": 2025, "data": pd.DataFrame({"Year": [2025], "PredictedTax": [1.0]}), "source": "cache"}
+
+
+@pytest.fixture
+def repository():
+    return CountingRepository()
+
+
+@pytest.fixture
+def predictions():
+    return StubPredictions()
+
+
+@pytest.fixture
+def service(repository, predictions):
+    return TaxpayerDashboardService(repository, AggregationService(), predictions)
+
+
+def test_bundle_reads_history_once(service, repository, predictions):
+    bundle = service.get_bundle("7701")
+
+    assert repository.calls == ["taxpayer", "monthly"]
+    assert set(bundle) == set(TaxpayerDashboardService.PARTS)
+    taxpayer, history = predictions.frames
+    assert taxpayer is bundle["taxpayer"]
+    assert history["Source"].tolist() == ["real"] * 4
+    pd.testing.assert_frame_equal(bundle["monthly"], repository.monthly)
+    aggregator = AggregationService()
+    pd.testing.assert_frame_equal(bundle["yearly_totals"], aggregator.aggregate_yearly(repository.monthly, "sum"))
+    pd.testing.assert_frame_equal(
+        bundle["yearly_growth"],
+        aggregator.calculate_growth(aggregator.aggregate_yearly(repository.monthly, "median"))
+    )
+    assert bundle["prediction"]["year"] == 2025
+
+
+def test_bundle_parts(service, repository):
+    assert set(service.get_bundle("7701", ("yearly_growth",))) == {"yearly_growth"}
+
+    repository.calls.clear()
+    assert set(service.get_bundle("7701", ("taxpayer", "prediction"))) == {"taxpayer", "prediction"}
+    assert repository.calls == ["taxpayer", "monthly"]
+
+    repository.calls.clear()
+    assert set(service.get_bundle("7701", ("taxpayer",))) == {"taxpayer"}
+    assert repository.calls == ["taxpayer"]
+
+
+def test_bundle_unknown_taxpayer(service):
+    assert service.get_bundle("0000") is None
+
+
+def test_parse_parts():
+    assert TaxpayerDashboardService.parse_parts(None) == TaxpayerDashboardService.PARTS
+    assert TaxpayerDashboardService.parse_parts("monthly, prediction") == ("monthly", "prediction")
+    with pytest.raises(ValueError):
+        TaxpayerDashboardService.parse_parts("monthly,weekly")
+
+
+def test_predict_batch_is_served_by_the_prediction_service(repository):
+    class BatchPredictions(StubPredictions):
+        def predict_batch(self, inns):
+            return {inn: {"year": 2025, "data": pd.DataFrame(), "source": "cache"} for inn in inns}
+
+    service = TaxpayerDashboardService(repository, AggregationService(), BatchPredictions())
+    assert list(service.predict_batch(["7701", "7702"])) == ["7701", "7702"]
+    assert repository.calls == []
+
+
+def test_parse_inns():
+    assert TaxpayerDashboardService.parse_inns({"inns": ["7701", 7702, " 7701 ", ""]}, 10) == ["7701", "7702"]
+    for payload in (None, {"inns": []}, {"inns": "7701"}, {"inns": ["1", "2", "3"]}):
+        with pytest.raises(ValueError):
+            TaxpayerDashboardService.parse_inns(payload, 2)
@@ -0,0 +1,88 @@
+import pandas as pd
+
+from model.AggregationService import AggregationService
+from model.YearlyGrowthLoader import YearlyGrowthLoader
+
+
+class RecordingConnection:
+    """Answers the existing-years SELECT and records every other statement"""
+
+    def __init__(self, existing_years):
+        self.existing_years = existing_years
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.strip().startswith("SELECT"):
+            return [(year,) for year in self.existing_years]
+        self.statements.append((sql, params))
+
+
+class StubRepository:
+    def __init__(self, real, pred):
+        self.frames = {"real": real, "predict": pred}
+
+    def get_monthly_data(self, source="real", tax_type=None, aggregate=False):
+        return self.frames[source]
+
+
+class StubEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def begin(self):
+        conn = self.conn
+
+        class Transaction:
+            def __enter__(self):
+                return conn
+
+            def __exit__(self, *exc):
+                return False
+
+        return Transaction()
+
+
+class StubDatabaseEngine:
+    def __init__(self, conn):
+        self.engine = StubEngine(conn)
+
+    def get_engine(self):
+        return self.engine
+
+
+def monthly(years):
+    return pd.DataFrame({
+        "Year": years,
+        "Month": [1] * len(years),
+        "TotalIncome": [100.0 * (i + 1) for i in range(len(years))],
+        "TotalTransactions": [i + 1 for i in range(len(years))],
+        "TotalTax": [6.0 * (i + 1) for i in range(len(years))]
+    })
+
+
+def test_existing_years_are_skipped_and_new_years_inserted_in_one_executemany():
+    conn = RecordingConnection(existing_years=[2022, 2023])
+    loader = YearlyGrowthLoader(
+        StubDatabaseEngine(conn),
+        StubRepository(monthly([2022, 2023, 2024]), monthly([2025])),
+        AggregationService()
+    )
+
+    loader.load_growth("IPP", ["yearly_growth_general"])
+
+    assert len(conn.statements) == 1
+    sql, rows = conn.statements[0]
+    assert "INSERT INTO yearly_growth_general" in sql
+    assert [(row["year"], row["taxtype"]) for row in rows] == [(2024, "IPP"), (2025, "IPP")]
+    # growth is computed over the whole series, skipped years included
+    assert rows[0]["income_growth"] == 50.0
+
+
+def test_nothing_is_written_when_every_year_exists():
+    conn = RecordingConnection(existing_years=[2023, 2024])
+    loader = YearlyGrowthLoader(StubDatabaseEngine(conn), None, AggregationService())
+    growth = loader.build_growth(monthly([2023]), monthly([2024]), "median")
+
+    assert loader.write_growth(conn, "yearly_growth_median", growth, None) == 0
+    assert conn.statements == []
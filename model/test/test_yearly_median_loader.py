@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from sqlalchemy import event
+
+from model.AggregationService import AggregationService
+from model.YearlyMedianLoader import YearlyMedianLoader
+from model.database import DatabaseEngine
+from model.schema import create_schema
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    db_engine = DatabaseEngine(backend="sqlite", path=str(tmp_path / "median.db"))
+    create_schema(db_engine.get_engine())
+    pd.DataFrame({
+        "Year": [2024, 2024, 2024],
+        "Month": [1, 2, 3],
+        "TaxType": ["IPP", "IPP", None],
+        "IncomeMedian": [1.0, 2.0, 3.0],
+        "TaxMedian": [0.1, 0.2, 0.3],
+        "TransactionsMedian": [1.0, 1.0, 1.0]
+    }).to_sql("yearly_stats_median", db_engine.get_engine(), if_exists="append", index=False)
+    yield db_engine
+    db_engine.dispose_engine()
+
+
+def read_medians(db_engine):
+    return pd.read_sql(
+        "SELECT Year, Month, COALESCE(TaxType, 'all') AS TaxType, IncomeMedian "
+        "FROM yearly_stats_median ORDER BY TaxType, Year, Month",
+        db_engine.get_engine()
+    )
+
+
+def test_existing_keys_are_skipped_and_missing_months_inserted_in_one_bulk_insert(db_engine):
+    median_df = pd.DataFrame({
+        "Year": [2024, 2024, 2024, 2025],
+        "Month": [1, 2, 3, 1],
+        "Income": [10.0, 20.0, 30.0, 40.0],
+        "Transactions": [1, 2, 3, 4],
+        "Tax": [0.6, 1.2, 1.8, 2.4]
+    })
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append((executemany, len(parameters) if executemany else 1))
+
+    engine = db_engine.get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    with engine.begin() as conn:
+        inserted = YearlyMedianLoader(db_engine, None, AggregationService()).write_monthly_median(
+            conn, median_df, "IPP"
+        )
+    event.remove(engine, "before_cursor_execute", record)
+
+    assert inserted == 2
+    assert inserts == [(True, 2)]
+    # (2024, 3) is stored for all types only, so it is missing for IPP
+    assert read_medians(db_engine).values.tolist() == [
+        [2024, 1, "IPP", 1.0],
+        [2024, 2, "IPP", 2.0],
+        [2024, 3, "IPP", 30.0],
+        [2025, 1, "IPP", 40.0],
+        [2024, 3, "all", 3.0]
+    ]
+
+
+def test_nothing_is_written_when_every_key_exists(db_engine):
+    median_df = pd.DataFrame({"Year": [2024], "Month": [3], "Income": [9.0], "Transactions": [9], "Tax": [9.0]})
+    engine = db_engine.get_engine()
+    with engine.begin() as conn:
+        assert YearlyMedianLoader(db_engine, None, AggregationService()).write_monthly_median(conn, median_df) == 0
+    assert len(read_medians(db_engine)) == 3
@@ -0,0 +1,59 @@
+import hashlib
+
+from flask import Response, g, request
+
+
+def make_etag(version):
+    """Strong ETag of the current request: route, its arguments and the data version"""
+    digest = hashlib.sha1()
+    digest.update(request.path.encode("utf-8"))
+    for key, value in sorted(request.args.items(multi=True)):
+        digest.update(b"\0" + key.encode("utf-8") + b"=" + value.encode("utf-8"))
+    digest.update(b"\0" + version.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _set_cache_control(response, max_age):
+    response.cache_control.max_age = max_age
+    if max_age == 0:
+        # may be stored, but revalidated with If-None-Match before every use
+        response.cache_control.no_cache = True
+
+
+def register_etag_caching(blueprint, version, max_ages=None, default_max_age=0, exempt=()):
+    """
+    Conditional GET for the blueprint's views.
+
+    version() returns the data version token. A request whose If-None-Match
+    holds the current ETag is answered 304 before the view runs, so no
+    database work is done; successful GET responses get the ETag and
+    Cache-Control: max-age from max_ages (view name -> seconds) or default_max_age.
+    Views named in exempt are not cached.
+    """
+    max_ages = max_ages or {}
+
+    def view_name():
+        return request.endpoint.rsplit(".", 1)[-1] if request.endpoint else None
+
+    @blueprint.before_request
+    def answer_not_modified():
+        name = view_name()
+        if request.method != "GET" or name is None or name in exempt:
+            return None
+
+        # the version is taken before the view reads any data
+        g.etag = make_etag(version())
+        if g.etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(g.etag)
+            _set_cache_control(response, max_ages.get(name, default_max_age))
+            return response
+        return None
+
+    @blueprint.after_request
+    def add_etag(response):
+        etag = g.pop("etag", None)
+        if etag is not None and response.status_code == 200:
+            response.set_etag(etag)
+            _set_cache_control(response, max_ages.get(view_name(), default_max_age))
+        return response
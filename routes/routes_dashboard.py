@@ -1,93 +1,148 @@
-import json
 import time
 
-import numpy as np
 import pandas as pd
 from flask import Blueprint, jsonify, request
+
+from config import Config
 from model.AggregationService import AggregationService
+from model.BatchForecastEngine import BatchForecastEngine
+from model.CachedTaxDataRepository import CachedTaxDataRepository
+from model.DataEvents import data_version, subscribe
 from model.ForecastService import ForecastService, logger
+from model.InnPredictionService import InnPredictionService
+from model.ModelStore import freeze_preloaded
+from model.PredictBulkLoader import PredictBulkLoader
+from model.PredictionRefreshJob import PredictionRefreshJob
+from model.QueryCache import QueryCache
 from model.TaxDataRepository import TaxDataRepository
+from model.TaxpayerDashboardService import TaxpayerDashboardService
 from model.YearlyMedianLoader import YearlyMedianLoader
-from model.database import DatabaseEngine
+from model.database import get_db_engine
 from model.YearlyGrowthLoader import YearlyGrowthLoader
+from routes.http_cache import register_etag_caching
+from routes.serialization import UnsupportedFormat, frame_response, response_format
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
-db_engine = DatabaseEngine()
-repository = TaxDataRepository(db_engine)
+db_engine = get_db_engine()
+raw_repository = TaxDataRepository(db_engine)
+repository = CachedTaxDataRepository(
+    raw_repository,
+    cache=QueryCache(
+        max_entries=Config.REPOSITORY_CACHE_MAX_ENTRIES,
+        max_bytes=Config.REPOSITORY_CACHE_MAX_BYTES,
+        max_item_bytes=Config.REPOSITORY_CACHE_MAX_ITEM_BYTES
+    )
+)
+subscribe(repository.invalidate)
+subscribe(lambda source: raw_repository.invalidate_freshness())
 aggregator = AggregationService()
 forecaster = ForecastService()
-loader = YearlyGrowthLoader(db_engine, repository, aggregator)
-median_loader = YearlyMedianLoader(db_engine, repository, aggregator)
-
-
-# support function
-def convert_numpy_types(obj):
-    if isinstance(obj, (np.integer,)):
-        return int(obj)
-    elif isinstance(obj, (np.floating,)):
-        return float(obj)
-    elif isinstance(obj, (np.ndarray,)):
-        return obj.tolist()
-    elif isinstance(obj, (pd.Timestamp,)):
-        return obj.isoformat()
-    return obj
-
-
-def df_to_json(df):
-    if df is None or df.empty:
-        return []
-    return json.loads(
-        df.to_json(
-            orient='records',
-            date_format='iso',
-            default_handler=convert_numpy_types
-        )
+batch_engine = BatchForecastEngine(
+    forecaster,
+    workers=Config.FORECAST_WORKERS,
+    chunk_size=Config.FORECAST_CHUNK_SIZE
+)
+loader = YearlyGrowthLoader(db_engine, raw_repository, aggregator)
+median_loader = YearlyMedianLoader(db_engine, raw_repository, aggregator)
+predictions = InnPredictionService(
+    repository,
+    forecaster,
+    cache=QueryCache(
+        max_entries=Config.PREDICTION_CACHE_MAX_ENTRIES,
+        max_bytes=Config.PREDICTION_CACHE_MAX_BYTES
+    ),
+    ttl=Config.PREDICTION_CACHE_TTL
+)
+taxpayer_dashboard = TaxpayerDashboardService(repository, aggregator, predictions)
+
+register_etag_caching(
+    dashboard_bp,
+    version=lambda: data_version(Config.DATA_VERSION_MAX_STALENESS),
+    max_ages=Config.DASHBOARD_CACHE_MAX_AGES,
+    default_max_age=Config.DASHBOARD_CACHE_MAX_AGE,
+    exempt=(
+        "get_prediction_status", "get_cache_stats", "get_pool_stats", "get_query_stats",
+        "get_prediction_cache_stats", "get_model_stats", "close_connection"
     )
+)
 
 
 def ensure_prediction_up_to_date():
-    df_real_years = repository.get_years()
-    if df_real_years.empty:
-        return pd.DataFrame()
-    last_real_year = int(df_real_years["Year"].max())
-    df_pred = repository.get_predict_data()
-    if df_pred.empty:
-        return create_prediction(last_real_year)
-    last_pred_year = int(df_pred["Year"].max())
-    if last_pred_year > last_real_year:
-        return df_pred
+    freshness = repository.get_freshness(refresh=True)
+    last_real_year = freshness["last_real_year"]
+    if last_real_year is None:
+        return 0
+    last_pred_year = freshness["last_predict_year"]
+    if last_pred_year is not None and last_pred_year > last_real_year:
+        return freshness["predict_rows"]
     return create_prediction(last_real_year)
 
 
 def create_prediction(last_real_year):
+    """Forecast next year for all taxpayers, returns the number of saved rows"""
     taxpayers_df = repository.get_taxpayers()
     next_year = last_real_year + 1
-    forecast_df, yearly_summary_df = forecaster.predict_for_taxpayers(
-        taxpayers_df, next_year
-    )
     engine = repository.db_engine.get_engine()
-    forecaster.save_predictions_to_db(engine, forecast_df, yearly_summary_df)
-    return forecast_df
+    predict_loader = PredictBulkLoader(engine, chunk_size=Config.PREDICT_BULK_CHUNK_SIZE)
+    predict_loader.begin(next_year)
+    try:
+        batch_engine.run(
+            taxpayers_df,
+            next_year,
+            writer=lambda monthly_df: predict_loader.write(forecaster.to_predict_frame(monthly_df))
+        )
+        return predict_loader.commit()
+    except Exception:
+        predict_loader.abort()
+        raise
 
 
-def handle_df_response(df, transform=None):
+def handle_df_response(df, transform=None, fmt="records"):
     if df is None or df.empty:
         return jsonify({'success': False, 'error': 'No data found'}), 404
     if transform:
         df = transform(df)
-    return jsonify({'success': True, 'data': df_to_json(df)})
+    return frame_response({'success': True, 'data': df}, fmt=fmt)
+
+
+@dashboard_bp.errorhandler(UnsupportedFormat)
+def handle_unsupported_format(e):
+    return jsonify({'success': False, 'error': str(e)}), 400
+
+
+def preload_models():
+    """
+    Load the forecast models now. Run in the gunicorn master (--preload),
+    so the forked workers share them instead of loading private copies.
+    """
+    forecaster.load_models()
+    freeze_preloaded()
+    print(f"Models preloaded: {forecaster.store.stats()['models']}")
 
 
 def initialize_predictions():
     try:
         print("Checking predictions on startup...")
-        df = ensure_prediction_up_to_date()
-        print(f"✅ Prediction check complete. Rows: {len(df)}")
+        rows = ensure_prediction_up_to_date()
+        print(f"✅ Prediction check complete. Rows: {rows}")
     except Exception as e:
         print("Error during prediction initialization:", e)
 
 
+prediction_job = PredictionRefreshJob(ensure_prediction_up_to_date)
+
+
+def schedule_prediction_refresh():
+    """
+    Check and refresh predictions in the background.
+    Until the new forecast year is committed, Predict keeps serving the previous one.
+    """
+    if prediction_job.start():
+        print("Prediction refresh scheduled in background")
+    return prediction_job.status()
+
+
 # TAXPAYER INFO
 @dashboard_bp.route('/taxpayer/<inn>', methods=['GET'])
 def get_taxpayer(inn):
@@ -130,6 +185,7 @@ def get_yearly_median_inn(inn):
 @dashboard_bp.route('/monthly/median', defaults={'tax_type': None}, methods=['GET'], strict_slashes=False)
 @dashboard_bp.route('/monthly/median/<tax_type>', methods=['GET'], strict_slashes=False)
 def get_monthly_median_all(tax_type):
+    fmt = response_format()
     try:
         start_year = request.args.get("startYear", type=int)
         end_year = request.args.get("endYear", type=int)
@@ -165,10 +221,7 @@ def get_monthly_median_all(tax_type):
             "TransactionsMedian": "Transactions"
         })
 
-        return jsonify({
-            'success': True,
-            'data': df_to_json(median_df)
-        })
+        return frame_response({'success': True, 'data': median_df}, fmt=fmt)
 
     except Exception as e:
         return jsonify({
@@ -180,6 +233,7 @@ def get_monthly_median_all(tax_type):
 @dashboard_bp.route('/monthly/general', defaults={'tax_type': None}, methods=['GET'],  strict_slashes=False)
 @dashboard_bp.route('/monthly/general/<tax_type>', methods=['GET'], strict_slashes=False)
 def get_monthly_general_all(tax_type):
+    fmt = response_format()
     try:
         start_year = request.args.get("startYear", type=int)
         end_year = request.args.get("endYear", type=int)
@@ -190,7 +244,7 @@ def get_monthly_general_all(tax_type):
             start_year=start_year,
             end_year=end_year
         )
-        return handle_df_response(df)
+        return handle_df_response(df, fmt=fmt)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -198,13 +252,15 @@ def get_monthly_general_all(tax_type):
 # YEARLY GROWTH
 @dashboard_bp.route('/yearly/growth/<inn>', methods=['GET'])
 def get_yearly_growth_inn(inn):
+    fmt = response_format()
     try:
         df = repository.get_monthly_by_inn(inn)
         return handle_df_response(
             df,
             lambda x: aggregator.calculate_growth(
                 aggregator.aggregate_yearly(x, "median")
-            )
+            ),
+            fmt=fmt
         )
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -213,6 +269,7 @@ def get_yearly_growth_inn(inn):
 @dashboard_bp.route('/yearly/growth/general', defaults={'tax_type': None}, methods=['GET'])
 @dashboard_bp.route('/yearly/growth/general/<tax_type>', methods=['GET'])
 def get_yearly_growth_general(tax_type):
+    fmt = response_format()
     try:
         start_year = request.args.get("startYear", type=int)
         end_year = request.args.get("endYear", type=int)
@@ -226,7 +283,7 @@ def get_yearly_growth_general(tax_type):
 
         if gr is None:
             print("No data. Start YearlyGrowthLoader...")
-            loader.load_general_growth(tax_type)
+            loader.load_growth(tax_type)
             gr = repository.get_yearly_growth_by_type(
                 "yearly_growth_general",
                 tax_type,
@@ -249,10 +306,7 @@ def get_yearly_growth_general(tax_type):
             "TaxGrowth": "TaxGrowth_%",
             "TransactionsGrowth": "TransactionsGrowth_%"
         })
-        return jsonify({
-            'success': True,
-            'data': df_to_json(gr)
-        })
+        return frame_response({'success': True, 'data': gr}, fmt=fmt)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -263,6 +317,7 @@ def get_yearly_growth_general(tax_type):
 @dashboard_bp.route('/yearly/growth/median', defaults={'tax_type': None}, methods=['GET'])
 @dashboard_bp.route('/yearly/growth/median/<tax_type>', methods=['GET'])
 def get_yearly_growth_median(tax_type):
+    fmt = response_format()
     try:
         start_year = request.args.get("startYear", type=int)
         end_year = request.args.get("endYear", type=int)
@@ -275,7 +330,7 @@ def get_yearly_growth_median(tax_type):
         )
         if gr is None:
             print("No data. Run YearlyGrowthLoader...")
-            loader.load_median_growth(tax_type)
+            loader.load_growth(tax_type)
             gr = repository.get_yearly_growth_by_type(
                 "yearly_growth_median",
                 tax_type,
@@ -297,10 +352,7 @@ def get_yearly_growth_median(tax_type):
             "TaxGrowth": "TaxGrowth_%",
             "TransactionsGrowth": "TransactionsGrowth_%"
         })
-        return jsonify({
-            'success': True,
-            'data': df_to_json(gr)
-        })
+        return frame_response({'success': True, 'data': gr}, fmt=fmt)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -312,27 +364,87 @@ def get_yearly_growth_median(tax_type):
 @dashboard_bp.route('/predict_inn/<inn>', methods=['GET'])
 def get_prediction_inn(inn):
     try:
-        taxpayer = repository.get_taxpayer(inn)
-        if taxpayer.empty:
-            return jsonify({'success': False, 'error': 'Taxpayer not found'}), 404
-        monthly_df = repository.get_monthly_by_inn(inn)
-        if monthly_df.empty:
+        prediction = predictions.predict(inn)
+        if prediction is None:
+            if repository.get_taxpayer(inn).empty:
+                return jsonify({'success': False, 'error': 'Taxpayer not found'}), 404
             return jsonify({'success': False, 'error': 'No historical data'}), 404
-        last_year = int(monthly_df["Year"].max())
-        prediction_df, _ = forecaster.predict_for_taxpayers(taxpayer, last_year + 1)
-        return jsonify({
+        return frame_response({'success': True, 'prediction_year': prediction["year"], 'data': prediction["data"]})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# ONE TAXPAYER'S DASHBOARD IN ONE REQUEST
+@dashboard_bp.route('/inn/<inn>/bundle', methods=['GET'])
+def get_taxpayer_bundle(inn):
+    """
+    taxpayer, monthly, yearly_totals, yearly_median, yearly_growth and
+    prediction of one INN, computed from one read of its monthly history.
+    ?parts=monthly,yearly_growth limits the response to the listed parts.
+    """
+    try:
+        parts = TaxpayerDashboardService.parse_parts(request.args.get('parts'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        bundle = taxpayer_dashboard.get_bundle(inn, parts)
+        if bundle is None:
+            return jsonify({'success': False, 'error': 'Taxpayer not found'}), 404
+        return frame_response({'success': True, 'inn': inn, 'data': bundle})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# SEVERAL TAXPAYERS IN ONE REQUEST
+@dashboard_bp.route('/batch/monthly', methods=['POST'])
+def get_monthly_batch():
+    """Body {"inns": [...]}; data: INN -> monthly history, missing: INNs without data"""
+    try:
+        inns = TaxpayerDashboardService.parse_inns(request.get_json(silent=True), Config.BATCH_MAX_INNS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        data = taxpayer_dashboard.get_monthly_batch(inns)
+        return frame_response({
+            'success': True,
+            'data': data,
+            'missing': [inn for inn in inns if inn not in data]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@dashboard_bp.route('/batch/predict', methods=['POST'])
+def get_prediction_batch():
+    """Body {"inns": [...]}; data: INN -> {year, data, source}, missing: unknown INNs or without history"""
+    try:
+        inns = TaxpayerDashboardService.parse_inns(request.get_json(silent=True), Config.BATCH_MAX_INNS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        data = taxpayer_dashboard.predict_batch(inns)
+        return frame_response({
             'success': True,
-            'prediction_year': last_year + 1,
-            'data': df_to_json(prediction_df)
+            'data': data,
+            'missing': [inn for inn in inns if inn not in data]
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@dashboard_bp.route('/predict/status', methods=['GET'])
+def get_prediction_status():
+    return jsonify({'success': True, 'data': prediction_job.status()})
+
+
 @dashboard_bp.route('/predict_generale/result', methods=['GET'])
 def get_prediction_general_result():
     try:
-        df = repository.get_predict_data()
+        # streamed, only the columns aggregated below are kept from each chunk
+        df = pd.concat(
+            [chunk[['Month', 'Income', 'Transactions', 'Tax']] for chunk in repository.iter_predict_data()],
+            ignore_index=True
+        )
 
         if df.empty:
             return jsonify({'success': False, 'error': 'No prediction data'}), 404
@@ -349,11 +461,7 @@ def get_prediction_general_result():
             MedianTax=('Tax', 'median')
         ).reset_index()
 
-        return jsonify({
-            "success": True,
-            "general": general_df.to_dict(orient='records'),
-            "median": median_df.to_dict(orient='records')
-        })
+        return frame_response({'success': True, 'general': general_df, 'median': median_df}, double_precision=15)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -399,12 +507,50 @@ def get_global_year_range():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# DEBUG
+@dashboard_bp.route('/_debug/cache', methods=['GET'])
+def get_cache_stats():
+    return jsonify({'success': True, 'data': repository.stats()})
+
+
+@dashboard_bp.route('/_debug/pool', methods=['GET'])
+def get_pool_stats():
+    return jsonify({'success': True, 'data': db_engine.pool_status()})
+
+
+@dashboard_bp.route('/_debug/predictions', methods=['GET'])
+def get_prediction_cache_stats():
+    return jsonify({'success': True, 'data': predictions.stats()})
+
+
+@dashboard_bp.route('/_debug/models', methods=['GET'])
+def get_model_stats():
+    return jsonify({'success': True, 'data': forecaster.store.stats()})
+
+
+@dashboard_bp.route('/_debug/queries', methods=['GET'])
+def get_query_stats():
+    top = request.args.get('top', default=10, type=int)
+    stats = db_engine.query_stats
+    return jsonify({
+        'success': True,
+        'data': {
+            'by_total': stats.top(top, order='total'),
+            'by_p95': stats.top(top, order='p95'),
+            'slow_query_ms': stats.slow_query_ms,
+            'slow_queries': stats.slow_queries()
+        }
+    })
+
+
 # CLOSE DB
 @dashboard_bp.route('/close', methods=['POST'])
 def close_connection():
     try:
-        db_engine.dispose_engine()
-        return jsonify({'success': True, 'message': 'Database connection closed'})
+        # the pool is shared by all blueprints: only idle connections are closed,
+        # requests holding a connection finish normally
+        db_engine.release_idle_connections()
+        return jsonify({'success': True, 'message': 'Idle database connections closed'})
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,56 +1,50 @@
+import numpy as np
 import pandas as pd
 from flask import Blueprint, jsonify, request
-import json
-import numpy as np
 
+from config import Config
+from model.InnSearchIndex import InnSearchIndex
 from model.TaxpayerRepository import TaxpayerRepository
-from model.database import DatabaseEngine
+from model.database import get_db_engine
 from model.TaxpayerService import TaxpayerService
+from routes.serialization import json_response
 
 routes_taxpayer = Blueprint('routes_taxpayer', __name__)
 
-db_engine = DatabaseEngine()
+db_engine = get_db_engine()
 repo = TaxpayerRepository(db_engine)
-service = TaxpayerService(repo)
-
-class NpEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, (np.ndarray,)):
-            return obj.tolist()
-        if isinstance(obj, (np.bool_)):
-            return bool(obj)
-        if pd.isna(obj):
-            return None
-        return super(NpEncoder, self).default(obj)
-
-
-def map_taxpayer_to_user(row):
+inn_index = InnSearchIndex(
+    db_engine,
+    max_ids=Config.INN_INDEX_MAX_IDS,
+    refresh_interval=Config.INN_INDEX_REFRESH_INTERVAL
+)
+service = TaxpayerService(repo, count_ttl=Config.TAXPAYER_COUNT_TTL, inn_index=inn_index)
+
+AVATAR_URL = "https://api.dicebear.com/7.x/initials/svg?seed="
+
+
+def map_taxpayers_to_users(df):
     """
-    Преобразование строки БД в формат,
-    который ожидает фронтенд (User)
+    Преобразование строк БД в формат,
+    который ожидает фронтенд (User), по столбцам
     """
-    # Конвертируем numpy типы в стандартные Python типы
-    taxpayer_id = int(row["TaxpayerId"]) if isinstance(row["TaxpayerId"], (np.integer, np.int64)) else row["TaxpayerId"]
-    has_employees = bool(row["has_employees"]) if isinstance(row["has_employees"], (np.bool_, bool)) else row[
-        "has_employees"]
-    employees_count = int(row["employees_count"]) if row["employees_count"] and not pd.isna(
-        row["employees_count"]) else None
-
-    return {
-        "id": taxpayer_id,
-        "name": str(row["FullName"]),
-        "INN": str(row["INN"]),
-        "registration_district": str(row["registration_district"]),
-        "has_employees": has_employees,
-        "employees_count": employees_count,
-        "avatar": {
-            "src": f"https://api.dicebear.com/7.x/initials/svg?seed={str(row['FullName'])}"
-        }
+    if df.empty:
+        return []
+
+    names = list(map(str, df["FullName"].tolist()))
+    columns = {
+        "id": df["TaxpayerId"].to_numpy(dtype=np.int64).tolist(),
+        "name": names,
+        "INN": list(map(str, df["INN"].tolist())),
+        "registration_district": list(map(str, df["registration_district"].tolist())),
+        "has_employees": df["has_employees"].to_numpy(dtype=bool).tolist(),
+        # Int64 -> Python int, missing -> None
+        "employees_count": df["employees_count"].astype("Int64").to_numpy(dtype=object, na_value=None).tolist(),
+        "avatar": [{"src": AVATAR_URL + name} for name in names]
     }
+    # column lists -> records; faster than DataFrame.to_dict('records') at page sizes
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
 
 
 @routes_taxpayer.route('/api/taxpayers', methods=['GET'])
@@ -63,36 +57,63 @@ def get_taxpayers():
         page = int(request.args.get('page', 1))
         page_size = min(int(request.args.get('pageSize', 10)), 100)
         inn_filter = request.args.get('inn', '')
+        # innMatch: "substring" (default) or "prefix"
+        inn_match = request.args.get('innMatch', 'substring')
+        if inn_match not in ('substring', 'prefix'):
+            return jsonify({"error": f"Unknown innMatch: {inn_match}"}), 400
         district_filter = request.args.get('district', '')
         sort_by = request.args.get('sortBy', 'TaxpayerId')
         sort_order = request.args.get('sortOrder', 'asc').upper()
+        # withTotal=false: no count query, total/totalPages are null
+        with_total = request.args.get('withTotal', 'true').lower() != 'false'
         # print("PAGE:", page)
         # print("PAGE SIZE:", page_size)
 
+        # cursor mode: ?cursor= (empty for the first page), then nextCursor / prevCursor
+        if 'cursor' in request.args:
+            try:
+                result = service.get_taxpayers_keyset(
+                    page_size=page_size,
+                    cursor=request.args.get('cursor') or None,
+                    inn_filter=inn_filter if inn_filter else None,
+                    district_filter=district_filter if district_filter else None,
+                    sort_by=sort_by,
+                    sort_order=sort_order,
+                    with_total=with_total,
+                    inn_match=inn_match
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            return json_response({
+                'data': map_taxpayers_to_users(result['data']),
+                'total': result['total'],
+                'pageSize': int(result['page_size']),
+                'nextCursor': result['next_cursor'],
+                'prevCursor': result['prev_cursor']
+            })
+
         result = service.get_taxpayers_paginated(
             page=page,
             page_size=page_size,
             inn_filter=inn_filter if inn_filter else None,
             district_filter=district_filter if district_filter else None,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            with_total=with_total,
+            inn_match=inn_match
         )
 
-        taxpayers = []
-        if not result['data'].empty:
-            for _, row in result['data'].iterrows():
-                taxpayers.append(map_taxpayer_to_user(row))
-
         response_data = {
-            'data': taxpayers,
-            'total': int(result['total']),
+            'data': map_taxpayers_to_users(result['data']),
+            'total': result['total'],
             'page': int(result['page']),
             'pageSize': int(result['page_size']),
-            'totalPages': int(result['total_pages'])
+            'totalPages': result['total_pages']
         }
 
-        # Используем собственный JSON encoder для обработки numpy типов
-        return jsonify(response_data), 200
+        # JSON encoder с поддержкой numpy типов (orjson, если установлен)
+        return json_response(response_data)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -101,6 +122,11 @@ def get_taxpayers():
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
+@routes_taxpayer.route('/api/taxpayers/_debug/inn-index', methods=['GET'])
+def get_inn_index_stats():
+    return jsonify({'success': True, 'data': inn_index.stats()}), 200
+
+
 @routes_taxpayer.route('/api/taxpayers/<string:inn>', methods=['GET'])
 def get_taxpayer_by_inn(inn):
     """
@@ -111,5 +137,5 @@ def get_taxpayer_by_inn(inn):
     if df.empty:
         return jsonify({"error": "Taxpayer not found"}), 404
 
-    taxpayer = map_taxpayer_to_user(df.iloc[0])
-    return jsonify(taxpayer), 200
\ No newline at end of file
+    taxpayer = map_taxpayers_to_users(df.iloc[:1])[0]
+    return json_response(taxpayer)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # optional, the standard json module is used instead
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional, ?format=arrow is answered with 406
+    pyarrow = None
+
+# ?format= values of the endpoints returning time series
+RESPONSE_FORMATS = ("records", "columnar", "arrow")
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+_COLUMN_TYPES = {"i": "int", "u": "int", "f": "float", "b": "bool", "M": "datetime"}
+
+
+class NpEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (np.integer, np.int64, np.int32)):
+            return int(obj)
+        if isinstance(obj, (np.floating, np.float64, np.float32)):
+            return float(obj)
+        if isinstance(obj, (np.ndarray,)):
+            return obj.tolist()
+        if isinstance(obj, (np.bool_)):
+            return bool(obj)
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+        if pd.isna(obj):
+            return None
+        return super(NpEncoder, self).default(obj)
+
+
+def convert_numpy_types(obj):
+    if isinstance(obj, (np.integer,)):
+        return int(obj)
+    elif isinstance(obj, (np.floating,)):
+        return float(obj)
+    elif isinstance(obj, (np.ndarray,)):
+        return obj.tolist()
+    elif isinstance(obj, (pd.Timestamp,)):
+        return obj.isoformat()
+    return obj
+
+
+def _orjson_default(obj):
+    # types orjson does not serialize natively
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError
+
+
+def dumps(obj):
+    """
+    JSON bytes of obj; numpy scalars and arrays are serialized natively.
+    Uses orjson when it is installed, json with NpEncoder otherwise.
+    Keys are sorted, as in Flask's jsonify.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        )
+    return json.dumps(obj, cls=NpEncoder, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(obj, status=200):
+    """Flask JSON response serialized with dumps"""
+    return Response(dumps(obj), status=status, mimetype="application/json")
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def response_format():
+    """?format= of the current request; UnsupportedFormat for an unknown one"""
+    fmt = request.args.get("format", "records")
+    if fmt not in RESPONSE_FORMATS:
+        raise UnsupportedFormat(f"Unknown format: {fmt}, expected one of {', '.join(RESPONSE_FORMATS)}")
+    return fmt
+
+
+def _columnar_json(df, double_precision):
+    """{"schema": [{"name", "type"}], "columns": [[...], ...]} - one array per column"""
+    if df is None:
+        df = pd.DataFrame()
+    schema = [{"name": str(name), "type": _COLUMN_TYPES.get(dtype.kind, "string")}
+              for name, dtype in df.dtypes.items()]
+    columns = [
+        df[name].to_json(
+            orient='values',
+            date_format='iso',
+            double_precision=double_precision,
+            default_handler=convert_numpy_types
+        ).encode("utf-8")
+        for name in df.columns
+    ]
+    return b'{"columns":[' + b",".join(columns) + b'],"schema":' + dumps(schema) + b"}"
+
+
+def frame_to_json(df, double_precision=10, fmt="records"):
+    """
+    DataFrame -> JSON bytes in a single pass:
+    NaN/None become null, timestamps ISO 8601, numpy values native.
+    fmt: "records" - list of row objects; "columnar" - schema and one array per column
+    """
+    if fmt == "columnar":
+        return _columnar_json(df, double_precision)
+    if df is None or df.empty:
+        return b"[]"
+    return df.to_json(
+        orient='records',
+        date_format='iso',
+        double_precision=double_precision,
+        default_handler=convert_numpy_types
+    ).encode("utf-8")
+
+
+def arrow_response(df, metadata=None, status=200):
+    """DataFrame as an Arrow IPC stream; metadata goes to the schema metadata as JSON strings"""
+    if pyarrow is None:
+        return json_response({'success': False, 'error': 'format=arrow requires pyarrow'}, status=406)
+
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            **{key.encode("utf-8"): dumps(value) for key, value in metadata.items()}
+        })
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), status=status, mimetype=ARROW_MIMETYPE)
+
+
+def _object_json(fields, double_precision, fmt):
+    """JSON object bytes of a dict; DataFrames (also in nested dicts) written by frame_to_json"""
+    parts = []
+    for key in sorted(fields, key=str):
+        value = fields[key]
+        if isinstance(value, pd.DataFrame):
+            body = frame_to_json(value, double_precision, fmt)
+        elif isinstance(value, dict):
+            body = _object_json(value, double_precision, fmt)
+        else:
+            body = dumps(value)
+        parts.append(dumps(str(key)) + b":" + body)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def frame_response(fields, status=200, double_precision=10, fmt="records"):
+    """
+    JSON object response built from the fields dict without re-parsing:
+    DataFrame fields (also inside dict fields) are written once by
+    frame_to_json and spliced into the envelope, other fields are
+    serialized with dumps.
+    fmt="arrow": the 'data' frame as an Arrow IPC stream, the other
+    fields in its schema metadata.
+    """
+    if fmt == "arrow":
+        metadata = {key: value for key, value in fields.items() if key != 'data'}
+        return arrow_response(fields['data'], metadata, status)
+
+    return Response(_object_json(fields, double_precision, fmt), status=status, mimetype="application/json")